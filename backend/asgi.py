@@ -0,0 +1,34 @@
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from main import app as flask_app
+from routes.async_routes import router
+from utils.asgi import dispatch
+from utils.supabase_client import close_async_supabase
+
+# ASGI entry point: the hot read paths in routes.async_routes run natively on
+# the event loop with a shared async PostgREST client; every other request
+# is handed to the Flask app on a thread pool.
+#
+#   uvicorn asgi:app --port 8000
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 20))
+
+wsgi_app = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_supabase()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] == 'http' and await dispatch(router, scope, receive, send):
+        return
+    await wsgi_app(scope, receive, send)
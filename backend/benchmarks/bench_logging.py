@@ -0,0 +1,122 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueListener
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.logging_config import LOG_FORMAT, NonBlockingQueueHandler, SamplingFilter
+
+# Compares the old request-path logging (DEBUG level, synchronous handler,
+# f-string dumps of whole responses) with the queue-based, lazily formatted
+# and sampled setup from utils.logging_config.
+#
+#   python -m benchmarks.bench_logging --iterations 20000
+
+class SlowSink:
+    # Output stream whose writes block, like a full pipe or a stalled disk
+    def __init__(self, latency_us):
+        self.latency = latency_us / 1e6
+
+    def write(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return len(text)
+
+    def flush(self):
+        pass
+
+class FakeResponse:
+    # Stands in for a postgrest APIResponse holding a page of patients
+    def __init__(self, rows):
+        self.data = rows
+        self.count = None
+
+    def __repr__(self):
+        return f"data={self.data!r} count={self.count!r}"
+
+def _rows(count):
+    return [{
+        'id': i,
+        'user_id': i,
+        'date_of_birth': '1980-01-01',
+        'users': {'first_name': f'First{i}', 'last_name': f'Last{i}', 'email': f'patient{i}@example.com'}
+    } for i in range(count)]
+
+def _sync_logger(name, level, sink):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    return logger, None
+
+def _queued_logger(name, level, sink, sample_rate=None):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    output = logging.StreamHandler(sink)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    logger.handlers = [NonBlockingQueueHandler(log_queue)]
+    logger.setLevel(level)
+    if sample_rate is not None:
+        logger.addFilter(SamplingFilter(sample_rate))
+    listener = QueueListener(log_queue, output)
+    listener.start()
+    return logger, listener
+
+def _time(call, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def run(iterations, rows, sink_latency_us):
+    response = FakeResponse(_rows(rows))
+    sink = SlowSink(sink_latency_us)
+    results = {}
+
+    logger, _ = _sync_logger('bench.baseline', logging.DEBUG, sink)
+    results['baseline: DEBUG, sync handler, f-string dump'] = _time(
+        lambda: logger.debug(f"Get all patients response: {response}"), iterations)
+
+    logger, listener = _queued_logger('bench.info', logging.INFO, sink, sample_rate=0.01)
+    results['pipeline: INFO, sampled debug dump'] = _time(
+        lambda: logger.debug("Get all patients response: %s", response), iterations)
+    listener.stop()
+
+    logger, listener = _queued_logger('bench.debug', logging.DEBUG, sink, sample_rate=0.01)
+    results['pipeline: DEBUG, 1% sampled debug dump'] = _time(
+        lambda: logger.debug("Get all patients response: %s", response), iterations)
+    listener.stop()
+
+    logger, _ = _sync_logger('bench.error.sync', logging.INFO, sink)
+    results['baseline: error line, sync handler'] = _time(
+        lambda: logger.error(f"Error getting patient by id: {'timeout'}"), iterations)
+
+    logger, listener = _queued_logger('bench.error.queued', logging.INFO, sink)
+    results['pipeline: error line, queued handler'] = _time(
+        lambda: logger.error("Error getting patient by id: %s", 'timeout'), iterations)
+    listener.stop()
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Request-path logging overhead')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--rows', type=int, default=50, help='rows in the logged response')
+    parser.add_argument('--sink-latency-us', type=float, default=50,
+                        help='simulated blocking time per write to the log output')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.rows, args.sink_latency_us)
+    if args.json:
+        print(json.dumps({'unit': 'us_per_call', 'results': results}, indent=2))
+    else:
+        for name, micros in results.items():
+            print(f"{name:<50} {micros:10.2f} us/call")
@@ -0,0 +1,270 @@
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from utils.postgrest_syntax import parse_condition, parse_in, parse_logic, parse_select, singular, split_top, unquote, utc_now
+
+# Minimal in-memory PostgREST stand-in for benchmarks. Supports the subset of
+# the query language used by the models: select with embedding (aliases,
+# !inner, (count), per-embed order/limit), eq/neq/gt/gte/lt/lte/in/is/like/
+# ilike filters, or=(...)/and=(...), order, limit and offset. Every request
+# sleeps for the configured latency to stand in for the network round trip.
+#
+#   python -m benchmarks.fake_postgrest --port 54321 --latency-ms 5
+
+_lock = threading.Lock()
+tables = {}
+_indexes = {}
+sequences = {}
+latency = 0.0
+
+def _coerce(value):
+    if value in ('null', None):
+        return None
+    if value == 'true':
+        return True
+    if value == 'false':
+        return False
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+def _compare(a, b):
+    if a is None or b is None:
+        return None
+    if isinstance(a, (int, float)) and not isinstance(b, (int, float)):
+        b = _coerce(b)
+    if isinstance(a, str) or isinstance(b, str):
+        a, b = str(a), str(b)
+    return (a > b) - (a < b)
+
+def _test(row, column, operator, raw, negate):
+    raw = unquote(raw)
+    value = row.get(column)
+    if operator == 'in':
+        options = [_coerce(v) for v in parse_in(raw)]
+        result = any(_compare(value, o) == 0 for o in options)
+    elif operator == 'is':
+        result = value is _coerce(raw)
+    elif operator in ('like', 'ilike'):
+        pattern = '^' + re.escape(raw).replace('\\*', '.*').replace('%', '.*') + '$'
+        flags = re.IGNORECASE if operator == 'ilike' else 0
+        result = value is not None and re.match(pattern, str(value), flags) is not None
+    else:
+        cmp = _compare(value, _coerce(raw))
+        result = cmp is not None and {
+            'eq': cmp == 0, 'neq': cmp != 0, 'gt': cmp > 0,
+            'gte': cmp >= 0, 'lt': cmp < 0, 'lte': cmp <= 0,
+        }[operator]
+    return not result if negate else result
+
+def _match(row, column, expr):
+    return _test(row, column, *parse_condition(expr))
+
+def _match_group(row, group):
+    results = [_match_group(row, term) if 'terms' in term
+               else _test(row, term['column'], term['operator'], term['value'], term['negate'])
+               for term in group['terms']]
+    result = all(results) if group['conjunction'] == 'and' else any(results)
+    return not result if group['negate'] else result
+
+def _match_logic(row, text, conjunction):
+    return _match_group(row, parse_logic(text, conjunction))
+
+def _sort(rows, order):
+    for spec in reversed(split_top(order or '')):
+        column, _, direction = spec.partition('.')
+        desc = direction.startswith('desc')
+        rows = sorted(rows, key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+    return rows
+
+def _by_id(table):
+    # Dropped on every write; ids never change in place
+    if table not in _indexes:
+        _indexes[table] = {r.get('id'): r for r in tables.get(table, [])}
+    return _indexes[table]
+
+def _project(table, row, select, embed_params=None):
+    result = {}
+    inner_ok = True
+    columns, embeds = parse_select(select)
+    for alias, column in columns:
+        if column == '*':
+            result.update(row)
+        else:
+            result[alias] = row.get(column)
+    for embed in embeds:
+        alias, rel, inner = embed['alias'], embed['relation'], embed['select']
+        fk = f"{singular(rel)}_id"
+        if fk in row:
+            target = _by_id(rel).get(row[fk])
+            embedded = _project(rel, target, inner)[0] if target else None
+            if embed['inner'] and embedded is None:
+                inner_ok = False
+        else:
+            back = f"{singular(table)}_id"
+            children = [r for r in tables.get(rel, []) if r.get(back) == row.get('id')]
+            if inner == 'count':
+                embedded = [{'count': len(children)}]
+            else:
+                options = (embed_params or {}).get(alias, {})
+                children = _sort(children, options.get('order'))
+                if 'limit' in options:
+                    children = children[:int(options['limit'])]
+                embedded = [_project(rel, c, inner)[0] for c in children]
+            if embed['inner'] and not embedded:
+                inner_ok = False
+        result[alias] = embedded
+    return result, inner_ok
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive round trip
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _parse(self):
+        parts = urlsplit(self.path)
+        table = parts.path.rstrip('/').split('/')[-1]
+        return table, parse_qsl(parts.query, keep_blank_values=True)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null') if length else None
+
+    def _filter(self, table, params):
+        rows = tables.setdefault(table, [])
+        for key, value in params:
+            if key in ('select', 'order', 'limit', 'offset', 'columns', 'on_conflict'):
+                continue
+            if key in ('or', 'and'):
+                rows = [r for r in rows if _match_logic(r, value[1:-1], key)]
+            elif '.' not in key:
+                rows = [r for r in rows if _match(r, key, value)]
+        return rows
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _select(self, table, rows, params):
+        query = dict(params)
+        embed_params = {}
+        for key, value in params:
+            if '.' in key:
+                alias, _, option = key.partition('.')
+                embed_params.setdefault(alias, {})[option] = value
+        rows = _sort(rows, query.get('order'))
+        offset = int(query.get('offset', 0))
+        if '!inner' not in query.get('select', ''):
+            # Nothing can drop a row after projection, so page first
+            total = len(rows)
+            end = offset + int(query['limit']) if 'limit' in query else None
+            return [_project(table, row, query.get('select', '*'), embed_params)[0]
+                    for row in rows[offset:end]], total
+        projected = []
+        for row in rows:
+            item, ok = _project(table, row, query.get('select', '*'), embed_params)
+            if ok:
+                projected.append(item)
+        total = len(projected)
+        if 'limit' in query:
+            projected = projected[offset:offset + int(query['limit'])]
+        else:
+            projected = projected[offset:]
+        return projected, total
+
+    def _handle(self, method):
+        if latency:
+            time.sleep(latency)
+        table, params = self._parse()
+        body = self._body()
+        prefer = self.headers.get('Prefer', '')
+        with _lock:
+            if method == 'GET' or method == 'HEAD':
+                rows, total = self._select(table, self._filter(table, params), params)
+            elif method == 'POST':
+                _indexes.pop(table, None)
+                records = body if isinstance(body, list) else [body]
+                rows = []
+                for record in records:
+                    row = dict(record)
+                    if 'email' in row and any(r.get('email') == row['email'] for r in tables.get(table, [])):
+                        return self._send(409, {'code': '23505', 'message': 'duplicate key value violates unique constraint', 'details': None, 'hint': None})
+                    sequences[table] = sequences.get(table, 0) + 1
+                    row.setdefault('id', sequences[table])
+                    row.setdefault('created_at', utc_now())
+                    row.setdefault('updated_at', row['created_at'])
+                    tables.setdefault(table, []).append(row)
+                    rows.append(row)
+                rows = [_project(table, r, dict(params).get('select', '*'))[0] for r in rows]
+                total = len(rows)
+            elif method == 'PATCH':
+                rows = self._filter(table, params)
+                for row in rows:
+                    row.update(body)
+                    row['updated_at'] = utc_now()
+                total = len(rows)
+            elif method == 'DELETE':
+                rows = self._filter(table, params)
+                _indexes.pop(table, None)
+                ids = {id(r) for r in rows}
+                tables[table] = [r for r in tables.get(table, []) if id(r) not in ids]
+                total = len(rows)
+            else:
+                return self._send(405, {'message': 'method not allowed'})
+        headers = {}
+        if 'count=' in prefer or method == 'GET':
+            end = max(len(rows) - 1, 0)
+            headers['Content-Range'] = f"0-{end}/{total}"
+        self._send(201 if method == 'POST' else 200, rows, headers)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_HEAD(self):
+        self._handle('HEAD')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+def serve(host='127.0.0.1', port=54321, latency_ms=0):
+    global latency
+    latency = latency_ms / 1000.0
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='In-memory PostgREST stand-in')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+    serve(port=args.port, latency_ms=args.latency_ms)
+    threading.Event().wait()
@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks import fake_postgrest
+
+# Boots the app on a local port against the in-memory PostgREST stand-in and
+# drives a weighted mix of requests at each concurrency level. Results are
+# written as JSON, one file per run, so runs can be compared across commits.
+#
+#   python -m benchmarks.load_test --latency-ms 5 --concurrency 1,8,32 --duration 10
+#   python -m benchmarks.load_test --mode asgi --concurrency 8,64,256
+#   python -m benchmarks.load_test --compare results/abc123-wsgi.json results/abc123-asgi.json
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_MIX = 'login=1,patient_list=4,session_detail=4,report_update=1'
+PASSWORD = 'benchmark-password'
+
+def seed(patients, sessions_per_patient):
+    created = '2026-01-01T00:00:00+00:00'
+    users = [{'id': 1, 'email': 'doctor@example.com', 'password': PASSWORD, 'role': 'doctor',
+              'first_name': 'Dana', 'last_name': 'Doctor', 'created_at': created}]
+    doctors = [{'id': 1, 'user_id': 1, 'created_at': created}]
+    patient_rows, sessions, reports = [], [], []
+    for i in range(1, patients + 1):
+        users.append({'id': i + 1, 'email': f'patient{i}@example.com', 'password': PASSWORD, 'role': 'patient',
+                      'first_name': f'First{i}', 'last_name': f'Last{i}', 'created_at': created})
+        patient_rows.append({'id': i, 'user_id': i + 1, 'date_of_birth': '1980-01-01', 'created_at': created})
+        for _ in range(sessions_per_patient):
+            session_id = len(sessions) + 1
+            sessions.append({'id': session_id, 'patient_id': i, 'doctor_id': 1, 'created_at': created})
+            reports.append({'id': session_id, 'session_id': session_id, 'summary': f'Visit {session_id}',
+                            'notes': '', 'created_at': created, 'updated_at': created})
+    fake_postgrest.tables.clear()
+    fake_postgrest._indexes.clear()
+    fake_postgrest.tables.update({'users': users, 'doctors': doctors, 'patients': patient_rows,
+                                  'sessions': sessions, 'reports': reports})
+    fake_postgrest.sequences.clear()
+    fake_postgrest.sequences.update({name: len(rows) for name, rows in fake_postgrest.tables.items()})
+    return {'users': len(users), 'sessions': len(sessions)}
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name.strip()}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+async def _login(client, rng, sizes, headers=None):
+    email = f'patient{rng.randint(1, sizes["users"] - 1)}@example.com'
+    return await client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+
+async def _patient_list(client, rng, sizes, headers):
+    return await client.get('/api/patients', params={'limit': 50}, headers=headers)
+
+async def _session_detail(client, rng, sizes, headers):
+    return await client.get(f'/api/sessions/{rng.randint(1, sizes["sessions"])}', headers=headers)
+
+async def _report_update(client, rng, sizes, headers):
+    report_id = rng.randint(1, sizes['sessions'])
+    return await client.put(f'/api/reports/{report_id}', json={'notes': f'Updated {time.time():.6f}'},
+                            headers=headers)
+
+SCENARIOS = {
+    'login': _login,
+    'patient_list': _patient_list,
+    'session_detail': _session_detail,
+    'report_update': _report_update,
+}
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank, so p99 of a small sample is an observed latency
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarise(samples, elapsed):
+    routes = {}
+    for name, status, seconds in samples:
+        routes.setdefault(name, []).append((status, seconds))
+    summary = {}
+    for name, entries in sorted(routes.items()):
+        latencies = sorted(seconds * 1000 for _, seconds in entries)
+        summary[name] = {
+            'requests': len(entries),
+            'errors': sum(1 for status, _ in entries if status is None or status >= 400),
+            'throughput_rps': len(entries) / elapsed,
+            'mean_ms': sum(latencies) / len(latencies),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+        }
+    return summary
+
+async def _worker(client, mix, sizes, window, seed_value, samples):
+    # One simulated user: logs in, then issues requests back to back
+    rng = random.Random(seed_value)
+    names, weights = list(mix), list(mix.values())
+    token = (await _login(client, rng, sizes)).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    window['logged_in'] += 1
+    if window['logged_in'] == window['users']:
+        window['all_logged_in'].set()
+    await window['ready'].wait()
+    while True:
+        start = time.perf_counter()
+        if start >= window['stop_at']:
+            break
+        name = rng.choices(names, weights)[0]
+        try:
+            status = (await SCENARIOS[name](client, rng, sizes, headers)).status_code
+        except httpx.HTTPError:
+            status = None
+        # Requests started during warmup only prime the pools and caches
+        if start >= window['measure_from']:
+            samples.append((name, status, time.perf_counter() - start))
+
+async def _run_level(base_url, mix, sizes, concurrency, duration, warmup):
+    samples = []
+    window = {'ready': asyncio.Event(), 'all_logged_in': asyncio.Event(), 'logged_in': 0, 'users': concurrency}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, trust_env=False, timeout=60, limits=limits) as client:
+        workers = [asyncio.create_task(_worker(client, mix, sizes, window, index, samples))
+                   for index in range(concurrency)]
+        # Let every worker log in before the clock starts
+        await window['all_logged_in'].wait()
+        window['measure_from'] = time.perf_counter() + warmup
+        window['stop_at'] = window['measure_from'] + duration
+        window['ready'].set()
+        await asyncio.gather(*workers)
+    # Requests in flight at the deadline finish after it, so measure to the last one
+    elapsed = max(time.perf_counter() - window['measure_from'], 1e-9)
+    routes = summarise(samples, elapsed)
+    requests = sum(route['requests'] for route in routes.values())
+    return {
+        'concurrency': concurrency,
+        'duration_s': elapsed,
+        'requests': requests,
+        'errors': sum(route['errors'] for route in routes.values()),
+        'throughput_rps': requests / elapsed,
+        'routes': routes,
+    }
+
+def run_level(base_url, mix, sizes, concurrency, duration, warmup):
+    return asyncio.run(_run_level(base_url, mix, sizes, concurrency, duration, warmup))
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def _serve_fake(port, latency_ms, patients, sessions_per_patient, ready):
+    seed(patients, sessions_per_patient)
+    fake_postgrest.serve(port=port, latency_ms=latency_ms)
+    ready.put(port)
+    threading.Event().wait()
+
+def _serve_app(mode, fake_port, ready):
+    os.environ['SUPABASE_URL'] = f'http://127.0.0.1:{fake_port}'
+    # postgrest-py accepts any key, but keep it JWT-shaped like a real anon key
+    os.environ.setdefault('SUPABASE_KEY', 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark')
+    os.environ.setdefault('JWT_SECRET', 'benchmark-secret')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # The dev server logs every request line at INFO
+    os.environ.setdefault('LOG_LEVELS', 'werkzeug=WARNING')
+    if mode == 'asgi':
+        import socket
+        import uvicorn
+        import asgi
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(asgi.app, host='127.0.0.1', port=port, log_level='warning'))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+    else:
+        from werkzeug.serving import make_server
+        import main
+
+        server = make_server('127.0.0.1', 0, main.app, threaded=True)
+        port = server.port
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    ready.put(port)
+    threading.Event().wait()
+
+def run(args):
+    mix = parse_mix(args.mix)
+    # The fake, the app and the load generator each get their own process
+    # (and GIL), so the client side does not slow the server it measures
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    processes = [context.Process(target=_serve_fake, daemon=True,
+                                 args=(args.fake_port, args.latency_ms, args.patients,
+                                       args.sessions_per_patient, ready))]
+    processes[0].start()
+    ready.get(timeout=30)
+    processes.append(context.Process(target=_serve_app, args=(args.mode, args.fake_port, ready), daemon=True))
+    processes[1].start()
+    base_url = f'http://127.0.0.1:{ready.get(timeout=60)}'
+    sizes = {'users': args.patients + 1, 'sessions': args.patients * args.sessions_per_patient}
+    levels = []
+    try:
+        for concurrency in args.concurrency:
+            level = run_level(base_url, mix, sizes, concurrency, args.duration, args.warmup)
+            levels.append(level)
+            print(f"concurrency {concurrency:>4}: {level['throughput_rps']:9.1f} req/s, "
+                  f"{level['errors']} errors", file=sys.stderr)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+    return {
+        'label': args.label or f"{_commit()}-{args.mode}",
+        'commit': _commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'mode': args.mode,
+            'latency_ms': args.latency_ms,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'mix': mix,
+            'patients': args.patients,
+            'sessions_per_patient': args.sessions_per_patient,
+        },
+        'levels': levels,
+    }
+
+def _pct_change(old, new):
+    if not old:
+        return '    n/a'
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+def compare(base, head):
+    print(f"{base['label']} -> {head['label']}")
+    base_levels = {level['concurrency']: level for level in base['levels']}
+    for level in head['levels']:
+        old = base_levels.get(level['concurrency'])
+        if old is None:
+            continue
+        print(f"\nconcurrency {level['concurrency']}: {old['throughput_rps']:.1f} -> "
+              f"{level['throughput_rps']:.1f} req/s ({_pct_change(old['throughput_rps'], level['throughput_rps'])})")
+        for name, route in level['routes'].items():
+            before = old['routes'].get(name)
+            if before is None:
+                continue
+            print(f"  {name:<16} p50 {before['p50_ms']:8.2f} -> {route['p50_ms']:8.2f} ms "
+                  f"({_pct_change(before['p50_ms'], route['p50_ms'])})   "
+                  f"p99 {before['p99_ms']:8.2f} -> {route['p99_ms']:8.2f} ms "
+                  f"({_pct_change(before['p99_ms'], route['p99_ms'])})")
+
+def _print_table(result):
+    for level in result['levels']:
+        print(f"\nconcurrency {level['concurrency']}: {level['throughput_rps']:.1f} req/s, "
+              f"{level['requests']} requests, {level['errors']} errors")
+        print(f"  {'route':<16} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name, route in level['routes'].items():
+            print(f"  {name:<16} {route['throughput_rps']:9.1f} {route['p50_ms']:9.2f} "
+                  f"{route['p95_ms']:9.2f} {route['p99_ms']:9.2f} {route['errors']:7d}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test main.app against an in-memory PostgREST')
+    parser.add_argument('--concurrency', type=lambda v: [int(c) for c in v.split(',')], default=[1, 8, 32],
+                        help='comma separated counts of simulated users, one run each')
+    parser.add_argument('--duration', type=float, default=10, help='measured seconds per level')
+    parser.add_argument('--warmup', type=float, default=2, help='unmeasured seconds before each level')
+    parser.add_argument('--latency-ms', type=float, default=5, help='simulated PostgREST round trip')
+    parser.add_argument('--mode', choices=('wsgi', 'asgi'), default='wsgi',
+                        help='serve main.app threaded (wsgi) or asgi.app under uvicorn')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='scenario=weight pairs')
+    parser.add_argument('--patients', type=int, default=500)
+    parser.add_argument('--sessions-per-patient', type=int, default=4)
+    parser.add_argument('--fake-port', type=int, default=54329)
+    parser.add_argument('--label', help='name for this run, defaults to <commit>-<mode>')
+    parser.add_argument('--output', help=f'results file, defaults to {RESULTS_DIR}/<label>.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help='compare two results files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as base_file, open(args.compare[1]) as head_file:
+            compare(json.load(base_file), json.load(head_file))
+        sys.exit(0)
+
+    result = run(args)
+    _print_table(result)
+    output = args.output or os.path.join(RESULTS_DIR, f"{result['label']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as out:
+        json.dump(result, out, indent=2)
+    print(f"\nwrote {output}")
@@ -1,31 +1,83 @@
-from flask import Flask
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
 from routes.patient_routes import app as patient_app
 from routes.doctor_routes import app as doctor_app
 from routes.session_routes import app as session_app
 from routes.report_routes import app as report_app
 from routes.auth_routes import app as auth_app
+from routes.search_routes import app as search_app
+from routes.stats_routes import app as stats_app
+from routes.export_routes import app as export_app
+from services.event_service import event_stats
+from utils.admission import admission_stats, admit_request, release_admission
+from utils.auth import check_secret
+from utils.cache import model_cache
+from utils.cors import CORS_ALLOW_HEADERS, CORS_EXPOSE_HEADERS, CORS_MAX_AGE, CORS_METHODS, CORS_ORIGINS
+from utils.http_cache import conditional_response
+from utils.logging_config import setup_logging
+from utils.metrics import registry, record_request_metrics, start_request_timer
+
+setup_logging()
+check_secret()
 
 app = Flask(__name__)
 
 # Enable CORS for all routes
 CORS(app, 
     resources={r"/*": {
-        "origins": ["http://localhost:8080"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
+        "origins": list(CORS_ORIGINS),
+        "methods": list(CORS_METHODS),
+        "allow_headers": list(CORS_ALLOW_HEADERS),
         "supports_credentials": True,
-        "max_age": 3600
+        "expose_headers": list(CORS_EXPOSE_HEADERS),
+        "max_age": CORS_MAX_AGE
     }},
     automatic_options=True
 )
 
+# Latency and error metrics; registered first so its after_request runs last
+app.before_request(start_request_timer)
+app.after_request(record_request_metrics)
+
+# Concurrency and rate limits for the expensive endpoints; runs before the
+# blueprints' auth hooks so a saturated class answers without any work
+app.before_request(admit_request)
+app.teardown_request(release_admission)
+
+# ETag/Last-Modified validation and gzip/brotli for JSON responses
+app.after_request(conditional_response)
+
 # Register blueprints
 app.register_blueprint(auth_app, url_prefix='/api/auth')
 app.register_blueprint(patient_app, url_prefix='/api/patients')
 app.register_blueprint(doctor_app, url_prefix='/api/doctors')
 app.register_blueprint(session_app, url_prefix='/api/sessions')
 app.register_blueprint(report_app, url_prefix='/api/reports')
+app.register_blueprint(search_app, url_prefix='/api/search')
+app.register_blueprint(stats_app, url_prefix='/api/stats')
+app.register_blueprint(export_app, url_prefix='/api/export')
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'data': model_cache.stats(), 'error': None}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    stats = model_cache.stats()
+    events = event_stats()
+    gauges = {
+        'model_cache_entries': (stats['entries'], 'Entries in the model cache'),
+        'model_cache_hits': (stats['hits'], 'Model cache hits since start'),
+        'model_cache_misses': (stats['misses'], 'Model cache misses since start'),
+        'model_cache_evictions': (stats['evictions'], 'Model cache evictions since start'),
+        'model_cache_coalesced': (stats['coalesced'], 'Cache misses that shared an in-flight read'),
+        'event_stream_subscribers': (events['subscribers'], 'Open session event streams'),
+        'event_stream_channels': (events['channels'], 'Sessions with buffered events')
+    }
+    for route_class, counts in admission_stats().items():
+        gauges[f'admission_{route_class}_active'] = (counts['active'], f'Admitted {route_class} requests running')
+        gauges[f'admission_{route_class}_waiting'] = (counts['waiting'], f'{route_class.capitalize()} requests waiting for a slot')
+    return Response(registry.render(gauges), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(debug=True, port=8000)
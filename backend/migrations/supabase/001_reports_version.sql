@@ -0,0 +1,3 @@
+-- Report version for PATCH edits (compare-and-set on save). Safe to run
+-- more than once. Rows written before it read as version 0.
+alter table reports add column if not exists version integer not null default 0;
@@ -1,21 +1,53 @@
-from utils.supabase_client import init_supabase
+from models.storage import adb, db
+from utils.pagination import DEFAULT_LIMIT, apply_keyset
+from utils.cache import cached, invalidate
+from utils.fields import select_clause
+from utils.metrics import timed_query
 
-supabase = init_supabase()
+# Never the embedded user's password
+DOCTOR_SELECT = select_clause('doctors')
 
-def get_all_doctors():
-    return supabase.table('doctors').select('*, users(*)').execute()
+# Exact row count without fetching the rows
+@timed_query
+def count_doctors():
+    return db.table('doctors').select('id', count='exact').limit(1).execute()
 
+@timed_query
+def get_all_doctors(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
+    query = db.table('doctors').select(select_clause('doctors', fields))
+    return apply_keyset(query, limit, after, filters).execute()
+
+@cached('doctors')
+@timed_query
 def get_doctor_by_id(doctor_id):
-    return supabase.table('doctors').select('*, users(*)').eq('id', doctor_id).execute()
+    return db.table('doctors').select(DOCTOR_SELECT).eq('id', doctor_id).execute()
+
+@cached('doctors')
+@timed_query
+async def get_doctor_by_id_async(doctor_id):
+    return await adb.table('doctors').select(DOCTOR_SELECT).eq('id', doctor_id).execute()
 
+@cached('doctors_by_user')
+@timed_query
 def get_doctor_by_user_id(user_id):
-    return supabase.table('doctors').select('*, users(*)').eq('user_id', user_id).execute()
+    return db.table('doctors').select(DOCTOR_SELECT).eq('user_id', user_id).execute()
 
+@timed_query
 def add_doctor(data):
-    return supabase.table('doctors').insert(data).execute()
+    response = db.table('doctors').insert(data).execute()
+    invalidate('doctors_by_user', data.get('user_id'))
+    return response
 
+@timed_query
 def update_doctor(doctor_id, data):
-    return supabase.table('doctors').update(data).eq('id', doctor_id).execute()
+    response = db.table('doctors').update(data).eq('id', doctor_id).execute()
+    invalidate('doctors', doctor_id)
+    invalidate('doctors_by_user')
+    return response
 
+@timed_query
 def delete_doctor(doctor_id):
-    return supabase.table('doctors').delete().eq('id', doctor_id).execute()
+    response = db.table('doctors').delete().eq('id', doctor_id).execute()
+    invalidate('doctors', doctor_id)
+    invalidate('doctors_by_user')
+    return response
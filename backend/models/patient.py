@@ -1,81 +1,94 @@
-from utils.supabase_client import init_supabase
+from models.storage import adb, db
+from utils.pagination import DEFAULT_LIMIT, apply_keyset, make_page
+from utils.cache import cached, invalidate
+from utils.fields import DEFAULT_FIELDS, RESOURCE_FIELDS, select_clause
+from utils.logging_config import get_sampled_logger
+from utils.metrics import timed_query, timed_section
 import logging
 
-supabase = init_supabase()
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+# Response dumps run on every query, so only a sample is kept
+sampled_logger = get_sampled_logger(__name__)
 
-def get_all_patients():
+PATIENT_SELECT = select_clause('patients')
+
+def _format_patient(patient, fields=None):
+    # Flattens the embedded user columns into the patient record
+    formatted = {}
+    for name in fields or DEFAULT_FIELDS['patients']:
+        embed, _, column = RESOURCE_FIELDS['patients'][name].rpartition('.')
+        formatted[name] = patient[embed][column] if embed else patient[column]
+    return formatted
+
+def _patient_page(response, limit, fields=None):
+    sampled_logger.debug("Get all patients response: %s", response)
+    if not response.data:
+        return {'data': [], 'error': None, 'next_cursor': None}
+
+    rows, next_cursor = make_page(response.data, limit)
+    # Format the response to include user data
+    with timed_section('patients.format'):
+        formatted_data = [_format_patient(patient, fields) for patient in rows]
+
+    return {'data': formatted_data, 'error': None, 'next_cursor': next_cursor}
+
+def _single_patient(response):
+    sampled_logger.debug("Get patient response: %s", response)
+    if not response.data:
+        return {'data': None, 'error': 'Patient not found'}
+    return {'data': _format_patient(response.data[0]), 'error': None}
+
+# Exact row count without fetching the rows
+@timed_query
+def count_patients():
+    return db.table('patients').select('id', count='exact').limit(1).execute()
+
+@timed_query
+def get_all_patients(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
     try:
-        response = supabase.table('patients').select('*, users!inner(*)').execute()
-        logging.debug(f"Get all patients response: {response}")
-        
-        if not response.data:
-            return {'data': [], 'error': None}
-            
-        # Format the response to include user data
-        formatted_data = []
-        for patient in response.data:
-            formatted_patient = {
-                'id': patient['id'],
-                'user_id': patient['user_id'],
-                'date_of_birth': patient['date_of_birth'],
-                'first_name': patient['users']['first_name'],
-                'last_name': patient['users']['last_name'],
-                'email': patient['users']['email']
-            }
-            formatted_data.append(formatted_patient)
-            
-        return {'data': formatted_data, 'error': None}
+        query = db.table('patients').select(select_clause('patients', fields))
+        return _patient_page(apply_keyset(query, limit, after, filters).execute(), limit, fields)
+    except Exception as e:
+        logger.error("Error getting all patients: %s", e)
+        return {'data': None, 'error': str(e)}
+
+@timed_query
+async def get_all_patients_async(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
+    try:
+        query = adb.table('patients').select(select_clause('patients', fields))
+        return _patient_page(await apply_keyset(query, limit, after, filters).execute(), limit, fields)
     except Exception as e:
-        logging.error(f"Error getting all patients: {str(e)}")
+        logger.error("Error getting all patients: %s", e)
         return {'data': None, 'error': str(e)}
 
+@cached('patients')
+@timed_query
 def get_patient_by_id(patient_id):
     try:
-        response = supabase.table('patients').select('*, users!inner(*)').eq('id', patient_id).execute()
-        logging.debug(f"Get patient by id response: {response}")
-        
-        if not response.data:
-            return {'data': None, 'error': 'Patient not found'}
-            
-        patient = response.data[0]
-        formatted_patient = {
-            'id': patient['id'],
-            'user_id': patient['user_id'],
-            'date_of_birth': patient['date_of_birth'],
-            'first_name': patient['users']['first_name'],
-            'last_name': patient['users']['last_name'],
-            'email': patient['users']['email']
-        }
-        
-        return {'data': formatted_patient, 'error': None}
+        return _single_patient(db.table('patients').select(PATIENT_SELECT).eq('id', patient_id).execute())
     except Exception as e:
-        logging.error(f"Error getting patient by id: {str(e)}")
+        logger.error("Error getting patient by id: %s", e)
         return {'data': None, 'error': str(e)}
 
+@cached('patients')
+@timed_query
+async def get_patient_by_id_async(patient_id):
+    try:
+        return _single_patient(await adb.table('patients').select(PATIENT_SELECT).eq('id', patient_id).execute())
+    except Exception as e:
+        logger.error("Error getting patient by id: %s", e)
+        return {'data': None, 'error': str(e)}
+
+@cached('patients_by_user')
+@timed_query
 def get_patient_by_user_id(user_id):
     try:
-        response = supabase.table('patients').select('*, users!inner(*)').eq('user_id', user_id).execute()
-        logging.debug(f"Get patient by user id response: {response}")
-        
-        if not response.data:
-            return {'data': None, 'error': 'Patient not found'}
-            
-        patient = response.data[0]
-        formatted_patient = {
-            'id': patient['id'],
-            'user_id': patient['user_id'],
-            'date_of_birth': patient['date_of_birth'],
-            'first_name': patient['users']['first_name'],
-            'last_name': patient['users']['last_name'],
-            'email': patient['users']['email']
-        }
-        
-        return {'data': formatted_patient, 'error': None}
+        return _single_patient(db.table('patients').select(PATIENT_SELECT).eq('user_id', user_id).execute())
     except Exception as e:
-        logging.error(f"Error getting patient by user id: {str(e)}")
+        logger.error("Error getting patient by user id: %s", e)
         return {'data': None, 'error': str(e)}
 
+@timed_query
 def add_patient(data):
     try:
         # Remove fields that don't exist in the database schema
@@ -93,7 +106,7 @@ def add_patient(data):
             'last_name': data.get('last_name')
         }
         
-        user_response = supabase.table('users').insert(user_data).execute()
+        user_response = db.table('users').insert(user_data).execute()
         if not user_response.data:
             raise Exception("Failed to create user")
             
@@ -103,27 +116,42 @@ def add_patient(data):
             'date_of_birth': data.get('dob') or '1900-01-01'  # Provide a default date if not specified
         }
         
-        response = supabase.table('patients').insert(patient_data).execute()
-        logging.debug(f"Add patient response: {response}")
+        response = db.table('patients').insert(patient_data).execute()
+        invalidate('patients_by_user', patient_data['user_id'])
+        sampled_logger.debug("Add patient response: %s", response)
         return response
     except Exception as e:
-        logging.error(f"Error adding patient: {str(e)}")
+        logger.error("Error adding patient: %s", e)
         raise
 
+# Patient rows for users that already exist, in one round trip
+@timed_query
+def add_patients(rows):
+    response = db.table('patients').insert(rows).execute()
+    for row in rows:
+        invalidate('patients_by_user', row['user_id'])
+    return response
+
+@timed_query
 def update_patient(patient_id, data):
     try:
-        response = supabase.table('patients').update(data).eq('id', patient_id).execute()
-        logging.debug(f"Update patient response: {response}")
+        response = db.table('patients').update(data).eq('id', patient_id).execute()
+        invalidate('patients', patient_id)
+        invalidate('patients_by_user')
+        sampled_logger.debug("Update patient response: %s", response)
         return response
     except Exception as e:
-        logging.error(f"Error updating patient: {str(e)}")
+        logger.error("Error updating patient: %s", e)
         raise
 
+@timed_query
 def delete_patient(patient_id):
     try:
-        response = supabase.table('patients').delete().eq('id', patient_id).execute()
-        logging.debug(f"Delete patient response: {response}")
+        response = db.table('patients').delete().eq('id', patient_id).execute()
+        invalidate('patients', patient_id)
+        invalidate('patients_by_user')
+        sampled_logger.debug("Delete patient response: %s", response)
         return response
     except Exception as e:
-        logging.error(f"Error deleting patient: {str(e)}")
+        logger.error("Error deleting patient: %s", e)
         raise
@@ -1,18 +1,123 @@
-from utils.supabase_client import init_supabase
+import logging
 
-supabase = init_supabase()
+from postgrest.exceptions import APIError
 
-def get_all_reports():
-    return supabase.table('reports').select('*').execute()
+from models.storage import adb, db
+from utils.pagination import DEFAULT_LIMIT, apply_keyset, apply_watermark
+from utils.cache import cached, invalidate
+from utils.fields import select_clause
+from utils.metrics import timed_query
 
+# Free-text columns clinicians edit
+REPORT_TEXT_FIELDS = ('summary', 'symptoms', 'medications', 'followups', 'notes')
+
+logger = logging.getLogger(__name__)
+
+# Supabase projects that have not run migrations/supabase/001_reports_version.sql
+# have no reports.version. Writes then leave it out and PATCH saves are not
+# version-checked, rather than every report write failing.
+_schema = {'version': True}
+
+def _version_missing(error):
+    if not isinstance(error, APIError) or error.code not in ('PGRST204', '42703'):
+        return False
+    if 'version' not in (error.message or ''):
+        return False
+    if _schema['version']:
+        logger.warning("reports.version is missing; run migrations/supabase/001_reports_version.sql")
+        _schema['version'] = False
+    return True
+
+def _versioned(run, data):
+    # Runs a write, without the version column when the table has none
+    if not _schema['version']:
+        return run({name: value for name, value in data.items() if name != 'version'})
+    try:
+        return run(data)
+    except APIError as e:
+        if 'version' not in data or not _version_missing(e):
+            raise
+    return run({name: value for name, value in data.items() if name != 'version'})
+
+@timed_query
+def get_all_reports(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
+    query = db.table('reports').select(select_clause('reports', fields))
+    return apply_keyset(query, limit, after, filters).execute()
+
+@timed_query
+def get_reports_changed_since(after, limit, fields=None):
+    query = db.table('reports').select(select_clause('reports', fields))
+    return apply_watermark(query, limit, after).execute()
+
+@cached('reports')
+@timed_query
 def get_report_by_id(report_id):
-    return supabase.table('reports').select('*').eq('id', report_id).execute()
+    return db.table('reports').select('*').eq('id', report_id).execute()
+
+@cached('reports')
+@timed_query
+async def get_report_by_id_async(report_id):
+    return await adb.table('reports').select('*').eq('id', report_id).execute()
+
+# Uncached: edits are checked against the version in the database
+@timed_query
+def get_report_for_update(report_id):
+    def run(columns):
+        return db.table('reports').select(','.join(columns)).eq('id', report_id).execute()
+    columns = ('id', 'session_id') + REPORT_TEXT_FIELDS
+    if not _schema['version']:
+        return run(columns)
+    try:
+        return run(columns + ('version',))
+    except APIError as e:
+        if not _version_missing(e):
+            raise
+    return run(columns)
 
+@cached('reports_by_session')
+@timed_query
+def get_report_by_session_id(session_id):
+    return db.table('reports').select('*').eq('session_id', session_id).execute()
+
+@cached('reports_by_session')
+@timed_query
+async def get_report_by_session_id_async(session_id):
+    return await adb.table('reports').select('*').eq('session_id', session_id).execute()
+
+@timed_query
 def add_report(data):
-    return supabase.table('reports').insert(data).execute()
+    response = _versioned(lambda row: db.table('reports').insert(row).execute(), data)
+    invalidate('reports_by_session', data.get('session_id'))
+    return response
 
+@timed_query
 def update_report(report_id, data):
-    return supabase.table('reports').update(data).eq('id', report_id).execute()
+    response = _versioned(lambda row: db.table('reports').update(row).eq('id', report_id).execute(), data)
+    invalidate('reports', report_id)
+    invalidate('reports_by_session')
+    return response
 
+@timed_query
 def delete_report(report_id):
-    return supabase.table('reports').delete().eq('id', report_id).execute()
+    response = db.table('reports').delete().eq('id', report_id).execute()
+    invalidate('reports', report_id)
+    invalidate('reports_by_session')
+    return response
+
+# Compare-and-set on version: no rows come back when another writer got
+# there first. Rows written before versioning have a NULL version, read as 0.
+@timed_query
+def update_report_version(report_id, data, expected_version):
+    def run(row):
+        query = db.table('reports').update(row).eq('id', report_id)
+        if 'version' not in row:
+            return query.execute()
+        if expected_version:
+            query = query.eq('version', expected_version)
+        else:
+            query = query.or_('version.is.null,version.eq.0')
+        return query.execute()
+    response = _versioned(run, data)
+    invalidate('reports', report_id)
+    invalidate('reports_by_session')
+    return response
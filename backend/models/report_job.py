@@ -0,0 +1,14 @@
+from models.storage import db
+from utils.metrics import timed_query
+
+@timed_query
+def get_report_job_by_id(job_id):
+    return db.table('report_jobs').select('*').eq('id', job_id).execute()
+
+@timed_query
+def add_report_job(data):
+    return db.table('report_jobs').insert(data).execute()
+
+@timed_query
+def update_report_job(job_id, data):
+    return db.table('report_jobs').update(data).eq('id', job_id).execute()
@@ -1,18 +1,80 @@
-from utils.supabase_client import init_supabase
+from models.storage import adb, db
+from utils.pagination import DEFAULT_LIMIT, apply_keyset, apply_watermark
+from utils.cache import cached, invalidate
+from utils.fields import select_clause
+from utils.metrics import timed_query
 
-supabase = init_supabase()
+@timed_query
+def get_all_sessions(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
+    query = db.table('sessions').select(select_clause('sessions', fields))
+    return apply_keyset(query, limit, after, filters).execute()
 
-def get_all_sessions():
-    return supabase.table('sessions').select('*').execute()
+@timed_query
+def get_sessions_changed_since(after, limit, fields=None):
+    query = db.table('sessions').select(select_clause('sessions', fields))
+    return apply_watermark(query, limit, after).execute()
 
+# Which of the given sessions, or sessions of the given patients, were with
+# a doctor; scopes exports of tables that have no doctor_id of their own
+@timed_query
+def get_doctor_session_ids(doctor_id, session_ids):
+    return db.table('sessions').select('id').eq('doctor_id', doctor_id).in_('id', session_ids).execute()
+
+@timed_query
+def get_doctor_patient_ids(doctor_id, patient_ids):
+    return (db.table('sessions').select('patient_id')
+            .eq('doctor_id', doctor_id).in_('patient_id', patient_ids).execute())
+
+# Newest first, keyed on (created_at, id). Reports and transcript summaries
+# are embedded so a patient's history is a single round trip.
+TIMELINE_SELECT = (
+    '*, '
+    'reports(id, summary, updated_at), '
+    'transcript_segments(count), '
+    'first_segment:transcript_segments(text, start_ms)'
+)
+
+def _timeline_query(client, patient_id, limit, before):
+    query = client.table('sessions').select(TIMELINE_SELECT).eq('patient_id', patient_id)
+    if before:
+        created_at, session_id = before
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{session_id})')
+    return (query.order('created_at', desc=True)
+            .order('id', desc=True)
+            .order('start_ms', foreign_table='first_segment')
+            .limit(1, foreign_table='first_segment')
+            .limit(limit + 1))
+
+@timed_query
+def get_patient_timeline(patient_id, limit=DEFAULT_LIMIT, before=None):
+    return _timeline_query(db, patient_id, limit, before).execute()
+
+@timed_query
+async def get_patient_timeline_async(patient_id, limit=DEFAULT_LIMIT, before=None):
+    return await _timeline_query(adb, patient_id, limit, before).execute()
+
+@cached('sessions')
+@timed_query
 def get_session_by_id(session_id):
-    return supabase.table('sessions').select('*').eq('id', session_id).execute()
+    return db.table('sessions').select('*').eq('id', session_id).execute()
+
+@cached('sessions')
+@timed_query
+async def get_session_by_id_async(session_id):
+    return await adb.table('sessions').select('*').eq('id', session_id).execute()
 
+@timed_query
 def add_session(data):
-    return supabase.table('sessions').insert(data).execute()
+    return db.table('sessions').insert(data).execute()
 
+@timed_query
 def update_session(session_id, data):
-    return supabase.table('sessions').update(data).eq('id', session_id).execute()
+    response = db.table('sessions').update(data).eq('id', session_id).execute()
+    invalidate('sessions', session_id)
+    return response
 
+@timed_query
 def delete_session(session_id):
-    return supabase.table('sessions').delete().eq('id', session_id).execute()
+    response = db.table('sessions').delete().eq('id', session_id).execute()
+    invalidate('sessions', session_id)
+    return response
@@ -0,0 +1,37 @@
+import os
+
+from models.storage.sqlite_backend import get_async_sqlite, get_sqlite
+from utils.supabase_client import get_async_supabase, get_supabase
+
+# Both backends expose the postgrest-py query builder interface:
+# db.table(name).select(...).eq(...).order(...).limit(...).execute()
+# adb is the same builder with an awaitable execute(), for the ASGI app
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'supabase')
+
+BACKENDS = {
+    'supabase': (get_supabase, get_async_supabase),
+    'sqlite': (get_sqlite, get_async_sqlite),
+}
+
+def _backend():
+    try:
+        return BACKENDS[STORAGE_BACKEND]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+
+def get_storage():
+    return _backend()[0]()
+
+def get_async_storage():
+    return _backend()[1]()
+
+class _LazyStorage:
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+# Process-wide storage clients for the configured backend, created on first use
+db = _LazyStorage(get_storage)
+adb = _LazyStorage(get_async_storage)
@@ -0,0 +1,562 @@
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from postgrest.exceptions import APIError
+
+from utils.postgrest_syntax import parse_in, parse_logic, parse_select, singular, unquote, utc_now
+
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'mediscribe.db')
+SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', 8))
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 30))
+
+# Mirrors the Supabase tables the models use. Lookups by email, user_id,
+# patient_id and session_id are all indexed; the sessions index also covers
+# the timeline's (created_at, id) keyset.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    password TEXT,
+    role TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_idx ON users (email);
+
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    date_of_birth TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS patients_user_id_idx ON patients (user_id);
+
+CREATE TABLE IF NOT EXISTS doctors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS doctors_user_id_idx ON doctors (user_id);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_id INTEGER,
+    doctor_id INTEGER,
+    status TEXT,
+    notes TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_patient_id_idx ON sessions (patient_id, created_at, id);
+CREATE INDEX IF NOT EXISTS sessions_doctor_id_idx ON sessions (doctor_id);
+
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER,
+    summary TEXT,
+    symptoms TEXT,
+    medications TEXT,
+    followups TEXT,
+    notes TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS reports_session_id_idx ON reports (session_id);
+
+CREATE TABLE IF NOT EXISTS transcript_segments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    segment_index INTEGER,
+    start_ms INTEGER,
+    end_ms INTEGER,
+    text TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS transcript_segments_session_id_idx ON transcript_segments (session_id, start_ms);
+
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id TEXT PRIMARY KEY,
+    session_id INTEGER,
+    status TEXT,
+    progress INTEGER,
+    report_id INTEGER,
+    error TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS report_jobs_session_id_idx ON report_jobs (session_id);
+"""
+
+_OPERATORS = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+def _error(message, code):
+    return APIError({'message': message, 'code': code, 'hint': None, 'details': None})
+
+def _parse_select(select):
+    try:
+        return parse_select(select)
+    except ValueError as e:
+        raise _error(str(e), 'PGRST100')
+
+class StorageResponse:
+    # The parts of postgrest's APIResponse the services read
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+    def __repr__(self):
+        return f"data={self.data!r} count={self.count!r}"
+
+class SQLiteQuery:
+    # Implements the subset of the postgrest-py request builder used by the
+    # models, so they run unchanged against either backend
+    def __init__(self, client, table):
+        if table not in client.columns:
+            raise _error(f"Could not find the table '{table}' in the schema cache", '42P01')
+        self._client = client
+        self._table = table
+        self._action = 'select'
+        self._select = '*'
+        self._payload = None
+        self._count = None
+        self._where = []
+        self._options = {}
+        self._negate_next = False
+
+    def select(self, *columns, count=None, head=None):
+        self._action = 'select'
+        self._select = ','.join(columns) or '*'
+        self._count = count
+        return self
+
+    def insert(self, json, count=None, returning=None, upsert=False, default_to_null=True):
+        self._action = 'insert'
+        self._payload = json
+        return self
+
+    def update(self, json, count=None, returning=None):
+        self._action = 'update'
+        self._payload = json
+        return self
+
+    def delete(self, count=None, returning=None):
+        self._action = 'delete'
+        return self
+
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def filter(self, column, operator, criteria):
+        negate = self._negate_next
+        self._negate_next = False
+        if operator.startswith('not.'):
+            negate, operator = not negate, operator[4:]
+        self._where.append(self._client.condition(self._table, column, operator, criteria, negate))
+        return self
+
+    def eq(self, column, value):
+        return self.filter(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self.filter(column, 'neq', value)
+
+    def gt(self, column, value):
+        return self.filter(column, 'gt', value)
+
+    def gte(self, column, value):
+        return self.filter(column, 'gte', value)
+
+    def lt(self, column, value):
+        return self.filter(column, 'lt', value)
+
+    def lte(self, column, value):
+        return self.filter(column, 'lte', value)
+
+    def like(self, column, pattern):
+        return self.filter(column, 'like', pattern)
+
+    def ilike(self, column, pattern):
+        return self.filter(column, 'ilike', pattern)
+
+    def is_(self, column, value):
+        return self.filter(column, 'is', value)
+
+    def in_(self, column, values):
+        return self.filter(column, 'in', list(values))
+
+    def or_(self, filters, reference_table=None):
+        if reference_table:
+            raise _error('Filters on embedded resources are not supported', 'PGRST100')
+        self._where.append(self._client.logic(self._table, filters, 'or'))
+        return self
+
+    def order(self, column, *, desc=False, nullsfirst=None, foreign_table=None):
+        options = self._options.setdefault(foreign_table or '', {})
+        options.setdefault('order', []).append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, size, *, foreign_table=None):
+        self._options.setdefault(foreign_table or '', {})['limit'] = int(size)
+        return self
+
+    def offset(self, size):
+        self._options.setdefault('', {})['offset'] = int(size)
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        options = self._options.setdefault(foreign_table or '', {})
+        options['offset'] = int(start)
+        options['limit'] = int(end) - int(start) + 1
+        return self
+
+    def execute(self):
+        return self._client.execute(self)
+
+class AsyncSQLiteQuery(SQLiteQuery):
+    # Local queries are short; run them off the event loop rather than on it
+    async def execute(self):
+        return await asyncio.to_thread(self._client.execute, self)
+
+class AsyncSQLiteClient:
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return AsyncSQLiteQuery(self._client, name)
+
+    from_ = table
+
+# Columns added after the first release, with their definitions. CREATE
+# TABLE IF NOT EXISTS leaves older database files as they were, so these
+# are added on open when missing.
+MIGRATIONS = (
+    ('reports', 'version', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+def _migrate(conn):
+    for table, column, definition in MIGRATIONS:
+        existing = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+        if column in existing:
+            continue
+        try:
+            conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {definition}')
+        except sqlite3.OperationalError as e:
+            # Another process opening the same file got there first
+            if 'duplicate column' not in str(e):
+                raise
+    conn.commit()
+
+class SQLiteClient:
+    def __init__(self, path=SQLITE_PATH, pool_size=SQLITE_POOL_SIZE):
+        self.path = path
+        # An in-memory database only exists on its own connection, so every
+        # thread shares one behind a lock; files get a pool of connections
+        self._memory = path == ':memory:'
+        self._shared = None
+        self._shared_lock = threading.Lock()
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self.columns = {}
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            _migrate(conn)
+            tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            for table in tables:
+                if not table.startswith('sqlite_'):
+                    self.columns[table] = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+    def _connect(self):
+        # Pooled connections move between threads but are only ever used by one at a time
+        conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # PostgREST's like is case sensitive; ilike is handled with lower()
+        conn.execute('PRAGMA case_sensitive_like = ON')
+        if not self._memory:
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        if self._memory:
+            with self._shared_lock:
+                if self._shared is None:
+                    self._shared = self._connect()
+                yield self._shared
+            return
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def table(self, name):
+        return SQLiteQuery(self, name)
+
+    from_ = table
+
+    def _column(self, table, column):
+        if column not in self.columns[table]:
+            if '.' in column:
+                raise _error('Filters on embedded resources are not supported', 'PGRST100')
+            raise _error(f"column {table}.{column} does not exist", '42703')
+        return f'"{column}"'
+
+    def condition(self, table, column, operator, value, negate=False):
+        column_sql = self._column(table, column)
+        value = unquote(value)
+        if operator == 'in':
+            value = parse_in(value)
+            sql, params = f"{column_sql} IN ({', '.join('?' * len(value))})", list(value)
+        elif operator == 'is':
+            literal = {None: 'NULL', 'null': 'NULL', True: '1', 'true': '1', False: '0', 'false': '0'}.get(value)
+            if literal is None:
+                raise _error(f"Invalid is value: {value}", 'PGRST100')
+            sql, params = f"{column_sql} IS {literal}", []
+        elif operator == 'like':
+            sql, params = f"{column_sql} LIKE ?", [str(value).replace('*', '%')]
+        elif operator == 'ilike':
+            sql, params = f"lower({column_sql}) LIKE lower(?)", [str(value).replace('*', '%')]
+        elif operator in _OPERATORS:
+            sql, params = f"{column_sql} {_OPERATORS[operator]} ?", [value]
+        else:
+            raise _error(f"Unsupported operator: {operator}", 'PGRST100')
+        if negate:
+            sql = f"NOT ({sql})"
+        return sql, params
+
+    def logic(self, table, text, conjunction):
+        return self._group(table, parse_logic(text, conjunction))
+
+    def _group(self, table, group):
+        parts, params = [], []
+        for term in group['terms']:
+            if 'terms' in term:
+                sql, term_params = self._group(table, term)
+            else:
+                sql, term_params = self.condition(table, term['column'], term['operator'], term['value'],
+                                                  term['negate'])
+            parts.append(sql)
+            params.extend(term_params)
+        sql = '(' + f" {group['conjunction'].upper()} ".join(parts) + ')'
+        return (f"NOT {sql}" if group['negate'] else sql), params
+
+    def _relation(self, table, relation):
+        if relation not in self.columns:
+            raise _error(f"Could not find a relationship between '{table}' and '{relation}'", 'PGRST200')
+        foreign_key = f"{singular(relation)}_id"
+        if foreign_key in self.columns[table]:
+            return 'one', foreign_key
+        back_key = f"{singular(table)}_id"
+        if back_key in self.columns[relation]:
+            return 'many', back_key
+        raise _error(f"Could not find a relationship between '{table}' and '{relation}'", 'PGRST200')
+
+    def _order_sql(self, table, orders):
+        terms = []
+        for column, desc, nullsfirst in orders or []:
+            # Postgres sorts NULLs as larger than any value unless told otherwise
+            nulls_first = desc if nullsfirst is None else nullsfirst
+            terms.append(f"{self._column(table, column)} {'DESC' if desc else 'ASC'} "
+                         f"NULLS {'FIRST' if nulls_first else 'LAST'}")
+        return f" ORDER BY {', '.join(terms)}" if terms else ''
+
+    def select_rows(self, conn, table, select, where, options, path='', keys=(), partition=None):
+        columns, embeds = _parse_select(select)
+        where = list(where)
+        relations = []
+        for embed in embeds:
+            kind, key = self._relation(table, embed['relation'])
+            relations.append((embed, kind, key))
+            if embed['inner']:
+                # Applied in SQL so limit and offset only count matching rows
+                if kind == 'one':
+                    where.append((f'EXISTS (SELECT 1 FROM "{embed["relation"]}" AS e '
+                                  f'WHERE e."id" = "{table}"."{key}")', []))
+                else:
+                    where.append((f'EXISTS (SELECT 1 FROM "{embed["relation"]}" AS e '
+                                  f'WHERE e."{key}" = "{table}"."id")', []))
+
+        expressions = []
+        for alias, column in columns:
+            expressions.append(f'"{table}".*' if column == '*' else f'{self._column(table, column)} AS "{alias}"')
+        helpers = set(keys) | {key if kind == 'one' else 'id' for _, kind, key in relations}
+        expressions.extend(f'{self._column(table, key)} AS "_key_{key}"' for key in sorted(helpers))
+
+        clause = ' AND '.join(sql for sql, _ in where)
+        params = [param for _, item_params in where for param in item_params]
+        options_here = options.get(path, {})
+        sql = f'SELECT {", ".join(expressions)} FROM "{table}"' + (f' WHERE {clause}' if clause else '')
+        order_sql = self._order_sql(table, options_here.get('order'))
+        limit = options_here.get('limit')
+        if partition and limit is not None:
+            # Per-parent limit for embedded children
+            sql = (f'SELECT * FROM (SELECT {", ".join(expressions)}, ROW_NUMBER() OVER '
+                   f'(PARTITION BY "{partition}"{order_sql}) AS _row FROM "{table}"'
+                   + (f' WHERE {clause}' if clause else '')
+                   + f') WHERE _row <= ? ORDER BY "_key_{partition}", _row')
+            params.append(limit)
+        else:
+            sql += order_sql
+            if not partition and (limit is not None or options_here.get('offset')):
+                sql += ' LIMIT ? OFFSET ?'
+                params.extend([-1 if limit is None else limit, options_here.get('offset', 0)])
+        rows = [dict(row) for row in conn.execute(sql, params)]
+        for row in rows:
+            row.pop('_row', None)
+
+        for embed, kind, key in relations:
+            self._attach(conn, table, rows, embed, kind, key, options, path)
+        own = helpers - set(keys)
+        for row in rows:
+            for key in own:
+                row.pop(f'_key_{key}', None)
+        return rows
+
+    def _attach(self, conn, table, rows, embed, kind, key, options, path):
+        alias, relation = embed['alias'], embed['relation']
+        child_path = f"{path}.{alias}" if path else alias
+        local = f"_key_{key if kind == 'one' else 'id'}"
+        ids = sorted({row[local] for row in rows if row[local] is not None})
+        remote = 'id' if kind == 'one' else key
+        in_clause = (f'"{relation}"."{remote}" IN ({", ".join("?" * len(ids))})', ids)
+
+        if kind == 'many' and embed['select'] == 'count':
+            counts = {}
+            if ids:
+                counts = dict(conn.execute(
+                    f'SELECT "{key}", COUNT(*) FROM "{relation}" WHERE {in_clause[0]} GROUP BY "{key}"', ids))
+            for row in rows:
+                row[alias] = [{'count': counts.get(row[local], 0)}]
+            return
+
+        children = self.select_rows(conn, relation, embed['select'], [in_clause], options, child_path,
+                                    keys=(remote,), partition=remote if kind == 'many' else None) if ids else []
+        grouped = {}
+        for child in children:
+            grouped.setdefault(child.pop(f'_key_{remote}'), []).append(child)
+        for row in rows:
+            matches = grouped.get(row[local], [])
+            row[alias] = (matches[0] if matches else None) if kind == 'one' else matches
+
+    def _write_columns(self, table, record):
+        for column in record:
+            if column not in self.columns[table]:
+                raise _error(f"Could not find the '{column}' column of '{table}' in the schema cache", 'PGRST204')
+        return ', '.join(f'"{column}"' for column in record)
+
+    def execute(self, query):
+        table = query._table
+        where = query._where
+        clause = ' AND '.join(sql for sql, _ in where)
+        params = [param for _, item_params in where for param in item_params]
+        with self.connection() as conn:
+            if query._action == 'select':
+                data = self.select_rows(conn, table, query._select, where, query._options)
+                count = None
+                if query._count:
+                    count = conn.execute(f'SELECT COUNT(*) FROM "{table}"'
+                                         + (f' WHERE {clause}' if clause else ''), params).fetchone()[0]
+                return StorageResponse(data, count)
+            if query._action in ('update', 'delete') and not clause:
+                # Same guard Supabase applies to unfiltered writes
+                raise _error(f"{query._action.upper()} requires a WHERE clause", '21000')
+            try:
+                with conn:
+                    data = self._write(conn, query, clause, params)
+            except sqlite3.IntegrityError as e:
+                code = '23505' if 'UNIQUE' in str(e) else '23502' if 'NOT NULL' in str(e) else '23000'
+                raise _error(str(e), code)
+        return StorageResponse(data, len(data))
+
+    def _write(self, conn, query, clause, params):
+        table = query._table
+        now = utc_now()
+        if query._action == 'insert':
+            records = query._payload if isinstance(query._payload, list) else [query._payload]
+            rows = []
+            for record in records:
+                record = dict(record)
+                for column in ('created_at', 'updated_at'):
+                    if column in self.columns[table]:
+                        record.setdefault(column, now)
+                names = self._write_columns(table, record)
+                placeholders = ', '.join('?' * len(record))
+                cursor = conn.execute(f'INSERT INTO "{table}" ({names}) VALUES ({placeholders}) RETURNING *',
+                                      list(record.values()))
+                rows.append(dict(cursor.fetchone()))
+            return rows
+        if query._action == 'update':
+            changes = dict(query._payload)
+            if 'updated_at' in self.columns[table]:
+                changes.setdefault('updated_at', now)
+            self._write_columns(table, changes)
+            assignments = ', '.join(f'"{column}" = ?' for column in changes)
+            cursor = conn.execute(f'UPDATE "{table}" SET {assignments} WHERE {clause} RETURNING *',
+                                  list(changes.values()) + params)
+            return [dict(row) for row in cursor.fetchall()]
+        cursor = conn.execute(f'DELETE FROM "{table}" WHERE {clause} RETURNING *', params)
+        return [dict(row) for row in cursor.fetchall()]
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+def get_sqlite():
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = SQLiteClient()
+                _client_pid = pid
+    return _client
+
+def get_async_sqlite():
+    return AsyncSQLiteClient(get_sqlite())
+
+def close_sqlite():
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+def _reset_after_fork():
+    # Connections must not be shared with a forked worker
+    global _client, _client_pid, _lock
+    _client = None
+    _client_pid = None
+    _lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,39 @@
+from models.storage import db
+from utils.metrics import timed_query
+from utils.pagination import DEFAULT_LIMIT, apply_keyset
+
+# Segments are only ever inserted (a new transcription deletes the old
+# ones first), so an id cursor sees every new row
+@timed_query
+def get_all_transcript_segments(limit=DEFAULT_LIMIT, after=None, filters=None):
+    return apply_keyset(db.table('transcript_segments').select('*'), limit, after, filters).execute()
+
+@timed_query
+def get_transcript_segments(session_id):
+    return db.table('transcript_segments').select('*').eq('session_id', session_id).order('start_ms').execute()
+
+# Range reads walk the (session_id, start_ms) index, so their cost depends
+# on the window asked for, not on the length of the recording
+@timed_query
+def get_transcript_window(session_id, start_ms, end_ms=None, limit=DEFAULT_LIMIT):
+    query = db.table('transcript_segments').select('*').eq('session_id', session_id).gte('start_ms', start_ms)
+    if end_ms is not None:
+        query = query.lt('start_ms', end_ms)
+    return query.order('start_ms').limit(limit).execute()
+
+# The segment starting before a window, which may run into it; the last
+# segment when start_ms is None
+@timed_query
+def get_transcript_segment_before(session_id, start_ms=None):
+    query = db.table('transcript_segments').select('*').eq('session_id', session_id)
+    if start_ms is not None:
+        query = query.lt('start_ms', start_ms)
+    return query.order('start_ms', desc=True).limit(1).execute()
+
+@timed_query
+def add_transcript_segments(segments):
+    return db.table('transcript_segments').insert(segments).execute()
+
+@timed_query
+def delete_transcript_segments(session_id):
+    return db.table('transcript_segments').delete().eq('session_id', session_id).execute()
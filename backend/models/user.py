@@ -1,47 +1,85 @@
-from utils.supabase_client import init_supabase
+from models.storage import adb, db
+import hmac
+from utils.cache import cached, invalidate
 import logging
+from utils.metrics import timed_query
 
-supabase = init_supabase()
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
+@timed_query
 def get_all_users():
-    return supabase.table('users').select('*').execute()
+    return db.table('users').select('*').execute()
 
+@cached('users')
+@timed_query
 def get_user_by_id(user_id):
-    return supabase.table('users').select('*').eq('id', user_id).execute()
+    return db.table('users').select('*').eq('id', user_id).execute()
 
+# Uncached: login must check the password as it is now, not as another
+# worker last saw it
+@timed_query
 def get_user_by_email(email):
-    return supabase.table('users').select('*').eq('email', email).execute()
+    return db.table('users').select('*').eq('email', email).execute()
 
+@timed_query
+async def get_user_by_email_async(email):
+    return await adb.table('users').select('*').eq('email', email).execute()
+
+@timed_query
 def create_user(email, password, role):
     try:
-        logging.debug(f"Creating user with email: {email}")
-        return supabase.table('users').insert({
+        logger.debug("Creating user with email: %s", email)
+        response = db.table('users').insert({
             'email': email,
             'password': password,
             'role': role
         }).execute()
+        return response
     except Exception as e:
-        logging.error(f"Error creating user: {str(e)}")
+        logger.error("Error creating user: %s", e)
         raise
 
+# Bulk patient import: one round trip for a batch of users, with any
+# patient record already attached
+@timed_query
+def get_users_by_emails(emails):
+    return db.table('users').select('id,email,role,patients(id)').in_('email', emails).execute()
+
+@timed_query
+def add_users(rows):
+    return db.table('users').insert(rows).execute()
+
+def _invalidate_user(user_id):
+    invalidate('users', user_id)
+    # Patient and doctor records embed the user row
+    for namespace in ('patients', 'patients_by_user', 'doctors', 'doctors_by_user'):
+        invalidate(namespace)
+
+@timed_query
 def update_user(user_id, data):
-    return supabase.table('users').update(data).eq('id', user_id).execute()
+    response = db.table('users').update(data).eq('id', user_id).execute()
+    _invalidate_user(user_id)
+    return response
 
+@timed_query
 def delete_user(user_id):
-    return supabase.table('users').delete().eq('id', user_id).execute()
+    response = db.table('users').delete().eq('id', user_id).execute()
+    _invalidate_user(user_id)
+    return response
+
+def check_password(user_row, password):
+    stored_password = user_row.get('password')
+    if not stored_password:
+        logger.debug("No password found for user: %s", user_row.get('email'))
+        return False
+        
+    is_valid = hmac.compare_digest(stored_password.encode(), password.encode())
+    logger.debug("Password verification for %s: %s", user_row.get('email'), 'success' if is_valid else 'failed')
+    return is_valid
 
 def verify_password(email, password):
     user = get_user_by_email(email)
     if not user or not user.data or len(user.data) == 0:
-        logging.debug(f"No user found with email: {email}")
+        logger.debug("No user found with email: %s", email)
         return False
-    
-    stored_password = user.data[0].get('password')
-    if not stored_password:
-        logging.debug(f"No password found for user: {email}")
-        return False
-        
-    is_valid = stored_password == password
-    logging.debug(f"Password verification for {email}: {'success' if is_valid else 'failed'}")
-    return is_valid 
\ No newline at end of file
+    return check_password(user.data[0], password) 
\ No newline at end of file
@@ -0,0 +1,136 @@
+from services.auth_service import login_user_async
+from services.doctor_service import fetch_doctor_by_id_async
+from services.event_service import parse_last_event_id, stream_session_events_async
+from services.patient_service import PATIENT_FILTERS, fetch_all_patients_async, fetch_patient_by_id_async
+from services.report_draft_service import VersionConflict, conflict_payload
+from services.report_service import fetch_report_by_id_async, fetch_report_by_session_id_async
+from services.session_service import (
+    fetch_patient_timeline_async,
+    fetch_session_by_id_async,
+    parse_includes,
+    parse_timeline_cursor
+)
+from utils.asgi import Router, StreamingResponse
+from utils.fields import parse_fields
+from utils.pagination import parse_filters, parse_limit, parse_page_args
+
+# Native async versions of the hot read paths. Each handler returns the same
+# (payload, status) as its Flask counterpart; anything not listed here is
+# served by the Flask app.
+router = Router()
+
+@router.route('/api/auth/login', methods=['POST'], auth=False, endpoint='auth.login')
+async def login(request):
+    data = await request.get_json() or {}
+    email = data.get('email')
+    password = data.get('password')
+    if not all([email, password]):
+        return {'error': 'Missing required fields'}, 400
+    return await login_user_async(email, password)
+
+@router.route('/api/patients', endpoint='patient.get_patients')
+@router.route('/api/patients/', endpoint='patient.get_patients')
+async def get_patients(request):
+    try:
+        limit, after = parse_page_args(request.args)
+        fields = parse_fields(request.args, 'patients')
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    filters = parse_filters(request.args, PATIENT_FILTERS)
+    response = await fetch_all_patients_async(limit, after, filters, fields)
+    if response['error']:
+        return {'error': response['error']}, 500
+    return response, 200
+
+@router.route('/api/patients/<int:patient_id>', endpoint='patient.get_patient')
+async def get_patient(request, patient_id):
+    try:
+        fields = parse_fields(request.args, 'patients')
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    response = await fetch_patient_by_id_async(patient_id, fields)
+    if response['error']:
+        return {'error': response['error']}, 500
+    if not response['data']:
+        return {'error': 'Patient not found'}, 404
+    return response, 200
+
+@router.route('/api/patients/<int:patient_id>/sessions', endpoint='patient.get_patient_sessions')
+async def get_patient_sessions(request, patient_id):
+    try:
+        limit = parse_limit(request.args)
+        before = parse_timeline_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    response = await fetch_patient_timeline_async(patient_id, limit, before)
+    if response['error']:
+        return {'error': response['error']}, 500
+    return response, 200
+
+@router.route('/api/sessions/<int:session_id>', endpoint='session.get_session')
+async def get_session(request, session_id):
+    try:
+        includes = parse_includes(request.args.get('include'))
+        fields = parse_fields(request.args, 'sessions')
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    response = await fetch_session_by_id_async(session_id, includes, fields)
+    if response['error']:
+        return {'error': response['error']}, 500
+    if not response['data']:
+        return {'error': 'Session not found'}, 404
+    return response, 200
+
+@router.route('/api/sessions/<int:session_id>/events', endpoint='session.get_session_events')
+async def get_session_events(request, session_id):
+    # Idle streams wait on the event loop, so one worker holds many of them
+    response = await fetch_session_by_id_async(session_id)
+    if response['error']:
+        return {'error': response['error']}, 500
+    if not response['data']:
+        return {'error': 'Session not found'}, 404
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    stream = StreamingResponse(stream_session_events_async(session_id, last_event_id), 'text/event-stream',
+                               [('Cache-Control', 'no-cache'), ('X-Accel-Buffering', 'no')])
+    return stream, 200
+
+@router.route('/api/sessions/<int:session_id>/report', endpoint='session.get_session_report')
+async def get_session_report(request, session_id):
+    try:
+        response = await fetch_report_by_session_id_async(session_id)
+    except VersionConflict as e:
+        return conflict_payload(e), 409
+    if response['error']:
+        return {'error': response['error']}, 500
+    if not response['data']:
+        return {'error': 'Report not found'}, 404
+    return response['data'], 200
+
+@router.route('/api/reports/<int:report_id>', endpoint='report.get_report')
+async def get_report(request, report_id):
+    try:
+        fields = parse_fields(request.args, 'reports')
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    try:
+        response = await fetch_report_by_id_async(report_id, fields)
+    except VersionConflict as e:
+        return conflict_payload(e), 409
+    if response['error']:
+        return {'error': response['error']}, 500
+    if not response['data']:
+        return {'error': 'Report not found'}, 404
+    return response, 200
+
+@router.route('/api/doctors/<int:doctor_id>', endpoint='doctor.get_doctor')
+async def get_doctor(request, doctor_id):
+    try:
+        fields = parse_fields(request.args, 'doctors')
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    response = await fetch_doctor_by_id_async(doctor_id, fields)
+    if response['error']:
+        return {'error': response['error']}, 500
+    if not response['data']:
+        return {'error': 'Doctor not found'}, 404
+    return response, 200
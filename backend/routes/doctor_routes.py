@@ -1,15 +1,27 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
 from services.doctor_service import fetch_all_doctors, fetch_doctor_by_id, create_doctor, modify_doctor, remove_doctor
+from utils.auth import require_auth
+from utils.fields import parse_fields
+from utils.pagination import parse_page_args, parse_filters
 
 app = Blueprint('doctor', __name__)
+app.before_request(require_auth)
+
+LIST_FILTERS = ('user_id', 'from', 'to')
 
 @app.route('/', methods=['GET', 'OPTIONS'])
 @cross_origin()
 def get_doctors():
     if request.method == 'OPTIONS':
         return jsonify({}), 200
-    response = fetch_all_doctors()
+    try:
+        limit, after = parse_page_args(request.args)
+        fields = parse_fields(request.args, 'doctors')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filters = parse_filters(request.args, LIST_FILTERS)
+    response = fetch_all_doctors(limit, after, filters, fields)
     if response['error']:
         return jsonify({'error': response['error']}), 500
     return jsonify(response), 200
@@ -19,7 +31,11 @@ def get_doctors():
 def get_doctor(doctor_id):
     if request.method == 'OPTIONS':
         return jsonify({}), 200
-    response = fetch_doctor_by_id(doctor_id)
+    try:
+        fields = parse_fields(request.args, 'doctors')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = fetch_doctor_by_id(doctor_id, fields)
     if response['error']:
         return jsonify({'error': response['error']}), 500
     if not response['data']:
@@ -0,0 +1,25 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from services.export_service import EXPORT_FORMATS, export_records, parse_export_args
+from utils.auth import require_auth
+
+app = Blueprint('export', __name__)
+app.before_request(require_auth)
+
+@app.route('/<any(patients, sessions, reports):resource>', methods=['GET', 'OPTIONS'])
+def export_resource(resource):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    try:
+        export_format, filters, fields = parse_export_args(resource, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = export_records(resource, export_format, filters, fields)
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    headers = {
+        'Content-Disposition': f'attachment; filename="{resource}.{export_format}"',
+        # Rows go out as each page is read; proxies must not hold them back
+        'X-Accel-Buffering': 'no'
+    }
+    return Response(stream_with_context(response['data']), mimetype=EXPORT_FORMATS[export_format],
+                    headers=headers)
@@ -1,14 +1,43 @@
 from flask import Blueprint, jsonify, request
-from services.patient_service import fetch_all_patients, fetch_patient_by_id, create_patient, modify_patient, remove_patient
+from services.patient_service import fetch_all_patients, fetch_patient_by_id, search_patients, create_patient, modify_patient, remove_patient, import_patients, parse_import_args, PATIENT_FILTERS
+from services.session_service import fetch_patient_timeline, parse_timeline_cursor
+from utils.auth import require_auth
+from utils.fields import parse_fields
+from utils.pagination import parse_limit, parse_page_args, parse_filters
 
 app = Blueprint('patient', __name__)
+app.before_request(require_auth)
 
 @app.route('', methods=['GET', 'OPTIONS'])
 @app.route('/', methods=['GET', 'OPTIONS'])
 def get_patients():
     if request.method == 'OPTIONS':
         return jsonify({}), 200
-    response = fetch_all_patients()
+    try:
+        limit, after = parse_page_args(request.args)
+        fields = parse_fields(request.args, 'patients')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filters = parse_filters(request.args, PATIENT_FILTERS)
+    response = fetch_all_patients(limit, after, filters, fields)
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    return jsonify(response), 200
+
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+
+@app.route('/search', methods=['GET', 'OPTIONS'])
+def search():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    try:
+        limit = min(int(request.args.get('limit', TYPEAHEAD_LIMIT)), TYPEAHEAD_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    response = search_patients(request.args.get('q', ''), limit)
     if response['error']:
         return jsonify({'error': response['error']}), 500
     return jsonify(response), 200
@@ -17,7 +46,11 @@ def get_patients():
 def get_patient(patient_id):
     if request.method == 'OPTIONS':
         return jsonify({}), 200
-    response = fetch_patient_by_id(patient_id)
+    try:
+        fields = parse_fields(request.args, 'patients')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = fetch_patient_by_id(patient_id, fields)
     if response['error']:
         return jsonify({'error': response['error']}), 500
     if not response['data']:
@@ -35,6 +68,22 @@ def add_patient():
         return jsonify({'error': response['error']}), 500
     return jsonify(response), 201
 
+@app.route('/import', methods=['POST', 'OPTIONS'])
+def import_patient_records():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    # Read from the socket as it arrives, like audio uploads
+    upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+    try:
+        import_format, skip = parse_import_args(request.args, upload.mimetype if upload else request.mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = import_patients(upload.stream if upload else request.stream, import_format, skip)
+    # A stopped import still reports how far it got, for resuming
+    if response['error']:
+        return jsonify(response), 500
+    return jsonify(response), 200
+
 @app.route('/<int:patient_id>', methods=['PUT', 'OPTIONS'])
 def update_patient(patient_id):
     if request.method == 'OPTIONS':
@@ -53,3 +102,17 @@ def delete_patient(patient_id):
     if response['error']:
         return jsonify({'error': response['error']}), 500
     return jsonify(response), 200
+
+@app.route('/<int:patient_id>/sessions', methods=['GET', 'OPTIONS'])
+def get_patient_sessions(patient_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    try:
+        limit = parse_limit(request.args)
+        before = parse_timeline_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = fetch_patient_timeline(patient_id, limit, before)
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    return jsonify(response), 200
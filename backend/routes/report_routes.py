@@ -1,15 +1,29 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
 from services.report_service import fetch_all_reports, fetch_report_by_id, create_report, modify_report, remove_report
+from services.report_draft_service import VersionConflict, conflict_payload, parse_changes, patch_report
+from services.report_job_service import fetch_report_job
+from utils.auth import require_auth
+from utils.fields import parse_fields
+from utils.pagination import parse_page_args, parse_filters
 
 app = Blueprint('report', __name__)
+app.before_request(require_auth)
+
+LIST_FILTERS = ('session_id', 'from', 'to')
 
 @app.route('/', methods=['GET', 'OPTIONS'])
 @cross_origin()
 def get_reports():
     if request.method == 'OPTIONS':
         return jsonify({}), 200
-    response = fetch_all_reports()
+    try:
+        limit, after = parse_page_args(request.args)
+        fields = parse_fields(request.args, 'reports')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filters = parse_filters(request.args, LIST_FILTERS)
+    response = fetch_all_reports(limit, after, filters, fields)
     if response['error']:
         return jsonify({'error': response['error']}), 500
     return jsonify(response), 200
@@ -19,7 +33,14 @@ def get_reports():
 def get_report(report_id):
     if request.method == 'OPTIONS':
         return jsonify({}), 200
-    response = fetch_report_by_id(report_id)
+    try:
+        fields = parse_fields(request.args, 'reports')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        response = fetch_report_by_id(report_id, fields)
+    except VersionConflict as e:
+        return jsonify(conflict_payload(e)), 409
     if response['error']:
         return jsonify({'error': response['error']}), 500
     if not response['data']:
@@ -48,6 +69,28 @@ def update_report(report_id):
         return jsonify({'error': response['error']}), 500
     return jsonify(response), 200
 
+@app.route('/<int:report_id>', methods=['PATCH', 'OPTIONS'])
+@cross_origin()
+def patch_report_text(report_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if not isinstance(version, int):
+        return jsonify({'error': 'version must be an integer'}), 400
+    try:
+        response = patch_report(report_id, version, parse_changes(data.get('changes')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except VersionConflict as e:
+        result = jsonify(conflict_payload(e))
+        if e.retry_after:
+            result.headers['Retry-After'] = str(int(e.retry_after))
+        return result, 409
+    if not response['data']:
+        return jsonify({'error': 'Report not found'}), 404
+    return jsonify(response), 200
+
 @app.route('/<int:report_id>', methods=['DELETE', 'OPTIONS'])
 @cross_origin()
 def delete_report(report_id):
@@ -58,5 +101,17 @@ def delete_report(report_id):
         return jsonify({'error': response['error']}), 500
     return jsonify(response), 200
 
+@app.route('/jobs/<job_id>', methods=['GET', 'OPTIONS'])
+@cross_origin()
+def get_report_job(job_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    response = fetch_report_job(job_id)
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    if not response['data']:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(response), 200
+
 if __name__ == '__main__':
     app.run(debug=True)
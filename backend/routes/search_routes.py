@@ -0,0 +1,25 @@
+from flask import Blueprint, jsonify, request
+from services.search_service import parse_search_filters, search
+from utils.auth import require_auth
+from utils.pagination import parse_limit
+
+app = Blueprint('search', __name__)
+app.before_request(require_auth)
+
+@app.route('', methods=['GET', 'OPTIONS'])
+@app.route('/', methods=['GET', 'OPTIONS'])
+def search_documents():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing search query'}), 400
+    try:
+        limit = parse_limit(request.args)
+        filters = parse_search_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = search(query, filters, limit)
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    return jsonify(response), 200
@@ -1,15 +1,32 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_cors import cross_origin
-from services.session_service import fetch_all_sessions, fetch_session_by_id, create_session, modify_session, remove_session
+from services.session_service import fetch_all_sessions, fetch_session_by_id, parse_includes, create_session, modify_session, remove_session
+from services.event_service import parse_last_event_id, stream_session_events
+from services.transcription_service import upload_session_audio, fetch_transcript, fetch_transcript_range, parse_time_range
+from services.report_service import fetch_report_by_session_id
+from services.report_draft_service import VersionConflict, conflict_payload
+from services.report_job_service import enqueue_report_generation, QueueFullError, RETRY_AFTER_SECONDS
+from utils.auth import require_auth
+from utils.fields import parse_fields
+from utils.pagination import parse_limit, parse_page_args, parse_filters
 
 app = Blueprint('session', __name__)
+app.before_request(require_auth)
+
+LIST_FILTERS = ('patient_id', 'doctor_id', 'from', 'to')
 
 @app.route('/', methods=['GET', 'OPTIONS'])
 @cross_origin()
 def get_sessions():
     if request.method == 'OPTIONS':
         return jsonify({}), 200
-    response = fetch_all_sessions()
+    try:
+        limit, after = parse_page_args(request.args)
+        fields = parse_fields(request.args, 'sessions')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filters = parse_filters(request.args, LIST_FILTERS)
+    response = fetch_all_sessions(limit, after, filters, fields)
     if response['error']:
         return jsonify({'error': response['error']}), 500
     return jsonify(response), 200
@@ -19,7 +36,12 @@ def get_sessions():
 def get_session(session_id):
     if request.method == 'OPTIONS':
         return jsonify({}), 200
-    response = fetch_session_by_id(session_id)
+    try:
+        includes = parse_includes(request.args.get('include'))
+        fields = parse_fields(request.args, 'sessions')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = fetch_session_by_id(session_id, includes, fields)
     if response['error']:
         return jsonify({'error': response['error']}), 500
     if not response['data']:
@@ -57,3 +79,91 @@ def delete_session(session_id):
     if response['error']:
         return jsonify({'error': response['error']}), 500
     return jsonify(response), 200
+
+@app.route('/<int:session_id>/upload', methods=['POST', 'OPTIONS'])
+@cross_origin()
+def upload_audio(session_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    session = fetch_session_by_id(session_id)
+    if session['error']:
+        return jsonify({'error': session['error']}), 500
+    if not session['data']:
+        return jsonify({'error': 'Session not found'}), 404
+    # Multipart uploads are spooled to disk by werkzeug; raw bodies are read
+    # straight from the socket
+    upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+    stream = upload.stream if upload else request.stream
+    try:
+        response = upload_session_audio(session_id, stream)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    return jsonify(response), 202
+
+@app.route('/<int:session_id>/transcript', methods=['GET', 'OPTIONS'])
+@cross_origin()
+def get_transcript(session_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    try:
+        time_range = parse_time_range(request.args)
+        limit = parse_limit(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if time_range:
+        response = fetch_transcript_range(session_id, *time_range, limit)
+    else:
+        response = fetch_transcript(session_id)
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    return jsonify(response['data']), 200
+
+@app.route('/<int:session_id>/events', methods=['GET', 'OPTIONS'])
+@cross_origin()
+def get_session_events(session_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    session = fetch_session_by_id(session_id)
+    if session['error']:
+        return jsonify({'error': session['error']}), 500
+    if not session['data']:
+        return jsonify({'error': 'Session not found'}), 404
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    stream = stream_with_context(stream_session_events(session_id, last_event_id))
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/<int:session_id>/report', methods=['POST', 'OPTIONS'])
+@cross_origin()
+def generate_report(session_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    session = fetch_session_by_id(session_id)
+    if session['error']:
+        return jsonify({'error': session['error']}), 500
+    if not session['data']:
+        return jsonify({'error': 'Session not found'}), 404
+    try:
+        response = enqueue_report_generation(session_id)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(RETRY_AFTER_SECONDS)}
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    return jsonify(response), 202
+
+@app.route('/<int:session_id>/report', methods=['GET', 'OPTIONS'])
+@cross_origin()
+def get_session_report(session_id):
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    try:
+        response = fetch_report_by_session_id(session_id)
+    except VersionConflict as e:
+        return jsonify(conflict_payload(e)), 409
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    if not response['data']:
+        return jsonify({'error': 'Report not found'}), 404
+    return jsonify(response['data']), 200
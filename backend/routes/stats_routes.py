@@ -0,0 +1,20 @@
+from flask import Blueprint, jsonify, request
+from services.stats_service import fetch_stats, parse_patient_ids
+from utils.auth import require_auth
+
+app = Blueprint('stats', __name__)
+app.before_request(require_auth)
+
+@app.route('', methods=['GET', 'OPTIONS'])
+@app.route('/', methods=['GET', 'OPTIONS'])
+def get_stats():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    try:
+        patient_ids = parse_patient_ids(request.args.get('patient_id'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = fetch_stats(patient_ids)
+    if response['error']:
+        return jsonify({'error': response['error']}), 500
+    return jsonify(response), 200
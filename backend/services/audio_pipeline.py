@@ -0,0 +1,242 @@
+import bisect
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import wave
+from array import array
+from collections import deque
+from operator import mul
+
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mediscribe-audio'))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv('AUDIO_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+TARGET_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+VAD_THRESHOLD_DBFS = float(os.getenv('VAD_THRESHOLD_DBFS', -45))
+VAD_MIN_SILENCE_MS = int(os.getenv('VAD_MIN_SILENCE_MS', 1000))
+VAD_PADDING_MS = int(os.getenv('VAD_PADDING_MS', 300))
+
+logger = logging.getLogger(__name__)
+
+_cache_lock = threading.Lock()
+
+class _SilenceTrimmer:
+    # Energy-based voice activity detection over 16-bit mono PCM. Silent
+    # runs longer than VAD_MIN_SILENCE_MS are cut down to VAD_PADDING_MS on
+    # each side, so words at the edges of speech are kept. `spans` records
+    # (output frame, source frame) at each cut so timestamps can be mapped
+    # back to the original recording.
+    def __init__(self, out, sample_rate):
+        self.out = out
+        self.frame_len = sample_rate * VAD_FRAME_MS // 1000
+        # Mean square of a frame at the threshold level
+        self.threshold = (32768 * 10 ** (VAD_THRESHOLD_DBFS / 20)) ** 2
+        self.min_silence = max(1, VAD_MIN_SILENCE_MS // VAD_FRAME_MS)
+        self.padding = min(VAD_PADDING_MS // VAD_FRAME_MS, self.min_silence)
+        self.spans = []
+        self.written = 0
+        self.position = 0
+        self._next_source = None
+        # Leading silence gets no head padding
+        self._head_left = 0
+        self._pending = []
+        self._tail = None
+
+    def _emit(self, frame, source):
+        if source != self._next_source:
+            self.spans.append([self.written, source])
+        self.out.writeframes(frame)
+        samples = len(frame) // 2
+        self.written += samples
+        self._next_source = source + samples
+
+    def _is_speech(self, frame):
+        samples = array('h', frame)
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        return sum(map(mul, samples, samples)) >= self.threshold * len(samples)
+
+    def feed(self, frame):
+        source = self.position
+        self.position += len(frame) // 2
+        if self._is_speech(frame):
+            for pending, pending_source in self._tail if self._tail is not None else self._pending:
+                self._emit(pending, pending_source)
+            self._pending, self._tail = [], None
+            self._head_left = self.padding
+            self._emit(frame, source)
+        elif self._head_left:
+            self._head_left -= 1
+            self._emit(frame, source)
+        elif self._tail is not None:
+            self._tail.append((frame, source))
+        else:
+            self._pending.append((frame, source))
+            if len(self._pending) > self.min_silence - self.padding:
+                # Long enough to cut; only the run's last frames are kept
+                self._tail = deque(self._pending[-self.padding:] if self.padding else (), maxlen=self.padding)
+                self._pending = []
+
+    def finish(self):
+        # Trailing silence is dropped beyond the head padding already written
+        if self._tail is None:
+            for pending, pending_source in self._pending:
+                self._emit(pending, pending_source)
+
+def _read_frames(reader, frame_bytes):
+    while True:
+        frame = reader.read(frame_bytes)
+        frame = frame[:len(frame) - len(frame) % 2]
+        if not frame:
+            return
+        yield frame
+
+def _trim(frames, sample_rate, out_path):
+    with wave.open(out_path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        trimmer = _SilenceTrimmer(out, sample_rate)
+        for frame in frames:
+            trimmer.feed(frame)
+        trimmer.finish()
+    return trimmer
+
+def _decode_ffmpeg(raw_path, out_path):
+    # FFmpeg decodes and resamples; the PCM comes back over a pipe and is
+    # trimmed as it arrives, so the full-rate decode never touches disk.
+    # The upload is read from its file because MP4/M4A need a seekable input.
+    command = [FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-nostdin', '-i', raw_path,
+               '-vn', '-ac', '1', '-ar', str(TARGET_SAMPLE_RATE), '-f', 's16le', 'pipe:1']
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    errors = []
+    # Drained on a thread so a chatty stderr cannot fill its pipe and stall FFmpeg
+    reader = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+    reader.start()
+    try:
+        frame_bytes = TARGET_SAMPLE_RATE * VAD_FRAME_MS // 1000 * 2
+        trimmer = _trim(_read_frames(process.stdout, frame_bytes), TARGET_SAMPLE_RATE, out_path)
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+        reader.join()
+    if returncode != 0 or trimmer.position == 0:
+        message = b''.join(errors).decode(errors='replace').strip().splitlines()
+        logger.warning("FFmpeg could not decode %s: %s", raw_path, message[-1] if message else returncode)
+        raise ValueError('Unsupported or empty audio upload')
+    return trimmer, TARGET_SAMPLE_RATE
+
+def _decode_wav(raw_path, out_path):
+    # Without FFmpeg only 16-bit mono WAV can be trimmed, at its own rate
+    try:
+        with wave.open(raw_path, 'rb') as audio:
+            if audio.getnchannels() != 1 or audio.getsampwidth() != 2:
+                raise ValueError('Only 16-bit mono WAV can be processed without FFmpeg')
+            sample_rate = audio.getframerate()
+            frame_count = sample_rate * VAD_FRAME_MS // 1000
+            frames = iter(lambda: audio.readframes(frame_count), b'')
+            trimmer = _trim(frames, sample_rate, out_path)
+    except (wave.Error, EOFError):
+        raise ValueError('Unsupported audio format, upload PCM WAV or install FFmpeg')
+    if trimmer.position == 0:
+        raise ValueError('Empty upload')
+    return trimmer, sample_rate
+
+def _cache_paths(digest):
+    base = os.path.join(AUDIO_CACHE_DIR, digest)
+    return base + '.wav', base + '.json'
+
+def _prune_cache():
+    entries = []
+    for name in os.listdir(AUDIO_CACHE_DIR):
+        if name.endswith('.tmp'):
+            continue
+        path = os.path.join(AUDIO_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= AUDIO_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def _checkout(wav_path, work_path):
+    # The job gets its own name for the file, so pruning the cache while it
+    # is being transcribed is harmless
+    try:
+        os.link(wav_path, work_path)
+    except OSError:
+        shutil.copyfile(wav_path, work_path)
+
+def _load_cached(digest, work_path):
+    # Called with _cache_lock held
+    wav_path, meta_path = _cache_paths(digest)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        _checkout(wav_path, work_path)
+        for path in (wav_path, meta_path):
+            os.utime(path)
+    except (FileNotFoundError, ValueError):
+        return None
+    return meta
+
+def normalise_audio(raw_path, digest, work_path):
+    # Writes to work_path the 16 kHz mono, silence-trimmed WAV for an upload,
+    # from the cache when this content hash has been seen before. The
+    # returned metadata maps trimmed positions back to the recording (see
+    # source_frame).
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    wav_path, meta_path = _cache_paths(digest)
+    with _cache_lock:
+        meta = _load_cached(digest, work_path)
+    if meta is not None:
+        return {**meta, 'cached': True}
+
+    fd, tmp_path = tempfile.mkstemp(dir=AUDIO_CACHE_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        try:
+            trimmer, sample_rate = _decode_ffmpeg(raw_path, tmp_path)
+        except FileNotFoundError:
+            logger.warning("%s not found; only 16-bit mono WAV uploads can be processed", FFMPEG_BINARY)
+            trimmer, sample_rate = _decode_wav(raw_path, tmp_path)
+        if trimmer.written == 0:
+            raise ValueError('Upload contains no speech')
+        meta = {
+            'sample_rate': sample_rate,
+            'spans': trimmer.spans,
+            'source_ms': trimmer.position * 1000 // sample_rate,
+            'speech_ms': trimmer.written * 1000 // sample_rate
+        }
+        with _cache_lock:
+            os.replace(tmp_path, wav_path)
+            with open(meta_path + '.tmp', 'w') as f:
+                json.dump(meta, f)
+            os.replace(meta_path + '.tmp', meta_path)
+            _checkout(wav_path, work_path)
+            _prune_cache()
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {**meta, 'cached': False}
+
+def source_frame(spans, frame):
+    # Position in the original recording of a frame of the trimmed audio
+    if not spans:
+        return frame
+    index = max(0, bisect.bisect_right(spans, [frame, float('inf')]) - 1)
+    written, source = spans[index]
+    return source + frame - written
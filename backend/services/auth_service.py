@@ -1,8 +1,9 @@
-from models.user import create_user, verify_password, get_user_by_email
+from models.user import create_user, check_password, get_user_by_email, get_user_by_email_async
+from utils.auth import issue_access_token, ACCESS_TOKEN_TTL_SECONDS
 from flask import jsonify
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 def register_user(email, password, role):
     existing_user = get_user_by_email(email)
@@ -13,27 +14,40 @@ def register_user(email, password, role):
     if not user.data:
         return jsonify({'error': 'Failed to create user'}), 500
     
-    return jsonify(user.data[0]), 201
+    return jsonify(_session_payload(user.data[0])), 201
 
-def login_user(email, password):
-    logging.debug(f"Attempting login for user: {email}")
-    user = get_user_by_email(email)
-    
-    if not user or not user.data or len(user.data) == 0:
-        logging.debug(f"No user found with email: {email}")
-        return jsonify({'error': 'Invalid credentials'}), 401
-        
-    if not verify_password(email, password):
-        logging.debug(f"Login failed for user: {email}")
-        return jsonify({'error': 'Invalid credentials'}), 401
-    
-    logging.debug(f"Login successful for user: {email}")
-    user_data = user.data[0]
-    return jsonify({
+def _session_payload(user_data):
+    return {
         'data': [{
             'id': user_data['id'],
             'email': user_data['email'],
             'role': user_data['role'],
             'name': user_data['email'].split('@')[0]  # Use email prefix as name
-        }]
-    }), 200 
\ No newline at end of file
+        }],
+        'access_token': issue_access_token(user_data),
+        'token_type': 'Bearer',
+        'expires_in': ACCESS_TOKEN_TTL_SECONDS
+    }
+
+def _authenticate(email, password, user):
+    if not user or not user.data or len(user.data) == 0:
+        logger.debug("No user found with email: %s", email)
+        return {'error': 'Invalid credentials'}, 401
+        
+    # The row fetched above already holds the password; no second lookup
+    user_data = user.data[0]
+    if not check_password(user_data, password):
+        logger.debug("Login failed for user: %s", email)
+        return {'error': 'Invalid credentials'}, 401
+    
+    logger.debug("Login successful for user: %s", email)
+    return _session_payload(user_data), 200
+
+def login_user(email, password):
+    logger.debug("Attempting login for user: %s", email)
+    payload, status = _authenticate(email, password, get_user_by_email(email))
+    return jsonify(payload), status
+
+async def login_user_async(email, password):
+    logger.debug("Attempting login for user: %s", email)
+    return _authenticate(email, password, await get_user_by_email_async(email)) 
\ No newline at end of file
@@ -1,22 +1,52 @@
-from models.doctor import get_all_doctors, get_doctor_by_id, add_doctor, update_doctor, delete_doctor
+from models.doctor import get_all_doctors, get_doctor_by_id, get_doctor_by_id_async, add_doctor, update_doctor, delete_doctor
+from services.stats_service import record_created, record_removed
+from utils.fields import pick
+from utils.pagination import DEFAULT_LIMIT, make_page
 
-def fetch_all_doctors():
-    return get_all_doctors()
+def fetch_all_doctors(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
+    response = get_all_doctors(limit, after, filters, fields)
+    rows, next_cursor = make_page(response.data, limit)
+    return {
+        'data': rows,
+        'error': response.error if hasattr(response, 'error') else None,
+        'next_cursor': next_cursor
+    }
 
-def fetch_doctor_by_id(doctor_id):
-    doctor = get_doctor_by_id(doctor_id)
-    if not doctor['data']:
-        return {"error": "Doctor not found"}
-    return doctor['data']
+def fetch_doctor_by_id(doctor_id, fields=None):
+    response = get_doctor_by_id(doctor_id)
+    return {
+        'data': pick(response.data[0], fields) if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
+
+async def fetch_doctor_by_id_async(doctor_id, fields=None):
+    response = await get_doctor_by_id_async(doctor_id)
+    return {
+        'data': pick(response.data[0], fields) if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
 
 def create_doctor(doctor_data):
-    new_doctor = add_doctor(doctor_data)
-    return new_doctor
+    response = add_doctor(doctor_data)
+    for doctor in response.data or []:
+        record_created('doctors', doctor)
+    return {
+        'data': response.data[0] if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
 
 def modify_doctor(doctor_id, doctor_data):
-    updated_doctor = update_doctor(doctor_id, doctor_data)
-    return updated_doctor
+    response = update_doctor(doctor_id, doctor_data)
+    return {
+        'data': response.data[0] if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
 
 def remove_doctor(doctor_id):
-    deleted_doctor = delete_doctor(doctor_id)
-    return deleted_doctor
+    response = delete_doctor(doctor_id)
+    for doctor in response.data or []:
+        record_removed('doctors', doctor)
+    return {
+        'data': response.data[0] if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
@@ -0,0 +1,59 @@
+import os
+
+from utils.event_bus import AsyncSubscription, EventBus, Subscription, format_event
+
+EVENT_REPLAY_SIZE = int(os.getenv('EVENT_REPLAY_SIZE', 256))
+EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', 1000))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv('EVENT_HEARTBEAT_SECONDS', 15))
+EVENT_RETRY_MS = 3000
+
+# Transcript segments and report job progress, keyed by session id. Events
+# only reach streams held by the same worker process as the upload or job.
+session_events = EventBus(replay=EVENT_REPLAY_SIZE)
+
+_KEEPALIVE = b': keepalive\n\n'
+
+def publish_session_event(session_id, event, data):
+    session_events.publish(session_id, event, data)
+
+def parse_last_event_id(value):
+    # A malformed id gets a reset, like one from before a restart
+    if not value:
+        return None
+    return int(value) if value.isdigit() else -1
+
+def _opening(session_id, subscription):
+    yield f'retry: {EVENT_RETRY_MS}\n\n'.encode()
+    if not subscription.complete:
+        # Some events were missed; the client reloads the session with GET
+        yield format_event(subscription.current_id, 'reset', {'session_id': session_id})
+        return
+    for item in subscription.backlog:
+        yield format_event(*item)
+
+def stream_session_events(session_id, last_event_id=None):
+    # Holds a thread for as long as the client listens; the ASGI app serves
+    # this endpoint with stream_session_events_async instead
+    subscription = Subscription(session_events, session_id, last_event_id, EVENT_QUEUE_SIZE)
+    try:
+        yield from _opening(session_id, subscription)
+        # An overflowed stream ends; the client reconnects with Last-Event-ID
+        while not subscription.overflowed:
+            item = subscription.get(EVENT_HEARTBEAT_SECONDS)
+            yield format_event(*item) if item else _KEEPALIVE
+    finally:
+        subscription.close()
+
+async def stream_session_events_async(session_id, last_event_id=None):
+    subscription = AsyncSubscription(session_events, session_id, last_event_id, EVENT_QUEUE_SIZE)
+    try:
+        for chunk in _opening(session_id, subscription):
+            yield chunk
+        while not subscription.overflowed:
+            item = await subscription.get(EVENT_HEARTBEAT_SECONDS)
+            yield format_event(*item) if item else _KEEPALIVE
+    finally:
+        subscription.close()
+
+def event_stats():
+    return session_events.stats()
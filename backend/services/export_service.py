@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+import logging
+import os
+
+from models.patient import get_all_patients
+from models.report import get_all_reports
+from models.session import get_all_sessions, get_doctor_patient_ids, get_doctor_session_ids
+from utils.fields import DEFAULT_FIELDS, RESOURCE_FIELDS, parse_fields
+from utils.metrics import registry
+from utils.pagination import parse_filters
+
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', 1000))
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_FILTERS = ('doctor_id', 'from', 'to')
+
+logger = logging.getLogger(__name__)
+
+def _patients_page(after, filters, fields):
+    response = get_all_patients(EXPORT_PAGE_SIZE, after, filters, fields)
+    if response['error']:
+        raise RuntimeError(response['error'])
+    return response['data'], response['next_cursor'] is not None
+
+def _table_page(fetch):
+    def page(after, filters, fields):
+        rows = fetch(EXPORT_PAGE_SIZE, after, filters, fields).data or []
+        return rows[:EXPORT_PAGE_SIZE], len(rows) > EXPORT_PAGE_SIZE
+    return page
+
+def _doctor_scope(fetch, column):
+    def scope(doctor_id, ids):
+        return {row[column] for row in fetch(doctor_id, ids).data or []}
+    return scope
+
+# How each resource is paged. Tables without a doctor_id of their own are
+# scoped to a doctor page by page, through the column linking them to
+# sessions, so the storage backend never has to filter on an embed.
+EXPORTS = {
+    'patients': {'page': _patients_page, 'link': 'id',
+                 'scope': _doctor_scope(get_doctor_patient_ids, 'patient_id')},
+    'sessions': {'page': _table_page(get_all_sessions), 'link': None, 'scope': None},
+    'reports': {'page': _table_page(get_all_reports), 'link': 'session_id',
+                'scope': _doctor_scope(get_doctor_session_ids, 'id')},
+}
+
+# Raises ValueError with a client-facing message on bad input
+def parse_export_args(resource, args):
+    export_format = args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    filters = parse_filters(args, EXPORT_FILTERS)
+    if 'doctor_id' in filters:
+        try:
+            filters['doctor_id'] = int(filters['doctor_id'])
+        except ValueError:
+            raise ValueError('doctor_id must be an integer')
+    fields = parse_fields(args, resource) or DEFAULT_FIELDS[resource] or tuple(RESOURCE_FIELDS[resource])
+    return export_format, filters, fields
+
+def _pages(resource, filters, fields):
+    # Pages of rows in id order; one page in memory at a time
+    config = EXPORTS[resource]
+    filters = dict(filters)
+    doctor_id = filters.pop('doctor_id', None) if config['scope'] else None
+    link = config['link']
+    if doctor_id is not None and link not in fields:
+        fields = fields + (link,)
+    after, more = None, True
+    while more:
+        rows, more = config['page'](after, filters, fields)
+        if rows:
+            after = rows[-1]['id']
+        if doctor_id is not None and rows:
+            linked = config['scope'](doctor_id, sorted({row[link] for row in rows if row[link] is not None}))
+            rows = [row for row in rows if row[link] in linked]
+        yield rows
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+def _ndjson(pages, columns):
+    for rows in pages:
+        yield ''.join(json.dumps({column: row.get(column) for column in columns}, default=str) + '\n'
+                      for row in rows)
+
+def _csv(pages, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in pages:
+        writer.writerows([_cell(row.get(column)) for column in columns] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def _counted(pages, labels):
+    for rows in pages:
+        registry.inc('export_rows_total', labels, len(rows))
+        yield rows
+
+def _guarded(chunks, resource):
+    # Headers are long gone by now, so a failure can only cut the stream
+    # short; the client sees the transfer end without its final chunk
+    try:
+        yield from chunks
+    except Exception as e:
+        logger.error("Export of %s failed mid-stream: %s", resource, e)
+        raise
+
+def export_records(resource, export_format, filters, fields):
+    pages = _counted(_pages(resource, filters, fields), {'resource': resource, 'format': export_format})
+    # The first page is read before answering, so a broken query is still a 500
+    try:
+        first = next(pages)
+    except Exception as e:
+        logger.error("Error in export_records: %s", e)
+        return {'data': None, 'error': str(e)}
+
+    def chained():
+        yield first
+        yield from pages
+
+    encode = _csv if export_format == 'csv' else _ndjson
+    return {'data': _guarded(encode(chained(), fields), resource), 'error': None}
@@ -1,29 +1,86 @@
 from models.patient import (
     get_all_patients,
+    get_all_patients_async,
     get_patient_by_id,
+    get_patient_by_id_async,
     get_patient_by_user_id,
     add_patient,
+    add_patients,
     update_patient,
     delete_patient
 )
+from models.user import add_users, get_users_by_emails
+from postgrest.exceptions import APIError
+from services.stats_service import record_created, record_removed
+from utils.fields import pick
+from utils.metrics import registry
+from utils.pagination import DEFAULT_LIMIT
+from utils.prefix_index import PrefixIndex
+from datetime import date
+import codecs
+import csv
+import json
 import logging
+import os
+import threading
+import time
 
-logging.basicConfig(level=logging.DEBUG)
+PATIENT_INDEX_REFRESH_SECONDS = float(os.getenv('PATIENT_INDEX_REFRESH_SECONDS', 60))
+PATIENT_INDEX_PAGE_SIZE = 1000
+TYPEAHEAD_FIELDS = ('id', 'first_name', 'last_name', 'email')
+# List filters, shared by the Flask and native async routes
+PATIENT_FILTERS = ('user_id', 'date_of_birth', 'from', 'to')
+PATIENT_IMPORT_BATCH_SIZE = int(os.getenv('PATIENT_IMPORT_BATCH_SIZE', 500))
+# Emails per lookup query; Supabase sends the list in the URL
+PATIENT_IMPORT_LOOKUP_SIZE = 100
+PATIENT_IMPORT_MAX_ERRORS = 1000
+IMPORT_FORMATS = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/jsonl': 'ndjson'}
+UNIQUE_VIOLATION = '23505'
 
-def fetch_all_patients():
+logger = logging.getLogger(__name__)
+
+# Typeahead over first name, last name, full name (either order) and email.
+# Writes through this process update it directly; a periodic rebuild in the
+# background picks up patients added or removed by other processes.
+patient_index = PrefixIndex()
+_index_state = {'built_at': None, 'rebuilding': False, 'pending': []}
+_index_lock = threading.Lock()
+_first_build_lock = threading.Lock()
+
+def fetch_all_patients(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
     try:
-        response = get_all_patients()
+        response = get_all_patients(limit, after, filters, fields)
         return response
     except Exception as e:
-        logging.error(f"Error in fetch_all_patients: {str(e)}")
+        logger.error("Error in fetch_all_patients: %s", e)
         return {"data": None, "error": str(e)}
 
-def fetch_patient_by_id(patient_id):
+async def fetch_all_patients_async(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
     try:
-        response = get_patient_by_id(patient_id)
+        return await get_all_patients_async(limit, after, filters, fields)
+    except Exception as e:
+        logger.error("Error in fetch_all_patients_async: %s", e)
+        return {"data": None, "error": str(e)}
+
+def _pick_patient(response, fields):
+    # The cached record is shared, so trim a copy
+    if not fields or response['error']:
         return response
+    return {**response, 'data': pick(response['data'], fields)}
+
+def fetch_patient_by_id(patient_id, fields=None):
+    try:
+        response = get_patient_by_id(patient_id)
+        return _pick_patient(response, fields)
+    except Exception as e:
+        logger.error("Error in fetch_patient_by_id: %s", e)
+        return {"data": None, "error": str(e)}
+
+async def fetch_patient_by_id_async(patient_id, fields=None):
+    try:
+        return _pick_patient(await get_patient_by_id_async(patient_id), fields)
     except Exception as e:
-        logging.error(f"Error in fetch_patient_by_id: {str(e)}")
+        logger.error("Error in fetch_patient_by_id_async: %s", e)
         return {"data": None, "error": str(e)}
 
 def fetch_patient_by_user_id(user_id):
@@ -31,35 +88,267 @@ def fetch_patient_by_user_id(user_id):
         response = get_patient_by_user_id(user_id)
         return response
     except Exception as e:
-        logging.error(f"Error in fetch_patient_by_user_id: {str(e)}")
+        logger.error("Error in fetch_patient_by_user_id: %s", e)
+        return {"data": None, "error": str(e)}
+
+def _patient_keys(patient):
+    first, last = patient.get('first_name') or '', patient.get('last_name') or ''
+    return first, last, f"{first} {last}", f"{last} {first}", patient.get('email')
+
+def _index_patient(patient):
+    patient_index.add(patient['id'], _patient_keys(patient), {name: patient.get(name) for name in TYPEAHEAD_FIELDS})
+
+def _record_change(change, *args):
+    # Changes made while a rebuild is reading are replayed on top of it
+    with _index_lock:
+        if _index_state['rebuilding']:
+            _index_state['pending'].append((change, args))
+    change(*args)
+
+def _rebuild_index():
+    items, after = [], None
+    while True:
+        page = get_all_patients(PATIENT_INDEX_PAGE_SIZE, after, fields=TYPEAHEAD_FIELDS)
+        if page['error']:
+            raise Exception(page['error'])
+        items.extend((patient['id'], _patient_keys(patient), patient) for patient in page['data'])
+        if not page['next_cursor']:
+            break
+        after = page['data'][-1]['id']
+    with _index_lock:
+        patient_index.replace(items)
+        for change, args in _index_state['pending']:
+            change(*args)
+        _index_state['pending'] = []
+        _index_state['built_at'] = time.monotonic()
+
+def _run_rebuild():
+    try:
+        _rebuild_index()
+    except Exception as e:
+        logger.error("Error rebuilding patient index: %s", e)
+    finally:
+        with _index_lock:
+            _index_state['rebuilding'] = False
+            _index_state['pending'] = []
+
+def _ensure_index():
+    if _index_state['built_at'] is None:
+        # Nothing to serve yet, so the first searches wait for one build
+        with _first_build_lock:
+            if _index_state['built_at'] is None:
+                with _index_lock:
+                    _index_state['rebuilding'] = True
+                _run_rebuild()
+        return _index_state['built_at'] is not None
+    with _index_lock:
+        fresh = time.monotonic() - _index_state['built_at'] < PATIENT_INDEX_REFRESH_SECONDS
+        if fresh or _index_state['rebuilding']:
+            return True
+        _index_state['rebuilding'] = True
+    # Later rebuilds run in the background while the old index serves
+    threading.Thread(target=_run_rebuild, name='patient-index', daemon=True).start()
+    return True
+
+def search_patients(query, limit=10):
+    try:
+        if not _ensure_index():
+            return {'data': None, 'error': 'Patient index is not available'}
+        return {'data': patient_index.search(query, limit), 'error': None}
+    except Exception as e:
+        logger.error("Error in search_patients: %s", e)
         return {"data": None, "error": str(e)}
 
 def create_patient(data):
     try:
+        user_fields = {name: data.get(name) for name in ('first_name', 'last_name', 'email')}
         response = add_patient(data)
         if response.data:
+            _record_change(_index_patient, {**user_fields, 'id': response.data[0]['id']})
+            record_created('patients', response.data[0])
             return {"data": response.data[0], "error": None}
         return {"data": None, "error": "Failed to create patient"}
     except Exception as e:
-        logging.error(f"Error in create_patient: {str(e)}")
+        logger.error("Error in create_patient: %s", e)
         return {"data": None, "error": str(e)}
 
 def modify_patient(patient_id, data):
     try:
         response = update_patient(patient_id, data)
-        if response.data:
+        if response.data and _index_state['built_at'] is not None:
+            patient = get_patient_by_id(patient_id)
+            if patient['data']:
+                _record_change(_index_patient, patient['data'])
             return {"data": response.data[0], "error": None}
         return {"data": None, "error": "Failed to update patient"}
     except Exception as e:
-        logging.error(f"Error in modify_patient: {str(e)}")
+        logger.error("Error in modify_patient: %s", e)
         return {"data": None, "error": str(e)}
 
 def remove_patient(patient_id):
     try:
         response = delete_patient(patient_id)
+        _record_change(patient_index.remove, patient_id)
         if response.data:
+            record_removed('patients', response.data[0])
             return {"data": response.data[0], "error": None}
         return {"data": None, "error": "Failed to delete patient"}
     except Exception as e:
-        logging.error(f"Error in remove_patient: {str(e)}")
+        logger.error("Error in remove_patient: %s", e)
         return {"data": None, "error": str(e)}
+
+# Raises ValueError with a client-facing message on bad input
+def parse_import_args(args, content_type):
+    import_format = args.get('format') or IMPORT_FORMATS.get(content_type)
+    if import_format not in ('csv', 'ndjson'):
+        raise ValueError('format must be csv or ndjson')
+    try:
+        skip = int(args.get('skip', 0))
+    except ValueError:
+        raise ValueError('skip must be an integer')
+    if skip < 0:
+        raise ValueError('skip must not be negative')
+    return import_format, skip
+
+def _csv_records(lines):
+    yield from csv.DictReader(lines)
+
+def _ndjson_records(lines):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+def _clean(value):
+    value = str(value).strip() if value is not None else ''
+    return value or None
+
+def _validate_import_row(record):
+    # Returns (row, error message)
+    if not isinstance(record, dict):
+        return None, 'Row is not a JSON object'
+    email = _clean(record.get('email'))
+    if not email or '@' not in email:
+        return None, 'A valid email is required'
+    date_of_birth = _clean(record.get('date_of_birth') or record.get('dob')) or '1900-01-01'
+    try:
+        date.fromisoformat(date_of_birth)
+    except ValueError:
+        return None, 'date_of_birth must be a date such as 1980-04-23'
+    return {
+        'email': email,
+        'password': _clean(record.get('password')),
+        'first_name': _clean(record.get('first_name')),
+        'last_name': _clean(record.get('last_name')),
+        'date_of_birth': date_of_birth
+    }, None
+
+def _fail_row(result, number, message):
+    result['failed'] += 1
+    if len(result['errors']) < PATIENT_IMPORT_MAX_ERRORS:
+        result['errors'].append({'row': number, 'error': message})
+    else:
+        result['errors_truncated'] = True
+
+def _insert_users(pending, result):
+    # Returns {email: user id}. A batch only conflicts when another writer
+    # registered one of its emails since the lookup; those rows are then
+    # retried one at a time so only they fail.
+    users = [{'email': row['email'], 'password': row['password'], 'role': 'patient',
+              'first_name': row['first_name'], 'last_name': row['last_name']} for _, row in pending]
+    if not users:
+        return {}
+    try:
+        return {user['email']: user['id'] for user in add_users(users).data or []}
+    except APIError as e:
+        if e.code != UNIQUE_VIOLATION:
+            raise
+    created = {}
+    for (number, _), user in zip(pending, users):
+        try:
+            created.update({row['email']: row['id'] for row in add_users([user]).data or []})
+        except APIError as e:
+            if e.code != UNIQUE_VIOLATION:
+                raise
+            _fail_row(result, number, 'Email is already registered')
+    return created
+
+def _import_batch(batch, result):
+    existing = {}
+    emails = [row['email'] for _, row in batch]
+    for start in range(0, len(emails), PATIENT_IMPORT_LOOKUP_SIZE):
+        for user in get_users_by_emails(emails[start:start + PATIENT_IMPORT_LOOKUP_SIZE]).data or []:
+            existing[user['email']] = user
+
+    pending, user_ids, seen, accepted = [], {}, set(), []
+    for number, row in batch:
+        user = existing.get(row['email'])
+        if row['email'] in seen or (user and user['patients']):
+            # Imported already, by an earlier run or earlier in this file
+            result['skipped'] += 1
+        elif user and user['role'] != 'patient':
+            _fail_row(result, number, 'Email belongs to a non-patient account')
+        elif user:
+            # A user left without a patient by an interrupted import
+            user_ids[row['email']] = user['id']
+            accepted.append(row)
+        else:
+            pending.append((number, row))
+            accepted.append(row)
+        seen.add(row['email'])
+    user_ids.update(_insert_users(pending, result))
+
+    rows = [row for row in accepted if row['email'] in user_ids]
+    if not rows:
+        return
+    response = add_patients([{'user_id': user_ids[row['email']], 'date_of_birth': row['date_of_birth']}
+                             for row in rows])
+    users = {user_id: email for email, user_id in user_ids.items()}
+    by_email = {row['email']: row for row in rows}
+    for patient in response.data or []:
+        row = by_email[users[patient['user_id']]]
+        _record_change(_index_patient, {'id': patient['id'], 'first_name': row['first_name'],
+                                        'last_name': row['last_name'], 'email': row['email']})
+        record_created('patients', patient)
+        result['imported'] += 1
+
+def _flush_batch(batch, result):
+    _import_batch(batch, result)
+    result['processed'] = batch[-1][0]
+    batch.clear()
+
+def import_patients(stream, import_format, skip=0):
+    # Reads the upload as it arrives, PATIENT_IMPORT_BATCH_SIZE rows at a
+    # time, with two inserts per batch. Importing is idempotent per email,
+    # so a failed run can be repeated in full or resumed with
+    # skip=<processed> from its result.
+    result = {'imported': 0, 'skipped': 0, 'failed': 0, 'processed': skip,
+              'errors': [], 'errors_truncated': False, 'complete': False}
+    lines = codecs.getreader('utf-8-sig')(stream)
+    records = _csv_records(lines) if import_format == 'csv' else _ndjson_records(lines)
+    batch, number = [], skip
+    try:
+        for number, record in enumerate(records, 1):
+            if number <= skip:
+                continue
+            row, message = _validate_import_row(record)
+            if message:
+                _fail_row(result, number, message)
+                continue
+            batch.append((number, row))
+            if len(batch) >= PATIENT_IMPORT_BATCH_SIZE:
+                _flush_batch(batch, result)
+        if batch:
+            _flush_batch(batch, result)
+        result['processed'] = max(number, skip)
+        result['complete'] = True
+        return {'data': result, 'error': None}
+    except Exception as e:
+        logger.error("Patient import stopped after row %s: %s", result['processed'], e)
+        return {'data': result, 'error': str(e)}
+    finally:
+        for outcome in ('imported', 'skipped', 'failed'):
+            registry.inc('patient_import_rows_total', {'outcome': outcome}, result[outcome])
@@ -0,0 +1,249 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from models.report import REPORT_TEXT_FIELDS, get_report_for_update, update_report_version
+from services.search_service import index_report
+from utils.metrics import registry
+from utils.text_delta import apply_delta
+
+REPORT_FLUSH_DELAY_SECONDS = float(os.getenv('REPORT_FLUSH_DELAY_SECONDS', 1))
+REPORT_FLUSH_MAX_DELAY_SECONDS = float(os.getenv('REPORT_FLUSH_MAX_DELAY_SECONDS', 5))
+REPORT_FLUSH_RETRY_MAX_SECONDS = float(os.getenv('REPORT_FLUSH_RETRY_MAX_SECONDS', 60))
+
+logger = logging.getLogger(__name__)
+
+# Reports being edited through PATCH. Deltas are applied to the in-memory
+# text and written back once edits pause for REPORT_FLUSH_DELAY_SECONDS (or
+# REPORT_FLUSH_MAX_DELAY_SECONDS after the first unsaved one), so a burst
+# of keystrokes is one database write. A draft is dropped once it is saved.
+# If another writer moved the report on first, the draft is kept and marked
+# with the database's version, and the next PATCH or read of the report gets
+# a 409 carrying the unsaved text instead of the edits vanishing.
+_drafts = {}
+_drafts_lock = threading.Lock()
+
+class VersionConflict(Exception):
+    def __init__(self, version, retry_after=None, unsaved=None):
+        super().__init__('Report has changed since that version')
+        self.version = version
+        self.retry_after = retry_after
+        self.unsaved = unsaved
+
+def conflict_payload(conflict):
+    payload = {'error': str(conflict), 'version': conflict.version}
+    if conflict.unsaved is not None:
+        payload['unsaved'] = conflict.unsaved
+    return payload
+
+# Raises ValueError with a client-facing message on bad input
+def parse_changes(changes):
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError('changes must map report fields to deltas')
+    unknown = [name for name in changes if name not in REPORT_TEXT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field: {', '.join(unknown)}")
+    return changes
+
+def _load(report_id):
+    with _drafts_lock:
+        draft = _drafts.get(report_id)
+    if draft is not None:
+        return draft
+    response = get_report_for_update(report_id)
+    if not response.data:
+        return None
+    row = response.data[0]
+    version = row.get('version') or 0
+    draft = {
+        'lock': threading.Lock(),
+        'fields': {name: row.get(name) or '' for name in REPORT_TEXT_FIELDS},
+        'version': version,
+        'saved_version': version,
+        'dirty': set(),
+        'first_dirty_at': None,
+        'edited_at': None,
+        'failures': 0,
+        'timer': None,
+        'flushing': False,
+        'idle': threading.Event(),
+        'conflict': None,
+        'closed': False
+    }
+    draft['idle'].set()
+    with _drafts_lock:
+        return _drafts.setdefault(report_id, draft)
+
+def _close(report_id, draft):
+    # Called with the draft lock held
+    draft['closed'] = True
+    if draft['timer'] is not None:
+        draft['timer'].cancel()
+    with _drafts_lock:
+        if _drafts.get(report_id) is draft:
+            del _drafts[report_id]
+
+def _raise_conflict(report_id, draft):
+    # Called with the draft lock held. The unsaved edits go back to the
+    # client once and the draft is dropped, so later reads see the database.
+    unsaved = {'version': draft['version'], 'fields': dict(draft['fields'])}
+    _close(report_id, draft)
+    raise VersionConflict(draft['conflict'], unsaved=unsaved)
+
+def _start_timer(report_id, draft, delay):
+    if draft['timer'] is not None:
+        draft['timer'].cancel()
+    draft['timer'] = threading.Timer(max(delay, 0), flush_report, args=(report_id,))
+    draft['timer'].daemon = True
+    draft['timer'].start()
+
+def _schedule(report_id, draft):
+    if draft['failures']:
+        # A failing save is retried on its own backoff, not brought forward by edits
+        return
+    now = time.monotonic()
+    if draft['first_dirty_at'] is None:
+        draft['first_dirty_at'] = now
+    delay = min(REPORT_FLUSH_DELAY_SECONDS, draft['first_dirty_at'] + REPORT_FLUSH_MAX_DELAY_SECONDS - now)
+    _start_timer(report_id, draft, delay)
+
+def _schedule_retry(report_id, draft):
+    # Doubles from the flush delay up to REPORT_FLUSH_RETRY_MAX_SECONDS; the
+    # max delay has usually passed by now, so it cannot set the pace
+    draft['failures'] += 1
+    base = max(REPORT_FLUSH_DELAY_SECONDS, 0.1)
+    delay = min(REPORT_FLUSH_RETRY_MAX_SECONDS, base * 2 ** min(draft['failures'] - 1, 32))
+    _start_timer(report_id, draft, delay)
+
+def patch_report(report_id, version, changes):
+    while True:
+        draft = _load(report_id)
+        if draft is None:
+            return {'data': None, 'error': None}
+        with draft['lock']:
+            if draft['closed']:
+                # Saved and dropped while we waited; start from the database
+                continue
+            if draft['conflict'] is not None:
+                _raise_conflict(report_id, draft)
+            if version != draft['version']:
+                # Ahead means edits made through another process have not been
+                # saved yet, so retrying after its flush delay can succeed
+                retry_after = REPORT_FLUSH_MAX_DELAY_SECONDS if version > draft['version'] else None
+                raise VersionConflict(draft['version'], retry_after)
+            # Every delta is applied before any is kept, so a bad one changes nothing
+            updated = {name: apply_delta(draft['fields'][name], ops) for name, ops in changes.items()}
+            draft['fields'].update(updated)
+            draft['dirty'].update(updated)
+            draft['version'] += 1
+            draft['edited_at'] = datetime.now(timezone.utc).isoformat()
+            _schedule(report_id, draft)
+            registry.inc('report_patches_total', {})
+            return {'data': {'id': report_id, 'version': draft['version']}, 'error': None}
+
+def flush_report(report_id):
+    with _drafts_lock:
+        draft = _drafts.get(report_id)
+    if draft is None:
+        return
+    # Snapshot under the lock and write outside it, so PATCHes arriving
+    # meanwhile are not held up by the database round-trip
+    with draft['lock']:
+        if draft['closed'] or draft['flushing'] or draft['conflict'] is not None or not draft['dirty']:
+            return
+        dirty = draft['dirty']
+        data = {name: draft['fields'][name] for name in dirty}
+        data['version'] = draft['version']
+        expected_version = draft['saved_version']
+        draft['dirty'] = set()
+        draft['first_dirty_at'] = None
+        draft['flushing'] = True
+        draft['idle'].clear()
+    try:
+        response = update_report_version(report_id, data, expected_version)
+        current = None
+        if not response.data:
+            current = get_report_for_update(report_id).data
+    except Exception as e:
+        logger.error("Error saving report %s draft: %s", report_id, e)
+        with draft['lock']:
+            draft['flushing'] = False
+            draft['idle'].set()
+            draft['dirty'] |= dirty
+            if not draft['closed']:
+                _schedule_retry(report_id, draft)
+        return
+    registry.inc('report_flushes_total', {})
+    with draft['lock']:
+        draft['flushing'] = False
+        draft['idle'].set()
+        if draft['closed']:
+            return
+        if not response.data and not current:
+            logger.warning("Report %s was deleted; discarding versions %d-%d",
+                           report_id, expected_version + 1, draft['version'])
+            _close(report_id, draft)
+            return
+        if not response.data:
+            draft['dirty'] |= dirty
+            draft['conflict'] = (current[0].get('version') or 0) if current else 0
+            logger.warning("Report %s was changed elsewhere; holding versions %d-%d as a conflict",
+                           report_id, expected_version + 1, draft['version'])
+            return
+        index_report(response.data[0])
+        draft['saved_version'] = data['version']
+        draft['failures'] = 0
+        if draft['dirty']:
+            # Edited while the write was in flight; save those next
+            _schedule(report_id, draft)
+        else:
+            _close(report_id, draft)
+
+def discard_draft(report_id):
+    # For full overwrites; returns the version the draft had reached
+    with _drafts_lock:
+        draft = _drafts.get(report_id)
+    if draft is None:
+        return None
+    while True:
+        # An in-flight write lands first, so the overwrite comes after it
+        draft['idle'].wait()
+        with draft['lock']:
+            if draft['flushing']:
+                continue
+            _close(report_id, draft)
+            return draft['version']
+
+def next_version(report_id):
+    # Full overwrites drop any draft and move past its version
+    version = discard_draft(report_id)
+    if version is None:
+        response = get_report_for_update(report_id)
+        version = (response.data[0].get('version') or 0) if response.data else 0
+    return version + 1
+
+def draft_overlay(report):
+    # Reads in this process see edits that are not saved yet
+    if not report:
+        return report
+    with _drafts_lock:
+        draft = _drafts.get(report.get('id'))
+    if draft is None:
+        return report
+    with draft['lock']:
+        if draft['conflict'] is not None:
+            _raise_conflict(report.get('id'), draft)
+        if draft['version'] == draft['saved_version']:
+            return report
+        # updated_at moves with the edits so Last-Modified does too
+        return {**report, **draft['fields'], 'version': draft['version'], 'updated_at': draft['edited_at']}
+
+@atexit.register
+def flush_all():
+    with _drafts_lock:
+        pending = list(_drafts)
+    for report_id in pending:
+        flush_report(report_id)
@@ -0,0 +1,27 @@
+import re
+
+# Extractive summariser used to draft a report from a transcript. An LLM
+# backend can replace generate_report_fields without touching the job queue.
+
+SECTION_KEYWORDS = {
+    'symptoms': ('pain', 'ache', 'cough', 'fever', 'tired', 'fatigue', 'nausea', 'dizzy',
+                 'swelling', 'headache', 'symptom', 'feeling'),
+    'medications': ('mg', 'medication', 'prescribe', 'tablet', 'dose', 'take', 'spray'),
+    'followups': ('follow up', 'follow-up', 'return', 'come back', 'next week', 'weeks',
+                  'appointment', 'referral'),
+}
+
+SUMMARY_SENTENCES = 3
+
+def _sentences(text):
+    parts = re.split(r'(?<=[.!?])\s+|\n+', text)
+    return [part.strip() for part in parts if part.strip()]
+
+def generate_report_fields(transcript_text):
+    sentences = _sentences(transcript_text or '')
+    report = {'summary': ' '.join(sentences[:SUMMARY_SENTENCES])}
+    for section, keywords in SECTION_KEYWORDS.items():
+        matches = [s for s in sentences if any(k in s.lower() for k in keywords)]
+        report[section] = ' '.join(matches)
+    report['notes'] = ''
+    return report
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from models.report import get_report_by_session_id, add_report, update_report
+from models.report_job import get_report_job_by_id, add_report_job, update_report_job
+from models.transcript import get_transcript_segments
+from services.report_generator import generate_report_fields
+from services.event_service import publish_session_event
+from services.report_draft_service import next_version
+from services.search_service import index_report
+from services.stats_service import record_created
+
+REPORT_JOB_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', 2))
+REPORT_JOB_QUEUE_SIZE = int(os.getenv('REPORT_JOB_QUEUE_SIZE', 20))
+RETRY_AFTER_SECONDS = 30
+MAX_TRACKED_JOBS = 1000
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=REPORT_JOB_WORKERS, thread_name_prefix='report-job')
+# One slot per running or waiting job; request threads never block on it
+_slots = threading.BoundedSemaphore(REPORT_JOB_WORKERS + REPORT_JOB_QUEUE_SIZE)
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+class QueueFullError(Exception):
+    pass
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def _save_job(job_id, **changes):
+    changes['updated_at'] = _now()
+    with _jobs_lock:
+        _jobs[job_id].update(changes)
+        job = dict(_jobs[job_id])
+    publish_session_event(job['session_id'], 'report_job', job)
+    try:
+        update_report_job(job_id, changes)
+    except Exception as e:
+        logger.error("Error saving report job %s: %s", job_id, e)
+
+def _run_job(job_id, session_id):
+    try:
+        _save_job(job_id, status='running', progress=10)
+        segments = get_transcript_segments(session_id).data or []
+        if not segments:
+            raise ValueError('Session has no transcript')
+        transcript_text = '\n'.join(segment['text'] for segment in segments)
+
+        _save_job(job_id, progress=40)
+        fields = generate_report_fields(transcript_text)
+
+        _save_job(job_id, progress=80)
+        existing = get_report_by_session_id(session_id)
+        if existing.data:
+            report_id = existing.data[0]['id']
+            response = update_report(report_id, {**fields, 'version': next_version(report_id)})
+        else:
+            response = add_report({'session_id': session_id, **fields})
+            if response.data:
+                record_created('reports', response.data[0])
+        report_id = response.data[0]['id'] if response.data else None
+        if response.data:
+            index_report(response.data[0])
+
+        _save_job(job_id, status='completed', progress=100, report_id=report_id)
+    except Exception as e:
+        logger.error("Report job %s failed: %s", job_id, e)
+        _save_job(job_id, status='failed', error=str(e))
+    finally:
+        _slots.release()
+
+def enqueue_report_generation(session_id):
+    if not _slots.acquire(blocking=False):
+        raise QueueFullError('Report generation queue is full')
+    job = {
+        'id': uuid.uuid4().hex,
+        'session_id': session_id,
+        'status': 'queued',
+        'progress': 0,
+        'report_id': None,
+        'error': None,
+        'created_at': _now(),
+        'updated_at': _now()
+    }
+    try:
+        add_report_job(job)
+    except Exception as e:
+        logger.error("Error creating report job: %s", e)
+        _slots.release()
+        return {'data': None, 'error': str(e)}
+    with _jobs_lock:
+        if len(_jobs) >= MAX_TRACKED_JOBS:
+            for job_id in [k for k, v in _jobs.items() if v['status'] in ('completed', 'failed')]:
+                del _jobs[job_id]
+        _jobs[job['id']] = dict(job)
+    publish_session_event(session_id, 'report_job', dict(job))
+    _executor.submit(_run_job, job['id'], session_id)
+    return {'data': job, 'error': None}
+
+def fetch_report_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job:
+            return {'data': dict(job), 'error': None}
+    # Jobs started by another worker process are only visible in the database
+    response = get_report_job_by_id(job_id)
+    return {
+        'data': response.data[0] if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
@@ -1,22 +1,82 @@
-from models.report import get_all_reports, get_report_by_id, add_report, update_report, delete_report
+from models.report import (
+    get_all_reports,
+    get_report_by_id,
+    get_report_by_id_async,
+    get_report_by_session_id,
+    get_report_by_session_id_async,
+    add_report,
+    update_report,
+    delete_report
+)
+from services.report_draft_service import discard_draft, draft_overlay, next_version
+from services.search_service import index_report, unindex_report
+from services.stats_service import record_created, record_removed
+from utils.fields import pick
+from utils.pagination import DEFAULT_LIMIT, make_page
 
-def fetch_all_reports():
-    return get_all_reports()
+def fetch_all_reports(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
+    response = get_all_reports(limit, after, filters, fields)
+    rows, next_cursor = make_page(response.data, limit)
+    return {
+        'data': rows,
+        'error': response.error if hasattr(response, 'error') else None,
+        'next_cursor': next_cursor
+    }
 
-def fetch_report_by_id(report_id):
-    report = get_report_by_id(report_id)
-    if not report['data']:
-        return {"error": "Report not found"}
-    return report['data']
+def fetch_report_by_id(report_id, fields=None):
+    response = get_report_by_id(report_id)
+    return {
+        'data': pick(draft_overlay(response.data[0]), fields) if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
+
+async def fetch_report_by_id_async(report_id, fields=None):
+    response = await get_report_by_id_async(report_id)
+    return {
+        'data': pick(draft_overlay(response.data[0]), fields) if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
+
+def fetch_report_by_session_id(session_id):
+    response = get_report_by_session_id(session_id)
+    return {
+        'data': draft_overlay(response.data[0]) if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
+
+async def fetch_report_by_session_id_async(session_id):
+    response = await get_report_by_session_id_async(session_id)
+    return {
+        'data': draft_overlay(response.data[0]) if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
 
 def create_report(report_data):
-    new_report = add_report(report_data)
-    return new_report
+    response = add_report(report_data)
+    if response.data:
+        index_report(response.data[0])
+        record_created('reports', response.data[0])
+    return {
+        'data': response.data[0] if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
 
 def modify_report(report_id, report_data):
-    updated_report = update_report(report_id, report_data)
-    return updated_report
+    response = update_report(report_id, {**report_data, 'version': next_version(report_id)})
+    for report in response.data or []:
+        index_report(report)
+    return {
+        'data': response.data[0] if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
 
 def remove_report(report_id):
-    deleted_report = delete_report(report_id)
-    return deleted_report
+    discard_draft(report_id)
+    response = delete_report(report_id)
+    unindex_report(report_id)
+    for report in response.data or []:
+        record_removed('reports', report)
+    return {
+        'data': response.data[0] if response.data and len(response.data) > 0 else None,
+        'error': response.error if hasattr(response, 'error') else None
+    }
@@ -0,0 +1,190 @@
+import logging
+import os
+import re
+import threading
+import time
+
+from models.report import REPORT_TEXT_FIELDS, get_all_reports, get_reports_changed_since
+from models.session import get_all_sessions, get_session_by_id, get_sessions_changed_since
+from models.transcript import get_all_transcript_segments
+from utils.search_index import InvertedIndex, parse_query
+
+SEARCH_REFRESH_SECONDS = float(os.getenv('SEARCH_REFRESH_SECONDS', 30))
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 1000))
+SNIPPET_CHARS = 160
+
+SEARCH_KINDS = ('transcript', 'report')
+SESSION_OWNER_FIELDS = ('id', 'patient_id', 'doctor_id', 'updated_at')
+
+logger = logging.getLogger(__name__)
+
+# One index per process over transcript segments and reports. Writes made
+# through this process are indexed as they happen; writes from other
+# processes are picked up by a catch-up scan at most SEARCH_REFRESH_SECONDS
+# after they land.
+search_index = InvertedIndex(keys=('kind', 'session_id', 'patient_id', 'doctor_id'))
+
+_sessions = {}
+_state = {'built': False, 'refreshed_at': 0.0, 'sessions': None, 'reports': None, 'segments': None}
+_refresh_lock = threading.Lock()
+
+def _session_owner(session_id):
+    owner = _sessions.get(session_id)
+    if owner is None and session_id is not None:
+        # Indexing runs after a write has succeeded, so it must not raise
+        try:
+            response = get_session_by_id(session_id)
+        except Exception as e:
+            logger.warning("Could not load session %s for the search index: %s", session_id, e)
+            return None, None
+        session = response.data[0] if response.data else {}
+        owner = (session.get('patient_id'), session.get('doctor_id'))
+        _sessions[session_id] = owner
+    return owner or (None, None)
+
+def _report_text(report):
+    parts = []
+    for name in REPORT_TEXT_FIELDS:
+        value = report.get(name)
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(item) for item in value)
+        elif value:
+            parts.append(str(value))
+    return '\n'.join(parts)
+
+def index_report(report):
+    patient_id, doctor_id = _session_owner(report.get('session_id'))
+    search_index.add(('report', report['id']), _report_text(report), kind='report', id=report['id'],
+                     session_id=report.get('session_id'), patient_id=patient_id, doctor_id=doctor_id)
+
+def unindex_report(report_id):
+    search_index.remove(('report', report_id))
+
+def index_segments(segments):
+    for segment in segments:
+        patient_id, doctor_id = _session_owner(segment['session_id'])
+        search_index.add(('transcript', segment['id']), segment.get('text') or '', kind='transcript',
+                         id=segment['id'], session_id=segment['session_id'], start_ms=segment.get('start_ms'),
+                         end_ms=segment.get('end_ms'), patient_id=patient_id, doctor_id=doctor_id)
+
+def unindex_session_segments(session_id):
+    search_index.remove_where(kind='transcript', session_id=session_id)
+
+def index_session(session):
+    owner = (session.get('patient_id'), session.get('doctor_id'))
+    if _sessions.get(session['id'], owner) != owner:
+        search_index.update_where({'session_id': session['id']}, patient_id=owner[0], doctor_id=owner[1])
+    _sessions[session['id']] = owner
+
+def unindex_session(session_id):
+    search_index.remove_where(session_id=session_id)
+    _sessions.pop(session_id, None)
+
+def _latest(mark, row):
+    changed = (row.get('updated_at'), row['id'])
+    if changed[0] is None:
+        return mark
+    return changed if mark is None or changed > mark else mark
+
+def _scan_by_id(fetch, handle, after=None, **kwargs):
+    # Returns the newest (updated_at, id) seen and the last id read
+    mark = None
+    while True:
+        page = fetch(SEARCH_PAGE_SIZE, after, **kwargs).data or []
+        rows = page[:SEARCH_PAGE_SIZE]
+        handle(rows)
+        for row in rows:
+            mark = _latest(mark, row)
+        if rows:
+            after = rows[-1]['id']
+        if len(page) <= SEARCH_PAGE_SIZE:
+            return mark, after
+
+def _scan_changes(fetch, handle, mark, fields=None):
+    while True:
+        rows = fetch(mark, SEARCH_PAGE_SIZE, fields).data or []
+        handle(rows)
+        for row in rows:
+            mark = _latest(mark, row)
+        if len(rows) < SEARCH_PAGE_SIZE:
+            return mark
+
+def _each(handler):
+    def handle(rows):
+        for row in rows:
+            handler(row)
+    return handle
+
+def _build():
+    # Full scan by id; later refreshes only read rows changed since
+    _state['sessions'], _ = _scan_by_id(get_all_sessions, _each(index_session), fields=SESSION_OWNER_FIELDS)
+    _state['reports'], _ = _scan_by_id(get_all_reports, _each(index_report))
+    _, _state['segments'] = _scan_by_id(get_all_transcript_segments, index_segments)
+    _state['built'] = True
+
+def _catch_up():
+    _state['sessions'] = _scan_changes(get_sessions_changed_since, _each(index_session), _state['sessions'],
+                                       SESSION_OWNER_FIELDS)
+    _state['reports'] = _scan_changes(get_reports_changed_since, _each(index_report), _state['reports'])
+    _, _state['segments'] = _scan_by_id(get_all_transcript_segments, index_segments, _state['segments'])
+
+def refresh_index(force=False):
+    # Concurrent searches wait for one refresh instead of each running one
+    with _refresh_lock:
+        if not force and time.monotonic() - _state['refreshed_at'] < SEARCH_REFRESH_SECONDS:
+            return
+        started = time.monotonic()
+        if _state['built']:
+            _catch_up()
+        else:
+            _build()
+            logger.info("Built search index: %d documents in %.2fs", len(search_index),
+                        time.monotonic() - started)
+        _state['refreshed_at'] = time.monotonic()
+
+def _snippet(text, terms):
+    match = None
+    for term in terms:
+        match = re.search(r'\b' + re.escape(term) + r'\b', text, re.IGNORECASE)
+        if match:
+            break
+    start = max(0, match.start() - SNIPPET_CHARS // 2) if match else 0
+    snippet = text[start:start + SNIPPET_CHARS].strip()
+    if start > 0:
+        snippet = '...' + snippet
+    if start + SNIPPET_CHARS < len(text):
+        snippet += '...'
+    return snippet
+
+def parse_search_filters(args):
+    filters = {}
+    for name in ('patient_id', 'doctor_id', 'session_id'):
+        if args.get(name):
+            try:
+                filters[name] = int(args[name])
+            except ValueError:
+                raise ValueError(f"{name} must be an integer")
+    kind = args.get('kind')
+    if kind:
+        if kind not in SEARCH_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(SEARCH_KINDS)}")
+        filters['kind'] = kind
+    return filters
+
+def search(query, filters=None, limit=20):
+    try:
+        terms, phrases = parse_query(query)
+        if not terms:
+            return {'data': [], 'error': None, 'total': 0}
+        refresh_index()
+        total, hits = search_index.search(terms, phrases, filters, limit)
+        results = []
+        for score, _, attrs, text in hits:
+            results.append({**attrs, 'score': round(score, 4), 'snippet': _snippet(text, terms)})
+        return {'data': results, 'error': None, 'total': total}
+    except Exception as e:
+        logger.error("Error searching for %r: %s", query, e)
+        return {'data': None, 'error': str(e)}
+
+def index_stats():
+    return {**search_index.stats(), 'built': _state['built'], 'sessions': len(_sessions)}
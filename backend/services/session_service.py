@@ -1,28 +1,142 @@
-from models.session import get_all_sessions, get_session_by_id, add_session, update_session, delete_session
+import asyncio
+from datetime import datetime
+from models.session import (
+    get_all_sessions,
+    get_patient_timeline,
+    get_patient_timeline_async,
+    get_session_by_id,
+    get_session_by_id_async,
+    add_session,
+    update_session,
+    delete_session
+)
+from models.patient import get_patient_by_id, get_patient_by_id_async
+from models.doctor import get_doctor_by_id, get_doctor_by_id_async
+from services.search_service import index_session, unindex_session
+from services.stats_service import SESSION_STATS_FIELDS, record_changed, record_created, record_removed
+from utils.fields import pick
+from utils.pagination import DEFAULT_LIMIT, decode_cursor, encode_cursor, make_page
 
-def fetch_all_sessions():
-    response = get_all_sessions()
+def fetch_all_sessions(limit=DEFAULT_LIMIT, after=None, filters=None, fields=None):
+    response = get_all_sessions(limit, after, filters, fields)
+    rows, next_cursor = make_page(response.data, limit)
     return {
-        'data': response.data if response.data else [],
-        'error': response.error if hasattr(response, 'error') else None
+        'data': rows,
+        'error': response.error if hasattr(response, 'error') else None,
+        'next_cursor': next_cursor
+    }
+
+def parse_timeline_cursor(cursor):
+    values = decode_cursor(cursor)
+    created_at, session_id = values.get('created_at'), values.get('id')
+    if not isinstance(session_id, int) or not isinstance(created_at, str):
+        raise ValueError('Invalid cursor')
+    # The timestamp is interpolated into a PostgREST filter, so it must parse
+    try:
+        datetime.fromisoformat(created_at)
+    except ValueError:
+        raise ValueError('Invalid cursor')
+    return created_at, session_id
+
+def _format_timeline_entry(session):
+    entry = {k: v for k, v in session.items() if k not in ('reports', 'transcript_segments', 'first_segment')}
+    reports = session.get('reports') or []
+    counts = session.get('transcript_segments') or []
+    first_segment = session.get('first_segment') or []
+    entry['report'] = reports[0] if reports else None
+    entry['transcript'] = {
+        'segment_count': counts[0]['count'] if counts else 0,
+        'preview': first_segment[0]['text'] if first_segment else None
     }
+    return entry
+
+def _timeline_page(response, limit):
+    rows = response.data or []
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({'created_at': rows[-1]['created_at'], 'id': rows[-1]['id']})
+    return {
+        'data': [_format_timeline_entry(session) for session in rows],
+        'error': response.error if hasattr(response, 'error') else None,
+        'next_cursor': next_cursor
+    }
+
+def fetch_patient_timeline(patient_id, limit=DEFAULT_LIMIT, before=None):
+    return _timeline_page(get_patient_timeline(patient_id, limit, before), limit)
 
-def fetch_session_by_id(session_id):
-    response = get_session_by_id(session_id)
+async def fetch_patient_timeline_async(patient_id, limit=DEFAULT_LIMIT, before=None):
+    return _timeline_page(await get_patient_timeline_async(patient_id, limit, before), limit)
+
+SESSION_INCLUDES = ('patient', 'doctor')
+
+def parse_includes(value):
+    includes = [item.strip() for item in (value or '').split(',') if item.strip()]
+    unknown = [item for item in includes if item not in SESSION_INCLUDES]
+    if unknown:
+        raise ValueError(f"Unknown include: {', '.join(unknown)}")
+    return includes
+
+def _session_result(response):
     return {
         'data': response.data[0] if response.data and len(response.data) > 0 else None,
         'error': response.error if hasattr(response, 'error') else None
     }
 
+def _attach_includes(result, fields, patient=None, doctor=None):
+    # Copies the cached session, trimmed to fields, before adding to it
+    result['data'] = pick(result['data'], fields) if fields else dict(result['data'])
+    if patient is not None:
+        result['data']['patient'] = patient['data']
+    if doctor is not None:
+        result['data']['doctor'] = doctor.data[0] if doctor.data else None
+    return result
+
+def fetch_session_by_id(session_id, includes=(), fields=None):
+    result = _session_result(get_session_by_id(session_id))
+    if not result['data'] or not (includes or fields):
+        return result
+    session = result['data']
+    patient = get_patient_by_id(session['patient_id']) if 'patient' in includes else None
+    doctor = get_doctor_by_id(session['doctor_id']) if 'doctor' in includes else None
+    return _attach_includes(result, fields, patient, doctor)
+
+async def fetch_session_by_id_async(session_id, includes=(), fields=None):
+    result = _session_result(await get_session_by_id_async(session_id))
+    if not result['data'] or not (includes or fields):
+        return result
+    session = result['data']
+
+    async def skip():
+        return None
+
+    # The patient and doctor lookups are independent, so run them together
+    patient, doctor = await asyncio.gather(
+        get_patient_by_id_async(session['patient_id']) if 'patient' in includes else skip(),
+        get_doctor_by_id_async(session['doctor_id']) if 'doctor' in includes else skip()
+    )
+    return _attach_includes(result, fields, patient, doctor)
+
 def create_session(session_data):
     response = add_session(session_data)
+    if response.data:
+        index_session(response.data[0])
+        record_created('sessions', response.data[0])
     return {
         'data': response.data[0] if response.data and len(response.data) > 0 else None,
         'error': response.error if hasattr(response, 'error') else None
     }
 
 def modify_session(session_id, session_data):
+    # The counts need the old patient and status when those change
+    previous = None
+    if 'patient_id' in session_data or 'status' in session_data:
+        previous = get_session_by_id(session_id).data
     response = update_session(session_id, session_data)
+    for session in response.data or []:
+        index_session(session)
+        if previous:
+            record_changed('sessions', pick(previous[0], SESSION_STATS_FIELDS), session)
     return {
         'data': response.data[0] if response.data and len(response.data) > 0 else None,
         'error': response.error if hasattr(response, 'error') else None
@@ -30,6 +144,9 @@ def modify_session(session_id, session_data):
 
 def remove_session(session_id):
     response = delete_session(session_id)
+    unindex_session(session_id)
+    for session in response.data or []:
+        record_removed('sessions', session)
     return {
         'data': response.data[0] if response.data and len(response.data) > 0 else None,
         'error': response.error if hasattr(response, 'error') else None
@@ -0,0 +1,203 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from models.doctor import count_doctors
+from models.patient import count_patients
+from models.report import get_all_reports
+from models.session import get_all_sessions
+
+STATS_RECONCILE_SECONDS = float(os.getenv('STATS_RECONCILE_SECONDS', 300))
+STATS_PAGE_SIZE = 1000
+STATS_DAYS = 14
+SESSION_STATS_FIELDS = ('id', 'patient_id', 'status', 'created_at')
+REPORT_STATS_FIELDS = ('id', 'session_id')
+# Tables whose changes are replayed onto a reconcile (see _replay)
+SCANNED = ('sessions', 'reports')
+
+logger = logging.getLogger(__name__)
+
+def _empty():
+    return {
+        'patients': 0,
+        'doctors': 0,
+        'sessions': 0,
+        'reports': 0,
+        'sessions_by_day': Counter(),
+        'sessions_by_patient': Counter(),
+        'sessions_by_status': Counter(),
+        'reports_by_session': Counter(),
+        'session_ids': set(),
+        # Sessions that exist and have no report yet
+        'pending_sessions': set()
+    }
+
+# Counts kept up to date by the service write functions and replaced by a
+# full recount every STATS_RECONCILE_SECONDS, which also picks up writes
+# made by other worker processes
+_stats = _empty()
+_state = {'reconciled_at': None, 'reconciled_time': None, 'reconciling': False, 'scanned': {}, 'pending': []}
+_lock = threading.Lock()
+_first_lock = threading.Lock()
+
+def _bump(counter, key, sign):
+    counter[key] += sign
+    if counter[key] <= 0:
+        del counter[key]
+
+def _utc_day(value):
+    # Timestamps may carry any offset; days are counted in UTC
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return ''
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).date().isoformat()
+
+def _track_pending(stats, session_id):
+    if session_id in stats['session_ids'] and not stats['reports_by_session'][session_id]:
+        stats['pending_sessions'].add(session_id)
+    else:
+        stats['pending_sessions'].discard(session_id)
+
+def _apply(stats, kind, row, sign):
+    stats[kind] += sign
+    if kind == 'sessions':
+        _bump(stats['sessions_by_day'], _utc_day(row.get('created_at')), sign)
+        _bump(stats['sessions_by_patient'], row.get('patient_id'), sign)
+        _bump(stats['sessions_by_status'], row.get('status'), sign)
+        if sign > 0:
+            stats['session_ids'].add(row.get('id'))
+        else:
+            stats['session_ids'].discard(row.get('id'))
+        _track_pending(stats, row.get('id'))
+    elif kind == 'reports':
+        _bump(stats['reports_by_session'], row.get('session_id'), sign)
+        _track_pending(stats, row.get('session_id'))
+
+def _record(kind, row_id, created, changes):
+    with _lock:
+        for row, sign in changes:
+            _apply(_stats, kind, row, sign)
+        if _state['reconciling'] and kind in SCANNED:
+            _state['pending'].append((kind, row_id, created, _state['scanned'].get(kind), changes))
+
+def _replay(stats):
+    # Called with _lock held. A reconcile reads each table in id order, so
+    # for a change made while it ran: a new row was counted if the scan got
+    # that far, and an update or delete was counted (in its old state) only
+    # if the scan had already passed the row
+    for kind, row_id, created, position, changes in _state['pending']:
+        final = _state['scanned'].get(kind)
+        if created:
+            missed = final is None or row_id > final
+        else:
+            missed = position is not None and row_id <= position
+        if missed:
+            for row, sign in changes:
+                _apply(stats, kind, row, sign)
+
+def record_created(kind, row):
+    _record(kind, row.get('id'), True, [(row, 1)])
+
+def record_removed(kind, row):
+    _record(kind, row.get('id'), False, [(row, -1)])
+
+def record_changed(kind, old, new):
+    _record(kind, new.get('id'), False, [(old, -1), ({**old, **new}, 1)])
+
+def _scan(fetch, kind, fields, stats):
+    after = None
+    while True:
+        page = fetch(STATS_PAGE_SIZE, after, fields=fields).data or []
+        rows = page[:STATS_PAGE_SIZE]
+        for row in rows:
+            _apply(stats, kind, row, 1)
+        if rows:
+            after = rows[-1]['id']
+            with _lock:
+                _state['scanned'][kind] = after
+        if len(page) <= STATS_PAGE_SIZE:
+            return
+
+def _reconcile():
+    started = time.monotonic()
+    fresh = _empty()
+    _scan(get_all_sessions, 'sessions', SESSION_STATS_FIELDS, fresh)
+    _scan(get_all_reports, 'reports', REPORT_STATS_FIELDS, fresh)
+    # Counted last and not replayed: a count is a single instant
+    fresh['patients'] = count_patients().count or 0
+    fresh['doctors'] = count_doctors().count or 0
+    with _lock:
+        _replay(fresh)
+        _stats.update(fresh)
+        _state['reconciled_at'] = time.monotonic()
+        _state['reconciled_time'] = datetime.now(timezone.utc).isoformat()
+    logger.info("Reconciled dashboard stats in %.2fs", time.monotonic() - started)
+
+def _run_reconcile():
+    try:
+        _reconcile()
+    except Exception as e:
+        logger.error("Error reconciling dashboard stats: %s", e)
+    finally:
+        with _lock:
+            _state['reconciling'] = False
+            _state['scanned'] = {}
+            _state['pending'] = []
+
+def _ensure_reconciled():
+    if _state['reconciled_at'] is None:
+        # Nothing to serve yet, so the first requests wait for one count
+        with _first_lock:
+            if _state['reconciled_at'] is None:
+                with _lock:
+                    _state['reconciling'] = True
+                _run_reconcile()
+        return _state['reconciled_at'] is not None
+    with _lock:
+        fresh = time.monotonic() - _state['reconciled_at'] < STATS_RECONCILE_SECONDS
+        if fresh or _state['reconciling']:
+            return True
+        _state['reconciling'] = True
+    # Later recounts run in the background while the current counts serve
+    threading.Thread(target=_run_reconcile, name='stats-reconcile', daemon=True).start()
+    return True
+
+# Raises ValueError with a client-facing message on bad input
+def parse_patient_ids(value):
+    try:
+        return [int(item) for item in (value or '').split(',') if item.strip()]
+    except ValueError:
+        raise ValueError('patient_id must be a comma-separated list of ids')
+
+def fetch_stats(patient_ids=()):
+    try:
+        if not _ensure_reconciled():
+            return {'data': None, 'error': 'Statistics are not available'}
+        today = datetime.now(timezone.utc).date()
+        days = [(today - timedelta(days=offset)).isoformat() for offset in range(STATS_DAYS - 1, -1, -1)]
+        with _lock:
+            by_day = {day: _stats['sessions_by_day'].get(day, 0) for day in days}
+            data = {
+                'patients': _stats['patients'],
+                'doctors': _stats['doctors'],
+                'sessions': _stats['sessions'],
+                'reports': _stats['reports'],
+                'pending_reports': len(_stats['pending_sessions']),
+                'sessions_today': by_day[days[-1]],
+                'sessions_this_week': sum(by_day[day] for day in days[-7:]),
+                'sessions_by_day': by_day,
+                'sessions_by_status': {str(status): count for status, count in _stats['sessions_by_status'].items()},
+                'sessions_by_patient': {str(patient_id): _stats['sessions_by_patient'].get(patient_id, 0)
+                                        for patient_id in patient_ids},
+                'reconciled_at': _state['reconciled_time']
+            }
+        return {'data': data, 'error': None}
+    except Exception as e:
+        logger.error("Error in fetch_stats: %s", e)
+        return {'data': None, 'error': str(e)}
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import wave
+
+# Transcriber backends. This module runs inside the transcription process
+# pool, so it must stay importable without Flask or Supabase. transcribe()
+# returns the words heard as (start seconds, end seconds, text) with the
+# text's leading space, so segments can be cut to a time window.
+
+_WORDS = ['patient', 'reports', 'pain', 'since', 'last', 'week', 'doctor', 'asks',
+          'about', 'sleep', 'appetite', 'medication', 'dose', 'follow', 'up', 'today']
+
+class FakeTranscriber:
+    # Deterministic words derived from the audio bytes, spread evenly over
+    # the audio, for CPU-only test machines
+    def transcribe(self, frames, sample_rate, channels, sample_width):
+        digest = hashlib.sha256(frames).digest()
+        duration = len(frames) / (sample_rate * channels * sample_width)
+        step = duration / 8
+        return [(i * step, (i + 1) * step, ' ' + _WORDS[b % len(_WORDS)]) for i, b in enumerate(digest[:8])]
+
+class WhisperTranscriber:
+    def __init__(self, model_name=None):
+        import whisper
+        self.model = whisper.load_model(model_name or os.getenv('WHISPER_MODEL', 'base'))
+
+    def transcribe(self, frames, sample_rate, channels, sample_width):
+        import numpy as np
+        if sample_width != 2:
+            raise ValueError('Whisper backend expects 16-bit PCM audio')
+        audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+        if channels > 1:
+            audio = audio.reshape(-1, channels).mean(axis=1)
+        if sample_rate != 16000:
+            positions = np.arange(0, len(audio), sample_rate / 16000.0)
+            audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+        result = self.model.transcribe(audio, fp16=False, word_timestamps=True)
+        return [(word['start'], word['end'], word['word'])
+                for segment in result['segments'] for word in segment.get('words', [])]
+
+TRANSCRIBERS = {
+    'fake': FakeTranscriber,
+    'whisper': WhisperTranscriber,
+}
+
+_instances = {}
+
+def get_transcriber(name):
+    if name not in TRANSCRIBERS:
+        raise ValueError(f"Unknown transcriber backend: {name}")
+    # Models are expensive to load, so keep one per backend per process
+    if name not in _instances:
+        _instances[name] = TRANSCRIBERS[name]()
+    return _instances[name]
+
+def transcribe_segment(path, backend, index, start_frame, frame_count, keep_from=0, keep_to=None):
+    # Each worker reads only its own slice of the file, so memory stays
+    # bounded by the segment length rather than the recording length
+    with wave.open(path, 'rb') as audio:
+        audio.setpos(start_frame)
+        frames = audio.readframes(frame_count)
+        sample_rate = audio.getframerate()
+        channels = audio.getnchannels()
+        sample_width = audio.getsampwidth()
+    words = get_transcriber(backend).transcribe(frames, sample_rate, channels, sample_width)
+    # The slice overlaps its neighbours; a word belongs to the segment whose
+    # window [keep_from, keep_to) holds its midpoint, so each is kept once
+    start = keep_from / sample_rate
+    end = (frame_count if keep_to is None else keep_to) / sample_rate
+    text = ''.join(word for word_start, word_end, word in words if start <= (word_start + word_end) / 2 < end)
+    return index, text.strip()
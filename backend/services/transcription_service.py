@@ -0,0 +1,254 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import uuid
+import wave
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from models.transcript import (
+    add_transcript_segments,
+    delete_transcript_segments,
+    get_transcript_segment_before,
+    get_transcript_segments,
+    get_transcript_window
+)
+from services.audio_pipeline import normalise_audio, source_frame
+from services.event_service import publish_session_event
+from services.search_service import index_segments, unindex_session_segments
+from services.transcribers import TRANSCRIBERS, transcribe_segment
+
+UPLOAD_DIR = os.getenv('UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'mediscribe-uploads'))
+UPLOAD_CHUNK_BYTES = int(os.getenv('UPLOAD_CHUNK_BYTES', 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 2 * 1024 * 1024 * 1024))
+TRANSCRIBER_BACKEND = os.getenv('TRANSCRIBER_BACKEND', 'whisper')
+SEGMENT_SECONDS = float(os.getenv('TRANSCRIBE_SEGMENT_SECONDS', 30))
+OVERLAP_SECONDS = float(os.getenv('TRANSCRIBE_OVERLAP_SECONDS', 2))
+TRANSCRIBE_WORKERS = int(os.getenv('TRANSCRIBE_WORKERS', os.cpu_count() or 2))
+
+logger = logging.getLogger(__name__)
+
+_TIME_UNITS = {'ms': 1, 's': 1000, 'm': 60000, 'h': 3600000}
+_DURATION_RE = re.compile(r'^(\d+(?:\.\d+)?)(ms|s|m|h)?$')
+_CLOCK_RE = re.compile(r'^(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)$')
+
+_pool = None
+_pool_lock = threading.Lock()
+# Drives the process pool for each upload so request threads return at once
+_coordinator = ThreadPoolExecutor(max_workers=int(os.getenv('TRANSCRIBE_JOBS', 2)),
+                                  thread_name_prefix='transcribe')
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn rather than fork: the parent is a threaded web server
+            _pool = ProcessPoolExecutor(max_workers=TRANSCRIBE_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def save_upload(session_id, stream):
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_DIR, f"session-{session_id}-{uuid.uuid4().hex}.upload")
+    written = 0
+    # Hashed as it is written; the digest keys the normalised audio cache
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'wb') as out:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise ValueError('Upload exceeds maximum size')
+                digest.update(chunk)
+                out.write(chunk)
+        if written == 0:
+            raise ValueError('Empty upload')
+    except Exception:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+def plan_segments(path, spans=None):
+    try:
+        with wave.open(path, 'rb') as audio:
+            sample_rate = audio.getframerate()
+            total_frames = audio.getnframes()
+    except (wave.Error, EOFError):
+        raise ValueError('Unsupported audio format, upload PCM WAV')
+
+    step = max(1, int(SEGMENT_SECONDS * sample_rate))
+    overlap = int(OVERLAP_SECONDS * sample_rate)
+    for index, start in enumerate(range(0, total_frames, step)):
+        end = min(start + step, total_frames)
+        read_start = max(0, start - overlap)
+        # Segments are transcribed with overlap on both sides so words cut at
+        # a boundary are still heard whole, then cut back to their nominal
+        # window (see transcribe_segment). Timestamps cover that window,
+        # mapped back to the recording from before silence was trimmed.
+        yield {
+            'index': index,
+            'start_frame': read_start,
+            'frame_count': min(end + overlap, total_frames) - read_start,
+            'keep_from': start - read_start,
+            'keep_to': end - read_start,
+            'start_ms': source_frame(spans, start) * 1000 // sample_rate,
+            'end_ms': (source_frame(spans, end - 1) + 1) * 1000 // sample_rate
+        }
+
+def _store_completed(session_id, pending):
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    rows = []
+    for future in done:
+        segment = pending.pop(future)
+        index, text = future.result()
+        rows.append({
+            'session_id': session_id,
+            'segment_index': index,
+            'start_ms': segment['start_ms'],
+            'end_ms': segment['end_ms'],
+            'text': text
+        })
+    response = add_transcript_segments(rows)
+    index_segments(response.data or [])
+    for row in response.data or rows:
+        publish_session_event(session_id, 'segment', row)
+    return len(rows)
+
+def transcribe_file(session_id, path, spans=None):
+    pool = _get_pool()
+    # Keep only a bounded window of segments in flight
+    window = TRANSCRIBE_WORKERS * 2
+    pending = {}
+    stored = 0
+    try:
+        delete_transcript_segments(session_id)
+        unindex_session_segments(session_id)
+        publish_session_event(session_id, 'transcription', {'session_id': session_id, 'status': 'processing'})
+        for segment in plan_segments(path, spans):
+            if len(pending) >= window:
+                stored += _store_completed(session_id, pending)
+            future = pool.submit(transcribe_segment, path, TRANSCRIBER_BACKEND, segment['index'],
+                                 segment['start_frame'], segment['frame_count'],
+                                 segment['keep_from'], segment['keep_to'])
+            pending[future] = segment
+        while pending:
+            stored += _store_completed(session_id, pending)
+        publish_session_event(session_id, 'transcription',
+                              {'session_id': session_id, 'status': 'completed', 'segments': stored})
+    except Exception as e:
+        logger.error("Transcription failed for session %s: %s", session_id, e)
+        for future in pending:
+            future.cancel()
+        publish_session_event(session_id, 'transcription',
+                              {'session_id': session_id, 'status': 'failed', 'error': str(e)})
+        raise
+    finally:
+        os.remove(path)
+
+def process_upload(session_id, raw_path, digest):
+    # Decoding and silence trimming take a while for long recordings, so
+    # they run here rather than in the upload request
+    path = raw_path + '.wav'
+    try:
+        publish_session_event(session_id, 'transcription', {'session_id': session_id, 'status': 'normalising'})
+        audio = normalise_audio(raw_path, digest, path)
+        segment_count = sum(1 for _ in plan_segments(path, audio['spans']))
+    except Exception as e:
+        logger.error("Could not prepare audio for session %s: %s", session_id, e)
+        if os.path.exists(path):
+            os.remove(path)
+        publish_session_event(session_id, 'transcription',
+                              {'session_id': session_id, 'status': 'failed', 'error': str(e)})
+        raise
+    finally:
+        os.remove(raw_path)
+    publish_session_event(session_id, 'transcription', {
+        'session_id': session_id,
+        'status': 'normalised',
+        'segments': segment_count,
+        'duration_ms': audio['source_ms'],
+        'speech_ms': audio['speech_ms'],
+        'cached': audio['cached']
+    })
+    transcribe_file(session_id, path, audio['spans'])
+
+def upload_session_audio(session_id, stream):
+    if TRANSCRIBER_BACKEND not in TRANSCRIBERS:
+        return {'data': None, 'error': f"Unknown transcriber backend: {TRANSCRIBER_BACKEND}"}
+    raw_path, digest = save_upload(session_id, stream)
+    _coordinator.submit(process_upload, session_id, raw_path, digest)
+    return {
+        'data': {
+            'session_id': session_id,
+            'status': 'processing'
+        },
+        'error': None
+    }
+
+def fetch_transcript(session_id):
+    response = get_transcript_segments(session_id)
+    segments = response.data or []
+    return {
+        'data': {
+            'session_id': session_id,
+            'raw_text': '\n'.join(segment['text'] for segment in segments),
+            'segments': segments
+        },
+        'error': response.error if hasattr(response, 'error') else None
+    }
+
+# Bare numbers are milliseconds, like the *_ms fields; `600s`, `10m` and
+# `1:05:00` also work. Raises ValueError with a client-facing message.
+def parse_time(name, value):
+    duration = _DURATION_RE.match(value.strip())
+    if duration:
+        return int(float(duration.group(1)) * _TIME_UNITS[duration.group(2) or 'ms'])
+    clock = _CLOCK_RE.match(value.strip())
+    if clock:
+        hours, minutes, seconds = clock.groups()
+        return int(((int(hours or 0) * 60 + int(minutes)) * 60 + float(seconds)) * 1000)
+    raise ValueError(f"{name} must be a time such as 600s, 10m, 10:00 or a number of milliseconds")
+
+# None when the whole transcript was asked for
+def parse_time_range(args):
+    if not any(args.get(name) for name in ('from', 'to', 'limit')):
+        return None
+    start_ms = parse_time('from', args['from']) if args.get('from') else 0
+    end_ms = parse_time('to', args['to']) if args.get('to') else None
+    if end_ms is not None and end_ms <= start_ms:
+        raise ValueError('to must be after from')
+    return start_ms, end_ms
+
+def fetch_transcript_range(session_id, start_ms, end_ms, limit):
+    # Segments overlapping [start_ms, end_ms), at most `limit` of them.
+    # Segments do not overlap each other, so only one can start before the
+    # window and still reach into it.
+    segments = []
+    if start_ms > 0:
+        before = get_transcript_segment_before(session_id, start_ms).data
+        if before and before[0]['end_ms'] > start_ms:
+            segments.append(before[0])
+    room = limit - len(segments)
+    # One extra row says whether the window continues past this page
+    rows = get_transcript_window(session_id, start_ms, end_ms, room + 1).data or []
+    segments.extend(rows[:room])
+    next_from = rows[room]['start_ms'] if len(rows) > room else None
+    last = get_transcript_segment_before(session_id).data
+    return {
+        'data': {
+            'session_id': session_id,
+            'from_ms': start_ms,
+            'to_ms': end_ms,
+            'duration_ms': last[0]['end_ms'] if last else 0,
+            'raw_text': '\n'.join(segment['text'] for segment in segments),
+            'segments': segments,
+            'next_from': next_from
+        },
+        'error': None
+    }
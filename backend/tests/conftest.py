@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Modules import each other as top-level packages (models, services, utils)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main refuses to start without a signing key
+os.environ.setdefault('JWT_SECRET', 'test-secret')
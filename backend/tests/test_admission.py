@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from flask import Flask, Response, jsonify, stream_with_context
+
+import utils.admission as admission
+import utils.auth as auth
+from utils.admission import AdmissionRejected, ConcurrencyLimiter, RateLimiter
+from utils.asgi import Router, StreamingResponse, dispatch
+
+
+def test_limiter_admits_up_to_its_limit_then_queues():
+    limiter = ConcurrencyLimiter(1, 1, 5)
+    assert limiter.acquire()
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(limiter.acquire()))
+    waiter.start()
+    while not limiter.waiting:
+        time.sleep(0.001)
+    # The queue is full, so a third request is turned away without waiting
+    assert not limiter.acquire()
+    limiter.release()
+    waiter.join(1)
+    assert admitted == [True]
+    assert (limiter.active, limiter.waiting) == (1, 0)
+
+
+def test_queued_request_gives_up_after_its_wait():
+    limiter = ConcurrencyLimiter(1, 1, 0.05)
+    assert limiter.acquire()
+    started = time.monotonic()
+    assert not limiter.acquire()
+    assert time.monotonic() - started >= 0.05
+    assert (limiter.active, limiter.waiting) == (1, 0)
+
+
+def test_waiting_requests_go_ahead_of_newcomers():
+    limiter = ConcurrencyLimiter(1, 1, 5)
+    assert limiter.acquire()
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(limiter.acquire()))
+    waiter.start()
+    while not limiter.waiting:
+        time.sleep(0.001)
+    # A newcomer arriving before the waiter wakes must not take the freed slot
+    with limiter._condition:
+        limiter.release()
+        assert not limiter.acquire()
+    waiter.join(1)
+    assert admitted == [True]
+
+
+def test_rate_limiter_allows_a_burst_then_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission.time, 'monotonic', lambda: now[0])
+    rate = RateLimiter(per_minute=60, burst=2)
+    assert rate.take('a') == 0
+    assert rate.take('a') == 0
+    assert rate.take('a') == pytest.approx(1.0)
+    # Buckets are per key
+    assert rate.take('b') == 0
+    now[0] += 1
+    assert rate.take('a') == 0
+
+
+def test_full_buckets_are_pruned(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(admission, 'MAX_RATE_KEYS', 2)
+    rate = RateLimiter(per_minute=60, burst=1)
+    rate.take('a')
+    now[0] += 10
+    rate.take('b')
+    rate.take('c')
+    assert 'a' not in rate._buckets
+
+
+def test_admit_raises_with_a_retry_after(monkeypatch):
+    monkeypatch.setitem(admission.ROUTE_CLASSES, 'test', {'wait_seconds': 0})
+    monkeypatch.setitem(admission._limits, 'test', (ConcurrencyLimiter(1, 0, 0), RateLimiter(60, 1)))
+    slot = admission.admit('test', 'user:1')
+    with pytest.raises(AdmissionRejected) as busy:
+        admission.admit('test', 'user:2')
+    assert (busy.value.status, busy.value.retry_after) == (503, 1)
+    with pytest.raises(AdmissionRejected) as rate:
+        admission.admit('test', 'user:1')
+    assert (rate.value.status, rate.value.retry_after) == (429, 1)
+    slot.release()
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv('JWT_SECRET', 'test-secret')
+    limiter = ConcurrencyLimiter(1, 0, 0)
+    monkeypatch.setitem(admission.ROUTE_CLASSES, 'test', {'wait_seconds': 0})
+    monkeypatch.setitem(admission._limits, 'test', (limiter, RateLimiter(6000, 100)))
+    monkeypatch.setitem(admission._endpoint_classes, 'stream', 'test')
+
+    app = Flask(__name__)
+    app.before_request(admission.admit_request)
+    app.teardown_request(admission.release_admission)
+    app.before_request(auth.require_auth)
+
+    @app.route('/stream')
+    def stream():
+        def chunks():
+            yield 'a'
+            yield 'b'
+        return Response(stream_with_context(chunks()))
+
+    @app.route('/plain')
+    def plain():
+        return jsonify({})
+
+    app.limiter = limiter
+    return app
+
+
+def _headers(user_id=1):
+    return {'Authorization': 'Bearer ' + auth.issue_access_token({'id': user_id, 'email': 'd@x', 'role': 'doctor'})}
+
+
+def test_streamed_response_holds_its_slot_until_it_ends(app):
+    client = app.test_client()
+    response = client.get('/stream', headers=_headers(), buffered=False)
+    chunks = iter(response.response)
+    assert next(chunks) == b'a'
+    assert app.limiter.active == 1
+    busy = app.test_client().get('/stream', headers=_headers(2))
+    assert busy.status_code == 503
+    assert busy.headers['Retry-After'] == '1'
+    assert list(chunks) == [b'b']
+    response.close()
+    assert app.limiter.active == 0
+    assert client.get('/stream', headers=_headers()).status_code == 200
+    assert app.limiter.active == 0
+
+
+def test_token_is_decoded_once_per_request(app, monkeypatch):
+    calls = []
+    decode = auth.decode_access_token
+    monkeypatch.setattr(auth, 'decode_access_token', lambda token: calls.append(token) or decode(token))
+    assert app.test_client().get('/stream', headers=_headers()).status_code == 200
+    assert len(calls) == 1
+    # Unclassed endpoints are not admitted at all
+    assert app.test_client().get('/plain', headers=_headers()).status_code == 200
+    assert len(calls) == 2
+
+
+def test_native_asgi_routes_are_admitted_and_released(app):
+    router = Router()
+    seen = []
+
+    @router.route('/stream', endpoint='stream')
+    async def stream(request):
+        async def chunks():
+            seen.append(app.limiter.active)
+            yield b'a'
+        return StreamingResponse(chunks(), 'text/plain'), 200
+
+    async def request(headers):
+        sent = []
+
+        async def receive():
+            await asyncio.sleep(1)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'method': 'GET', 'path': '/stream', 'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+                 'client': ('127.0.0.1', 1)}
+        await dispatch(router, scope, receive, send)
+        return sent[0]['status']
+
+    assert asyncio.run(request(_headers())) == 200
+    assert seen == [1]
+    assert app.limiter.active == 0
+
+    app.limiter.acquire()
+    assert asyncio.run(request(_headers())) == 503
+    app.limiter.release()
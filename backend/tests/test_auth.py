@@ -0,0 +1,50 @@
+import time
+
+import jwt
+import pytest
+
+from utils import auth
+
+USER = {'id': 7, 'email': 'doc@x', 'role': 'doctor'}
+
+
+@pytest.fixture(autouse=True)
+def secret(monkeypatch):
+    monkeypatch.setenv('JWT_SECRET', 'test-secret')
+
+
+def test_issued_tokens_identify_the_user():
+    token = auth.issue_access_token(USER)
+    assert auth.identify(f'Bearer {token}') == (USER, None)
+    assert auth.identify(f'bearer {token}') == (USER, None)
+
+
+def test_expired_tokens_are_rejected(monkeypatch):
+    monkeypatch.setattr(auth, 'ACCESS_TOKEN_TTL_SECONDS', -1)
+    token = auth.issue_access_token(USER)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        auth.decode_access_token(token)
+    assert auth.identify(f'Bearer {token}') == (None, 'Access token expired')
+
+
+def test_tokens_signed_with_another_secret_are_rejected():
+    token = jwt.encode({'sub': '7', 'exp': int(time.time()) + 60}, 'other-secret', algorithm=auth.JWT_ALGORITHM)
+    assert auth.identify(f'Bearer {token}') == (None, 'Invalid access token')
+
+
+def test_tokens_without_an_expiry_are_rejected():
+    token = jwt.encode({'sub': '7'}, 'test-secret', algorithm=auth.JWT_ALGORITHM)
+    assert auth.identify(f'Bearer {token}') == (None, 'Invalid access token')
+
+
+@pytest.mark.parametrize('header', ['', 'Bearer', 'Basic abc', 'Bearer not.a.token'])
+def test_missing_or_malformed_headers(header):
+    user, error = auth.identify(header)
+    assert user is None
+    assert error in ('Missing access token', 'Invalid access token')
+
+
+def test_startup_check_fails_without_a_secret(monkeypatch):
+    monkeypatch.delenv('JWT_SECRET')
+    with pytest.raises(ValueError, match='JWT_SECRET'):
+        auth.check_secret()
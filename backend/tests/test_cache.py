@@ -0,0 +1,182 @@
+import asyncio
+import threading
+
+import pytest
+
+from utils.cache import TTLCache
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+
+def start_waiters(cache, count, func, results):
+    threads = [threading.Thread(target=lambda: results.append(cache.load('users', 1, func))) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def wait_for_flight(cache, joined=0):
+    while (('users', '1') not in cache._flights) or cache.coalesced < joined:
+        threading.Event().wait(0.001)
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(60, 100)
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        release.wait(2)
+        return Response([{'id': 1}])
+
+    results = []
+    threads = start_waiters(cache, 1, load, results)
+    wait_for_flight(cache)
+    threads += start_waiters(cache, 4, load, results)
+    wait_for_flight(cache, joined=4)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(result is results[0] for result in results)
+    assert cache.stats()['coalesced'] == 4
+    assert cache.get('users', 1) == (True, results[0])
+
+
+def test_loader_error_reaches_every_waiter():
+    cache = TTLCache(60, 100)
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        release.wait(2)
+        raise ConnectionError('database unavailable')
+
+    errors = []
+
+    def call():
+        try:
+            cache.load('users', 1, load)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    wait_for_flight(cache)
+    threads += [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads[1:]:
+        thread.start()
+    wait_for_flight(cache, joined=3)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert len(errors) == 4 and all(error is errors[0] for error in errors)
+    # Nothing is cached and the flight is gone, so the next read retries
+    assert cache.get('users', 1) == (False, None)
+    assert cache.load('users', 1, lambda: Response([{'id': 1}])).data == [{'id': 1}]
+
+
+def test_invalidate_during_a_load_keeps_the_stale_value_out():
+    cache = TTLCache(60, 100)
+    release = threading.Event()
+    results = []
+
+    def stale():
+        release.wait(2)
+        return Response([{'id': 1, 'name': 'old'}])
+
+    threads = start_waiters(cache, 1, stale, results)
+    wait_for_flight(cache)
+    cache.invalidate('users', 1)
+    # A reader after the write does not join the flight that began before it
+    fresh = cache.load('users', 1, lambda: Response([{'id': 1, 'name': 'new'}]))
+    release.set()
+    threads[0].join(2)
+
+    assert results[0].data[0]['name'] == 'old'
+    assert fresh.data[0]['name'] == 'new'
+    assert cache.stats()['coalesced'] == 0
+    assert cache.get('users', 1)[1].data[0]['name'] == 'new'
+
+
+def test_misses_are_not_cached():
+    cache = TTLCache(60, 100)
+    cache.load('users', 1, lambda: Response([]))
+    assert cache.get('users', 1) == (False, None)
+
+
+def test_async_misses_share_one_task_and_errors():
+    cache = TTLCache(60, 100)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return Response([{'id': 1}])
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ConnectionError('database unavailable')
+
+    async def main():
+        results = await asyncio.gather(*(cache.load_async('users', 1, load) for _ in range(5)))
+        errors = await asyncio.gather(*(cache.load_async('users', 2, failing) for _ in range(3)),
+                                      return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(main())
+    assert len(calls) == 2
+    assert all(result is results[0] for result in results)
+    assert all(isinstance(error, ConnectionError) for error in errors)
+    assert cache.get('users', 1)[0] and not cache.get('users', 2)[0]
+
+
+def test_async_invalidate_during_a_load_keeps_the_stale_value_out():
+    cache = TTLCache(60, 100)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def stale():
+            await release.wait()
+            return Response([{'id': 1, 'name': 'old'}])
+
+        first = asyncio.ensure_future(cache.load_async('users', 1, stale))
+        await asyncio.sleep(0)
+        cache.invalidate('users', 1)
+        fresh = await cache.load_async('users', 1, lambda: asyncio.sleep(0, Response([{'id': 1, 'name': 'new'}])))
+        release.set()
+        await first
+        return fresh
+
+    fresh = asyncio.run(main())
+    assert fresh.data[0]['name'] == 'new'
+    assert cache.get('users', 1)[1].data[0]['name'] == 'new'
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    cache = TTLCache(60, 100)
+
+    async def main():
+        async def load():
+            await asyncio.sleep(0.01)
+            return Response([{'id': 1}])
+
+        first = asyncio.ensure_future(cache.load_async('users', 1, load))
+        second = asyncio.ensure_future(cache.load_async('users', 1, load))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()).data == [{'id': 1}]
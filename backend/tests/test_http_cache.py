@@ -0,0 +1,63 @@
+import gzip
+from datetime import datetime, timezone
+
+from werkzeug.datastructures import Accept
+
+from utils.http_cache import conditional, last_modified
+
+
+def test_single_record_uses_its_updated_at():
+    body = b'{"data":{"id":1,"updated_at":"2026-01-02T03:04:05+00:00"},"error":null}'
+    assert last_modified(body) == datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+def test_embedded_rows_count_for_a_single_record():
+    body = (b'{"data":{"id":1,"updated_at":"2026-01-02T00:00:00+00:00",'
+            b'"patient":{"updated_at":"2026-03-04T00:00:00+00:00"}},"error":null}')
+    assert last_modified(body) == datetime(2026, 3, 4, tzinfo=timezone.utc)
+
+
+def test_collections_have_no_last_modified():
+    # Deleting a row would not move the newest updated_at
+    body = b'{"data":[{"id":1,"updated_at":"2026-01-02T03:04:05+00:00"}],"error":null,"next_cursor":null}'
+    assert last_modified(body) is None
+
+
+def test_naive_and_missing_timestamps_are_ignored():
+    assert last_modified(b'{"data":{"id":1,"updated_at":"2026-01-02T03:04:05"}}') is None
+    assert last_modified(b'{"data":{"id":1}}') is None
+
+
+def test_matching_etag_is_not_modified():
+    body = b'{"data":[],"error":null,"next_cursor":null}'
+    status, headers, _ = conditional('GET', 200, body, {}, Accept())
+    etag = dict(headers)['ETag']
+    status, headers, sent = conditional('GET', 200, body, {'If-None-Match': etag}, Accept())
+    assert (status, sent) == (304, b'')
+    assert dict(headers)['ETag'] == etag
+
+
+def test_large_bodies_are_compressed_when_accepted():
+    body = b'{"data":[' + b','.join(b'{"id":%d}' % i for i in range(500)) + b']}'
+    status, headers, sent = conditional('GET', 200, body, {}, Accept([('gzip', 1)]))
+    assert dict(headers)['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(sent) == body
+    # Errors are neither validated nor compressed
+    assert conditional('GET', 500, body, {}, Accept([('gzip', 1)])) == (500, [], body)
+
+
+def test_asgi_and_flask_answer_alike():
+    from main import app
+    from utils.asgi import AsyncRequest, build_response
+
+    payload = {'data': {'id': 1, 'updated_at': '2026-01-02T03:04:05+00:00'}, 'error': None}
+    app.add_url_rule('/_http_cache_test', 'http_cache_test', lambda: payload)
+    flask_response = app.test_client().get('/_http_cache_test', headers={'Origin': 'http://localhost:8080'})
+
+    scope = {'method': 'GET', 'path': '/', 'headers': [(b'origin', b'http://localhost:8080')]}
+    status, headers, body = build_response(AsyncRequest(scope, None), payload, 200)
+    headers = dict(headers)
+    assert status == flask_response.status_code
+    assert body == flask_response.data
+    for name in ('ETag', 'Last-Modified', 'Access-Control-Allow-Origin'):
+        assert headers[name] == flask_response.headers[name]
@@ -0,0 +1,70 @@
+import pytest
+
+from models.storage.sqlite_backend import SQLiteClient
+from utils.pagination import (
+    MAX_LIMIT, apply_keyset, decode_cursor, encode_cursor, make_page, parse_filters, parse_page_args
+)
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = SQLiteClient(str(tmp_path / 'test.db'), pool_size=1)
+    client.table('sessions').insert([
+        {'patient_id': 1, 'status': 'open', 'created_at': '2026-01-01T00:00:00+00:00'},
+        {'patient_id': 2, 'status': 'open', 'created_at': '2026-01-02T00:00:00+00:00'},
+        {'patient_id': 1, 'status': 'open', 'created_at': '2026-01-03T00:00:00+00:00'},
+        {'patient_id': 1, 'status': 'open', 'created_at': '2026-01-04T00:00:00+00:00'},
+    ]).execute()
+    yield client
+    client.close()
+
+
+def page(client, limit, after=None, filters=None):
+    query = apply_keyset(client.table('sessions').select('id'), limit, after, filters)
+    return make_page(query.execute().data, limit)
+
+
+def test_pages_walk_every_row_once_in_id_order(client):
+    rows, cursor = page(client, 3)
+    assert [row['id'] for row in rows] == [1, 2, 3]
+    rows, cursor = page(client, 3, decode_cursor(cursor)['id'])
+    assert [row['id'] for row in rows] == [4]
+    assert cursor is None
+
+
+def test_a_page_that_ends_exactly_on_the_last_row_has_no_next_cursor(client):
+    rows, cursor = page(client, 4)
+    assert len(rows) == 4
+    assert cursor is None
+
+
+def test_filters_and_date_range(client):
+    rows, _ = page(client, 10, filters={'patient_id': '1', 'from': '2026-01-02', 'to': '2026-01-04'})
+    assert [row['id'] for row in rows] == [3]
+
+
+def test_make_page_handles_no_rows():
+    assert make_page(None, 10) == ([], None)
+
+
+def test_parse_page_args_defaults_and_clamps():
+    assert parse_page_args({}) == (50, None)
+    assert parse_page_args({'limit': str(MAX_LIMIT * 10)}) == (MAX_LIMIT, None)
+    assert parse_page_args({'limit': '5', 'after': encode_cursor({'id': 7})}) == (5, 7)
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'limit': 'ten'}, 'limit must be an integer'),
+    ({'limit': '0'}, 'limit must be positive'),
+    ({'after': 'not a cursor!'}, 'Invalid cursor'),
+    ({'after': encode_cursor([1])}, 'Invalid cursor'),
+    ({'after': encode_cursor({'id': '7'})}, 'Invalid cursor'),
+])
+def test_parse_page_args_rejects_bad_input(args, message):
+    with pytest.raises(ValueError, match=message):
+        parse_page_args(args)
+
+
+def test_parse_filters_drops_unknown_and_empty_args():
+    args = {'patient_id': '1', 'doctor_id': '', 'status': 'open'}
+    assert parse_filters(args, ('patient_id', 'doctor_id', 'from')) == {'patient_id': '1'}
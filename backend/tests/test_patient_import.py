@@ -0,0 +1,122 @@
+import io
+
+import pytest
+
+import models.patient
+import models.user
+import services.patient_service as patients
+from models.storage.sqlite_backend import SQLiteClient
+from utils.cache import model_cache
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    client = SQLiteClient(str(tmp_path / 'import.db'), pool_size=2)
+    monkeypatch.setattr(models.user, 'db', client)
+    monkeypatch.setattr(models.patient, 'db', client)
+    monkeypatch.setattr(patients, 'record_created', lambda kind, row: None)
+    monkeypatch.setattr(patients, 'PATIENT_IMPORT_BATCH_SIZE', 2)
+    model_cache.clear()
+    yield client
+    client.close()
+
+
+def csv_upload(*emails):
+    lines = ['email,first_name,last_name,date_of_birth']
+    lines += [f'{email},First,Last,1980-04-23' for email in emails]
+    return io.BytesIO(('\n'.join(lines) + '\n').encode())
+
+
+def accounts(db):
+    users = db.table('users').select('email,patients(id)').order('id').execute().data
+    return {user['email']: len(user['patients']) for user in users}
+
+
+def test_rows_are_inserted_in_batches(db, monkeypatch):
+    calls = []
+    add_patients = patients.add_patients
+    monkeypatch.setattr(patients, 'add_patients', lambda rows: calls.append(len(rows)) or add_patients(rows))
+    result = patients.import_patients(csv_upload('a@x', 'b@x', 'c@x', 'd@x', 'e@x'), 'csv')
+    assert result['error'] is None
+    assert calls == [2, 2, 1]
+    assert result['data']['imported'] == 5
+    assert result['data']['processed'] == 5
+    assert result['data']['complete']
+    assert accounts(db) == dict.fromkeys(['a@x', 'b@x', 'c@x', 'd@x', 'e@x'], 1)
+
+
+def test_failed_batch_is_resumed_without_duplicates(db, monkeypatch):
+    add_patients = patients.add_patients
+    calls = []
+
+    def flaky(rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            # Users of the second batch are in, its patients are not
+            raise ConnectionError('database went away')
+        return add_patients(rows)
+
+    monkeypatch.setattr(patients, 'add_patients', flaky)
+    upload = ('a@x', 'b@x', 'c@x', 'd@x', 'e@x')
+    first = patients.import_patients(csv_upload(*upload), 'csv')
+    assert first['error'] == 'database went away'
+    assert first['data']['processed'] == 2
+    assert not first['data']['complete']
+    assert accounts(db) == {'a@x': 1, 'b@x': 1, 'c@x': 0, 'd@x': 0}
+
+    resumed = patients.import_patients(csv_upload(*upload), 'csv', skip=first['data']['processed'])
+    assert resumed['error'] is None
+    assert resumed['data']['imported'] == 3
+    assert resumed['data']['processed'] == 5
+    assert accounts(db) == dict.fromkeys(upload, 1)
+
+    # Running the whole file again changes nothing
+    again = patients.import_patients(csv_upload(*upload), 'csv')
+    assert (again['data']['imported'], again['data']['skipped']) == (0, 5)
+    assert accounts(db) == dict.fromkeys(upload, 1)
+
+
+def test_repeated_emails_and_bad_rows(db):
+    db.table('users').insert({'email': 'doc@x', 'role': 'doctor'}).execute()
+    upload = io.BytesIO(b'{"email": "a@x"}\n'
+                        b'not json\n'
+                        b'{"email": "a@x"}\n'
+                        b'{"email": "b@x", "dob": "23/04/1980"}\n'
+                        b'{"email": "doc@x"}\n'
+                        b'\n'
+                        b'{"email": "nope"}\n')
+    result = patients.import_patients(upload, 'ndjson')['data']
+    assert (result['imported'], result['skipped'], result['failed']) == (1, 1, 4)
+    assert sorted(error['row'] for error in result['errors']) == [2, 4, 5, 6]
+    assert result['processed'] == 6
+
+
+def test_emails_registered_mid_import_fail_alone(db, monkeypatch):
+    db.table('users').insert({'email': 'taken@x', 'role': 'patient'}).execute()
+    lookup = patients.get_users_by_emails
+
+    def stale_lookup(emails):
+        # As if taken@x was registered after the lookup ran
+        response = lookup(emails)
+        response.data = [user for user in response.data if user['email'] != 'taken@x']
+        return response
+
+    monkeypatch.setattr(patients, 'get_users_by_emails', stale_lookup)
+    result = patients.import_patients(csv_upload('a@x', 'taken@x'), 'csv')['data']
+    assert (result['imported'], result['failed']) == (1, 1)
+    assert result['errors'] == [{'row': 2, 'error': 'Email is already registered'}]
+    assert accounts(db) == {'taken@x': 0, 'a@x': 1}
+
+
+@pytest.mark.parametrize('args, content_type, expected', [
+    ({}, 'text/csv', ('csv', 0)),
+    ({'format': 'ndjson', 'skip': '500'}, None, ('ndjson', 500)),
+])
+def test_parse_import_args(args, content_type, expected):
+    assert patients.parse_import_args(args, content_type) == expected
+
+
+@pytest.mark.parametrize('args', [{'format': 'xml'}, {'format': 'csv', 'skip': 'x'}, {'format': 'csv', 'skip': '-1'}])
+def test_parse_import_args_rejects_bad_input(args):
+    with pytest.raises(ValueError):
+        patients.parse_import_args(args, None)
@@ -0,0 +1,62 @@
+from utils.prefix_index import PrefixIndex, normalise
+
+
+def test_normalise_folds_case_and_spaces():
+    assert normalise('  Ann   LEE ') == 'ann lee'
+    assert normalise(None) == ''
+
+
+def test_prefix_matches_any_key_once():
+    index = PrefixIndex()
+    index.add(1, ['Ann Lee', 'Lee', 'ann@x'], {'id': 1})
+    index.add(2, ['Annabel Ng', 'Ng'], {'id': 2})
+    assert index.search('ann') == [{'id': 1}, {'id': 2}]
+    assert index.search('LEE') == [{'id': 1}]
+    assert index.search('') == []
+    assert index.search('zed') == []
+
+
+def test_scan_stops_at_the_end_of_the_matching_run():
+    index = PrefixIndex()
+    index.add(1, ['ab'], {'id': 1})
+    index.add(2, ['abc'], {'id': 2})
+    index.add(3, ['abd'], {'id': 3})
+    index.add(4, ['ac'], {'id': 4})
+    index.add(5, ['b'], {'id': 5})
+    index._records[4] = None
+    # Reading past 'abd' would hit the poisoned record
+    assert index.search('ab') == [{'id': 1}, {'id': 2}, {'id': 3}]
+    assert index.search('abc') == [{'id': 2}]
+    # A prefix sorting after every key scans nothing
+    assert index.search('zzz') == []
+
+
+def test_scan_stops_at_the_limit():
+    index = PrefixIndex()
+    for item_id in range(100):
+        index.add(item_id, [f'pat {item_id:03d}'], {'id': item_id})
+    assert [record['id'] for record in index.search('pat', limit=3)] == [0, 1, 2]
+    assert [record['id'] for record in index.search('pat 05', limit=3)] == [50, 51, 52]
+
+
+def test_add_replaces_keys_and_record():
+    index = PrefixIndex()
+    index.add(1, ['Ann Lee'], {'name': 'Ann Lee'})
+    index.add(1, ['Ann Ng'], {'name': 'Ann Ng'})
+    assert len(index) == 1
+    assert index.search('ann lee') == []
+    assert index.search('ann') == [{'name': 'Ann Ng'}]
+    index.remove(1)
+    index.remove(1)
+    assert index.search('ann') == []
+    assert index._keys == []
+
+
+def test_replace_bulk_loads():
+    index = PrefixIndex()
+    index.add(9, ['old'], {'id': 9})
+    index.replace([(1, ['Bob', 'bob'], {'id': 1}), (2, ['Bea', ''], {'id': 2})])
+    assert len(index) == 2
+    assert index.search('old') == []
+    assert index.search('b') == [{'id': 2}, {'id': 1}]
+    assert index._keys == [('bea', 2), ('bob', 1)]
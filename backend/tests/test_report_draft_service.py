@@ -0,0 +1,159 @@
+import pytest
+
+import services.report_draft_service as drafts
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeTimer:
+    # Records what would have been scheduled instead of starting a thread
+    started = []
+
+    def __init__(self, delay, function, args=()):
+        self.delay = delay
+        self.cancelled = False
+
+    def start(self):
+        FakeTimer.started.append(self)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(drafts.time, 'monotonic', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def database(monkeypatch):
+    row = {'id': 7, 'summary': 'old', 'version': 3}
+    state = {'fail': True, 'writes': 0, 'row': row, 'during_write': None}
+
+    def update_report_version(report_id, data, expected_version):
+        state['writes'] += 1
+        if state['during_write']:
+            state['during_write']()
+        if state['fail']:
+            raise ConnectionError('database unavailable')
+        if (row['version'] or 0) != expected_version:
+            return FakeResponse([])
+        row.update(data)
+        return FakeResponse([dict(row)])
+
+    FakeTimer.started = []
+    monkeypatch.setattr(drafts.threading, 'Timer', FakeTimer)
+    monkeypatch.setattr(drafts, 'get_report_for_update', lambda report_id: FakeResponse([dict(row)] if row['version'] is not None else []))
+    monkeypatch.setattr(drafts, 'update_report_version', update_report_version)
+    monkeypatch.setattr(drafts, 'index_report', lambda report: None)
+    monkeypatch.setattr(drafts, 'REPORT_FLUSH_DELAY_SECONDS', 1.0)
+    monkeypatch.setattr(drafts, 'REPORT_FLUSH_MAX_DELAY_SECONDS', 5.0)
+    monkeypatch.setattr(drafts, 'REPORT_FLUSH_RETRY_MAX_SECONDS', 8.0)
+    yield state
+    drafts._drafts.clear()
+
+
+def test_edits_are_flushed_after_the_delay(database, clock):
+    drafts.patch_report(7, 3, {'summary': [{'at': 3, 'insert': 'er'}]})
+    assert FakeTimer.started[-1].delay == 1.0
+    database['fail'] = False
+    drafts.flush_report(7)
+    assert database['writes'] == 1
+    assert 7 not in drafts._drafts
+
+
+def test_failed_flush_backs_off_instead_of_spinning(database, clock):
+    drafts.patch_report(7, 3, {'summary': [{'at': 0, 'insert': 'x'}]})
+    # Long past the max delay, which used to make every retry immediate
+    clock[0] += 60
+    delays = []
+    for _ in range(6):
+        drafts.flush_report(7)
+        delays.append(FakeTimer.started[-1].delay)
+    assert delays == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+    assert database['writes'] == 6
+    assert len(FakeTimer.started) == 7
+
+
+def test_edits_during_backoff_keep_the_retry_timer(database, clock):
+    drafts.patch_report(7, 3, {'summary': [{'at': 0, 'insert': 'x'}]})
+    clock[0] += 60
+    drafts.flush_report(7)
+    drafts.flush_report(7)
+    retry = FakeTimer.started[-1]
+    drafts.patch_report(7, 4, {'summary': [{'at': 0, 'insert': 'y'}]})
+    assert FakeTimer.started[-1] is retry
+    assert not retry.cancelled
+
+    database['fail'] = False
+    drafts.flush_report(7)
+    assert 7 not in drafts._drafts
+    assert database['writes'] == 3
+
+
+def test_conflicting_save_keeps_the_edits_and_reports_them_once(database, clock):
+    database['fail'] = False
+    drafts.patch_report(7, 3, {'summary': [{'at': 3, 'insert': 'er'}]})
+    # Another process saved version 5 in the meantime
+    database['row'].update({'summary': 'theirs', 'version': 5})
+    drafts.flush_report(7)
+    assert 7 in drafts._drafts
+
+    with pytest.raises(drafts.VersionConflict) as conflict:
+        drafts.patch_report(7, 4, {'summary': [{'at': 0, 'insert': 'x'}]})
+    assert conflict.value.version == 5
+    assert conflict.value.unsaved == {'version': 4, 'fields': {**dict.fromkeys(drafts.REPORT_TEXT_FIELDS, ''),
+                                                               'summary': 'older'}}
+    payload = drafts.conflict_payload(conflict.value)
+    assert payload['version'] == 5 and payload['unsaved']['fields']['summary'] == 'older'
+
+    # Reported once; the next edit starts from the database
+    assert 7 not in drafts._drafts
+    assert drafts.patch_report(7, 5, {'summary': [{'at': 0, 'insert': 'x'}]})['data']['version'] == 6
+
+
+def test_reads_get_the_conflict(database, clock):
+    database['fail'] = False
+    drafts.patch_report(7, 3, {'summary': [{'at': 3, 'insert': 'er'}]})
+    database['row']['version'] = 5
+    drafts.flush_report(7)
+    with pytest.raises(drafts.VersionConflict):
+        drafts.draft_overlay({'id': 7, 'summary': 'old', 'version': 5})
+    assert drafts.draft_overlay({'id': 7, 'summary': 'old', 'version': 5})['version'] == 5
+
+
+def test_report_deleted_elsewhere_drops_the_draft(database, clock):
+    database['fail'] = False
+    drafts.patch_report(7, 3, {'summary': [{'at': 0, 'insert': 'x'}]})
+    database['row']['version'] = None
+    drafts.flush_report(7)
+    assert 7 not in drafts._drafts
+
+
+def test_edits_during_a_write_are_not_blocked_and_are_saved_next(database, clock):
+    database['fail'] = False
+    drafts.patch_report(7, 3, {'summary': [{'at': 3, 'insert': 'er'}]})
+    seen = []
+
+    def edit():
+        database['during_write'] = None
+        # Would deadlock if the write held the draft lock
+        assert drafts._drafts[7]['lock'].acquire(blocking=False)
+        drafts._drafts[7]['lock'].release()
+        seen.append(drafts.patch_report(7, 4, {'summary': [{'at': 5, 'insert': '!'}]})['data']['version'])
+        assert drafts.draft_overlay({'id': 7, 'summary': 'old', 'version': 3})['summary'] == 'older!'
+
+    database['during_write'] = edit
+    drafts.flush_report(7)
+    assert seen == [5]
+    assert database['row']['version'] == 4
+    assert 7 in drafts._drafts
+
+    drafts.flush_report(7)
+    assert database['row'] == {'id': 7, 'summary': 'older!', 'version': 5}
+    assert 7 not in drafts._drafts
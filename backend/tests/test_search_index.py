@@ -0,0 +1,114 @@
+from utils.search_index import InvertedIndex, parse_query, tokenize
+
+
+def docs(result):
+    return [doc for _, doc, _, _ in result[1]]
+
+
+def test_tokenize_and_parse_query():
+    assert tokenize('Chest-pain, 2 days') == ['chest', 'pain', '2', 'days']
+    terms, phrases = parse_query('"chest pain" fever "x" chest')
+    assert terms == ['chest', 'pain', 'fever', 'x']
+    # A one-word phrase is just a term
+    assert phrases == [['chest', 'pain']]
+
+
+def test_all_terms_must_match():
+    index = InvertedIndex()
+    index.add(1, 'fever and cough')
+    index.add(2, 'fever only')
+    assert docs(index.search(['fever', 'cough'])) == [1]
+    assert index.search(['fever', 'rash']) == (0, [])
+    assert index.search([]) == (0, [])
+
+
+def test_phrases_match_words_in_order_and_adjacent():
+    index = InvertedIndex()
+    index.add(1, 'sharp chest pain since monday')
+    index.add(2, 'pain in the chest')
+    index.add(3, 'chest x-ray, no pain')
+    index.add(4, 'chest pain chest pain')
+    terms, phrases = parse_query('"chest pain"')
+    assert sorted(docs(index.search(terms, phrases))) == [1, 4]
+
+
+def test_bm25_prefers_rare_terms_frequent_matches_and_short_documents():
+    index = InvertedIndex()
+    index.add(1, 'cough cough cough fever')
+    index.add(2, 'cough fever')
+    index.add(3, 'cough fever ' + 'filler ' * 40)
+    index.add(4, 'fever')
+    # More occurrences beat fewer, shorter beats longer with the same count
+    assert docs(index.search(['cough'])) == [1, 2, 3]
+    scores = {doc: score for score, doc, _, _ in index.search(['fever'])[1]}
+    assert scores[4] > scores[2] > scores[3]
+
+    # With equal lengths, a match on a rare term outweighs one on a common term
+    index.add(5, 'rash cough')
+    index.add(6, 'fever cough')
+    rare = index.search(['rash', 'cough'])[1][0][0]
+    common = next(score for score, doc, _, _ in index.search(['fever', 'cough'])[1] if doc == 6)
+    assert rare > common
+
+
+def test_limit_keeps_the_total():
+    index = InvertedIndex()
+    for doc in range(10):
+        index.add(doc, 'note ' * (doc + 1))
+    total, results = index.search(['note'], limit=3)
+    assert total == 10
+    assert [doc for _, doc, _, _ in results] == [9, 8, 7]
+
+
+def test_add_replaces_an_existing_document():
+    index = InvertedIndex(keys=('patient_id',))
+    index.add(1, 'fever', patient_id=7)
+    index.add(1, 'rash', patient_id=8)
+    assert len(index) == 1
+    assert index.search(['fever']) == (0, [])
+    assert docs(index.search(['rash'], filters={'patient_id': 8})) == [1]
+    assert index.search(['rash'], filters={'patient_id': 7}) == (0, [])
+    assert index.stats() == {'documents': 1, 'terms': 1}
+
+
+def test_filters_use_the_secondary_index_and_ignore_none():
+    index = InvertedIndex(keys=('patient_id', 'kind'))
+    index.add(1, 'fever', patient_id=7, kind='report')
+    index.add(2, 'fever', patient_id=7, kind='transcript')
+    index.add(3, 'fever', patient_id=8, kind='report')
+    assert sorted(docs(index.search(['fever'], filters={'patient_id': 7}))) == [1, 2]
+    assert docs(index.search(['fever'], filters={'patient_id': 7, 'kind': 'report'})) == [1]
+    assert len(docs(index.search(['fever'], filters={'patient_id': None}))) == 3
+    assert index.search(['fever'], filters={'patient_id': 9}) == (0, [])
+
+
+def test_update_where_rekeys_matching_documents():
+    index = InvertedIndex(keys=('session_id', 'patient_id'))
+    index.add(1, 'fever', session_id=5, patient_id=7)
+    index.add(2, 'fever', session_id=5, patient_id=7)
+    index.add(3, 'fever', session_id=6, patient_id=7)
+    # A session moved to another patient takes its documents with it
+    index.update_where({'session_id': 5}, patient_id=8, status='moved')
+    assert sorted(docs(index.search(['fever'], filters={'patient_id': 8}))) == [1, 2]
+    assert docs(index.search(['fever'], filters={'patient_id': 7})) == [3]
+    attrs = {doc: attrs for _, doc, attrs, _ in index.search(['fever'])[1]}
+    assert attrs[1] == {'session_id': 5, 'patient_id': 8, 'status': 'moved'}
+    # Nothing matched, nothing changed
+    index.update_where({'session_id': 99}, patient_id=1)
+    assert index.search(['fever'], filters={'patient_id': 1}) == (0, [])
+
+
+def test_remove_and_remove_where_drop_postings():
+    index = InvertedIndex(keys=('session_id',))
+    index.add(1, 'fever cough', session_id=5)
+    index.add(2, 'fever', session_id=5)
+    index.add(3, 'rash', session_id=6)
+    index.remove(3)
+    index.remove(3)
+    assert index.search(['rash']) == (0, [])
+    index.remove_where(session_id=5)
+    assert len(index) == 0
+    assert index.stats() == {'documents': 0, 'terms': 0}
+    # Removing everything leaves the index usable
+    index.add(4, 'fever', session_id=5)
+    assert docs(index.search(['fever'])) == [4]
@@ -0,0 +1,58 @@
+import wave
+from array import array
+
+import services.transcription_service as transcription
+from services.transcribers import TRANSCRIBERS, transcribe_segment
+
+RATE = 100
+
+
+class SecondsTranscriber:
+    # Each second of the test audio holds its own number as every sample,
+    # so it "hears" one word per second: w0, w1, ...
+    def transcribe(self, frames, sample_rate, channels, sample_width):
+        samples = array('h', frames)
+        words = []
+        for offset in range(0, len(samples), sample_rate):
+            second = samples[offset:offset + sample_rate]
+            words.append((offset / sample_rate, (offset + len(second)) / sample_rate, f' w{second[0]}'))
+        return words
+
+
+def _write_audio(path, seconds):
+    with wave.open(path, 'wb') as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(2)
+        audio.setframerate(RATE)
+        audio.writeframes(array('h', [s for s in range(seconds) for _ in range(RATE)]).tobytes())
+
+
+def test_overlapping_segments_keep_each_word_once(tmp_path, monkeypatch):
+    path = str(tmp_path / 'audio.wav')
+    _write_audio(path, 95)
+    monkeypatch.setitem(TRANSCRIBERS, 'seconds', SecondsTranscriber)
+    monkeypatch.setattr(transcription, 'SEGMENT_SECONDS', 30)
+    monkeypatch.setattr(transcription, 'OVERLAP_SECONDS', 2)
+
+    texts = []
+    for segment in transcription.plan_segments(path):
+        _, text = transcribe_segment(path, 'seconds', segment['index'], segment['start_frame'],
+                                     segment['frame_count'], segment['keep_from'], segment['keep_to'])
+        texts.append(text)
+
+    assert len(texts) == 4
+    assert texts[1].split() == [f'w{s}' for s in range(30, 60)]
+    assert ' '.join(texts).split() == [f'w{s}' for s in range(95)]
+
+
+def test_segments_read_overlap_on_both_sides(tmp_path, monkeypatch):
+    path = str(tmp_path / 'audio.wav')
+    _write_audio(path, 95)
+    monkeypatch.setattr(transcription, 'SEGMENT_SECONDS', 30)
+    monkeypatch.setattr(transcription, 'OVERLAP_SECONDS', 2)
+
+    segments = list(transcription.plan_segments(path))
+    assert [(s['start_frame'], s['frame_count']) for s in segments] == [
+        (0, 32 * RATE), (28 * RATE, 34 * RATE), (58 * RATE, 34 * RATE), (88 * RATE, 7 * RATE)]
+    assert [(s['start_ms'], s['end_ms']) for s in segments] == [
+        (0, 30000), (30000, 60000), (60000, 90000), (90000, 95000)]
@@ -0,0 +1,171 @@
+import asyncio
+import sqlite3
+
+import pytest
+from postgrest.exceptions import APIError
+
+from benchmarks import fake_postgrest
+from models.storage.sqlite_backend import AsyncSQLiteClient, SQLiteClient
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = SQLiteClient(str(tmp_path / 'test.db'), pool_size=2)
+    users = client.table('users').insert([
+        {'email': 'ann@x', 'role': 'patient', 'first_name': 'Ann', 'last_name': 'Lee'},
+        {'email': 'bob@x', 'role': 'patient', 'first_name': 'Bob', 'last_name': 'Ng'},
+        {'email': 'doc@x', 'role': 'doctor', 'first_name': 'Dee', 'last_name': 'Oak'},
+    ]).execute().data
+    client.table('patients').insert([{'user_id': users[0]['id']}, {'user_id': users[1]['id']}]).execute()
+    client.table('doctors').insert({'user_id': users[2]['id']}).execute()
+    client.table('sessions').insert([
+        {'patient_id': 1, 'doctor_id': 1, 'status': 'done', 'created_at': '2026-01-01T00:00:00+00:00'},
+        {'patient_id': 1, 'doctor_id': 1, 'status': 'open', 'created_at': '2026-01-02T00:00:00+00:00'},
+        {'patient_id': 2, 'doctor_id': None, 'status': 'open', 'created_at': '2026-01-03T00:00:00+00:00'},
+    ]).execute()
+    client.table('reports').insert({'session_id': 1, 'summary': 'Cough, mild'}).execute()
+    yield client
+    client.close()
+
+
+def ids(response):
+    return [row['id'] for row in response.data]
+
+
+def test_insert_fills_timestamps_and_returns_rows(client):
+    row = client.table('sessions').insert({'patient_id': 2, 'status': 'open'}).execute().data[0]
+    assert row['id'] == 4
+    assert row['created_at'] == row['updated_at']
+
+
+def test_comparison_filters(client):
+    sessions = client.table('sessions')
+    assert ids(sessions.select('id').eq('status', 'open').execute()) == [2, 3]
+    assert ids(client.table('sessions').select('id').neq('status', 'open').execute()) == [1]
+    assert ids(client.table('sessions').select('id').gt('id', 1).lte('id', 2).execute()) == [2]
+    assert ids(client.table('sessions').select('id').in_('id', [1, 3]).execute()) == [1, 3]
+    assert ids(client.table('sessions').select('id').is_('doctor_id', 'null').execute()) == [3]
+    assert ids(client.table('sessions').select('id').not_().is_('doctor_id', 'null').execute()) == [1, 2]
+
+
+def test_like_is_case_sensitive_and_ilike_is_not(client):
+    assert ids(client.table('users').select('id').like('first_name', 'a*').execute()) == []
+    assert ids(client.table('users').select('id').ilike('first_name', 'a*').execute()) == [1]
+
+
+def test_or_filters_nest_and_negate(client):
+    query = client.table('sessions').select('id').or_('id.eq.3,and(status.eq.open,not.doctor_id.is.null)')
+    assert ids(query.execute()) == [2, 3]
+    query = client.table('sessions').select('id').or_('not.and(status.eq.open,patient_id.eq.1)')
+    assert ids(query.execute()) == [1, 3]
+    query = client.table('sessions').select('id').or_('id.not.in.(1,2)')
+    assert ids(query.execute()) == [3]
+
+
+def test_keyset_order_and_paging(client):
+    query = client.table('sessions').select('id').order('created_at', desc=True).order('id', desc=True)
+    assert ids(query.limit(2).execute()) == [3, 2]
+    query = client.table('sessions').select('id').order('id').range(1, 2)
+    assert ids(query.execute()) == [2, 3]
+
+
+def test_nulls_sort_last_ascending_like_postgres(client):
+    query = client.table('sessions').select('id,doctor_id').order('doctor_id')
+    assert ids(query.execute()) == [1, 2, 3]
+    query = client.table('sessions').select('id,doctor_id').order('doctor_id', desc=True)
+    assert ids(query.execute())[0] == 3
+
+
+def test_select_aliases_and_embeds(client):
+    row = client.table('patients').select('id,user:users(first_name),sessions(count)').eq('id', 1).execute().data[0]
+    assert row == {'id': 1, 'user': {'first_name': 'Ann'}, 'sessions': [{'count': 2}]}
+
+    rows = client.table('patients').select('id,sessions(id,reports(summary))').order('id').execute().data
+    assert rows[0]['sessions'] == [{'id': 1, 'reports': [{'summary': 'Cough, mild'}]},
+                                   {'id': 2, 'reports': []}]
+
+
+def test_embedded_limit_applies_per_parent(client):
+    query = (client.table('patients').select('id,sessions(id)')
+             .order('created_at', desc=True, foreign_table='sessions').limit(1, foreign_table='sessions'))
+    assert [row['sessions'] for row in query.order('id').execute().data] == [[{'id': 2}], [{'id': 3}]]
+
+
+def test_inner_embed_drops_rows_before_paging(client):
+    query = client.table('sessions').select('id,reports!inner(id)').limit(5)
+    assert ids(query.execute()) == [1]
+
+
+def test_quoted_values_match_literally(client):
+    assert ids(client.table('reports').select('id').eq('summary', '"Cough, mild"').execute()) == [1]
+    query = client.table('reports').select('id').or_('summary.eq."Cough, mild",id.eq.99')
+    assert ids(query.execute()) == [1]
+
+
+def test_update_and_delete_return_the_rows_they_touched(client):
+    updated = client.table('sessions').update({'status': 'done'}).eq('status', 'open').execute()
+    assert ids(updated) == [2, 3]
+    assert all(row['status'] == 'done' for row in updated.data)
+    deleted = client.table('sessions').delete().eq('id', 3).execute()
+    assert ids(deleted) == [3]
+    assert ids(client.table('sessions').select('id').execute()) == [1, 2]
+
+
+def test_count(client):
+    response = client.table('sessions').select('id', count='exact').eq('status', 'open').limit(1).execute()
+    assert len(response.data) == 1
+    assert response.count == 2
+
+
+@pytest.mark.parametrize('query, code', [
+    (lambda c: c.table('nope').select('*'), '42P01'),
+    (lambda c: c.table('users').select('nope'), '42703'),
+    (lambda c: c.table('users').select('id').eq('nope', 1), '42703'),
+    (lambda c: c.table('users').insert({'nope': 1}), 'PGRST204'),
+    (lambda c: c.table('users').insert({'email': 'ann@x'}), '23505'),
+    (lambda c: c.table('patients').insert({'date_of_birth': '2000-01-01'}), '23502'),
+    (lambda c: c.table('users').update({'role': 'x'}), '21000'),
+    (lambda c: c.table('patients').select('id').eq('users.email', 'ann@x'), 'PGRST100'),
+    (lambda c: c.table('users').select('id').filter('id', 'fts', 'x'), 'PGRST100'),
+    (lambda c: c.table('users').select('id,reports(id)'), 'PGRST200'),
+])
+def test_errors_carry_postgrest_codes(client, query, code):
+    with pytest.raises(APIError) as error:
+        query(client).execute()
+    assert error.value.code == code
+
+
+def test_writes_roll_back_as_a_whole(client):
+    with pytest.raises(APIError):
+        client.table('users').insert([{'email': 'new@x'}, {'email': 'ann@x'}]).execute()
+    assert ids(client.table('users').select('id').eq('email', 'new@x').execute()) == []
+
+
+def test_old_database_files_gain_new_columns(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE reports (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id INTEGER, summary TEXT)')
+    conn.execute("INSERT INTO reports (session_id, summary) VALUES (1, 'old')")
+    conn.commit()
+    conn.close()
+    for _ in range(2):
+        client = SQLiteClient(path, pool_size=1)
+        assert client.table('reports').select('id,version').execute().data == [{'id': 1, 'version': 0}]
+        client.close()
+
+
+def test_async_client_runs_the_same_query(client):
+    response = asyncio.run(AsyncSQLiteClient(client).table('sessions').select('id').eq('status', 'open').execute())
+    assert ids(response) == [2, 3]
+
+
+@pytest.mark.parametrize('filters', [
+    'id.eq.3,and(status.eq.open,not.doctor_id.is.null)',
+    'not.and(status.eq.open,patient_id.eq.1)',
+    'id.not.in.(1,2)',
+    'status.like.o*,id.gte.3',
+])
+def test_benchmark_stand_in_reads_filters_the_same_way(client, filters):
+    rows = client.table('sessions').select('*').execute().data
+    expected = ids(client.table('sessions').select('id').or_(filters).execute())
+    assert [row['id'] for row in rows if fake_postgrest._match_logic(row, filters, 'or')] == expected
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import services.stats_service as stats
+
+
+class FakeResponse:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    monkeypatch.setattr(stats, '_stats', stats._empty())
+    monkeypatch.setattr(stats, '_state', {'reconciled_at': 0.0, 'reconciled_time': None, 'reconciling': False,
+                                          'scanned': {}, 'pending': []})
+    monkeypatch.setattr(stats, 'STATS_RECONCILE_SECONDS', float('inf'))
+    return stats._stats
+
+
+def session(session_id, created_at='2026-01-01T10:00:00+00:00', patient_id=1, status='open'):
+    return {'id': session_id, 'patient_id': patient_id, 'status': status, 'created_at': created_at}
+
+
+def test_pending_reports_counts_sessions_without_one(fresh):
+    for session_id in (1, 2, 3):
+        stats.record_created('sessions', session(session_id))
+    stats.record_created('reports', {'id': 10, 'session_id': 1})
+    assert stats.fetch_stats()['data']['pending_reports'] == 2
+
+    # A second report for the same session changes nothing
+    stats.record_created('reports', {'id': 11, 'session_id': 1})
+    stats.record_removed('reports', {'id': 10, 'session_id': 1})
+    assert stats.fetch_stats()['data']['pending_reports'] == 2
+    stats.record_removed('reports', {'id': 11, 'session_id': 1})
+    assert stats.fetch_stats()['data']['pending_reports'] == 3
+
+
+def test_reports_of_deleted_sessions_do_not_hide_pending_ones(fresh):
+    stats.record_created('sessions', session(1))
+    stats.record_created('sessions', session(2))
+    stats.record_created('reports', {'id': 10, 'session_id': 1})
+    stats.record_removed('sessions', session(1))
+    # Session 1 is gone but its report is still counted; session 2 is pending
+    data = stats.fetch_stats()['data']
+    assert (data['sessions'], data['reports'], data['pending_reports']) == (1, 1, 1)
+
+    # A report arriving before its session is seen (e.g. during a replay)
+    stats.record_created('reports', {'id': 12, 'session_id': 3})
+    stats.record_created('sessions', session(3))
+    assert stats.fetch_stats()['data']['pending_reports'] == 1
+
+
+def test_status_changes_keep_the_session_pending(fresh):
+    stats.record_created('sessions', session(1))
+    stats.record_changed('sessions', session(1), {'id': 1, 'status': 'done'})
+    data = stats.fetch_stats()['data']
+    assert data['pending_reports'] == 1
+    assert data['sessions_by_status'] == {'done': 1}
+
+
+def test_sessions_are_bucketed_by_utc_day(fresh):
+    today = datetime.now(timezone.utc).date()
+    early = datetime(today.year, today.month, today.day, 1, 30, tzinfo=timezone.utc)
+    # 20:30 the day before in New York is already today in UTC
+    local = early.astimezone(timezone(timedelta(hours=-5)))
+    assert local.isoformat()[:10] != today.isoformat()
+    stats.record_created('sessions', session(1, early.isoformat()))
+    stats.record_created('sessions', session(2, local.isoformat()))
+    stats.record_created('sessions', session(3, None))
+    assert stats.fetch_stats()['data']['sessions_today'] == 2
+
+
+def test_reconcile_replays_writes_made_while_it_ran(fresh, monkeypatch):
+    sessions = [session(1), session(2)]
+    reports = [{'id': 10, 'session_id': 1}]
+
+    def get_all_sessions(limit, after, fields=None):
+        # A report for session 2 lands while the sessions are being read
+        stats.record_created('reports', {'id': 11, 'session_id': 2})
+        return FakeResponse([row for row in sessions if after is None or row['id'] > after])
+
+    def get_all_reports(limit, after, fields=None):
+        return FakeResponse([row for row in reports if after is None or row['id'] > after])
+
+    monkeypatch.setattr(stats, 'get_all_sessions', get_all_sessions)
+    monkeypatch.setattr(stats, 'get_all_reports', get_all_reports)
+    monkeypatch.setattr(stats, 'count_patients', lambda: FakeResponse(count=2))
+    monkeypatch.setattr(stats, 'count_doctors', lambda: FakeResponse(count=1))
+    stats._state['reconciling'] = True
+    stats._run_reconcile()
+    data = stats.fetch_stats()['data']
+    assert (data['sessions'], data['reports'], data['pending_reports']) == (2, 2, 0)
@@ -0,0 +1,41 @@
+import pytest
+
+from utils.text_delta import MAX_DELTA_OPS, apply_delta
+
+
+def test_insert_delete_and_replace():
+    assert apply_delta('hello world', [{'at': 5, 'insert': ','}]) == 'hello, world'
+    assert apply_delta('hello world', [{'at': 5, 'delete': 6}]) == 'hello'
+    assert apply_delta('take 10 mg', [{'at': 5, 'delete': 2, 'insert': '20'}]) == 'take 20 mg'
+
+
+def test_operations_apply_to_the_previous_result():
+    ops = [{'at': 0, 'insert': 'ab'}, {'at': 1, 'delete': 1, 'insert': 'X'}, {'at': 3, 'insert': '!'}]
+    assert apply_delta('c', ops) == 'aXc!'
+
+
+def test_offsets_count_code_points():
+    assert apply_delta('a\U0001F600b', [{'at': 2, 'insert': '-'}]) == 'a\U0001F600-b'
+
+
+def test_missing_text_is_empty():
+    assert apply_delta(None, [{'at': 0, 'insert': 'x'}]) == 'x'
+    assert apply_delta('same', []) == 'same'
+
+
+@pytest.mark.parametrize('ops', [
+    {'at': 0},
+    ['insert'],
+    [{'insert': 'x'}],
+    [{'at': '1', 'insert': 'x'}],
+    [{'at': 0, 'delete': 1.5}],
+    [{'at': 0, 'insert': 3}],
+    [{'at': -1}],
+    [{'at': 0, 'delete': -1}],
+    [{'at': 4, 'insert': 'x'}],
+    [{'at': 2, 'delete': 2}],
+    [{'at': 0}] * (MAX_DELTA_OPS + 1),
+])
+def test_rejects_bad_deltas(ops):
+    with pytest.raises(ValueError):
+        apply_delta('abc', ops)
@@ -0,0 +1,194 @@
+import math
+import os
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from utils.auth import request_identity
+from utils.metrics import registry
+
+MAX_RATE_KEYS = 10000
+
+def _setting(route_class, name, default, cast=int):
+    return cast(os.getenv(f'ADMISSION_{route_class.upper()}_{name}', default))
+
+# Expensive endpoints, grouped so each group has its own concurrency limit,
+# wait queue and per-user rate. Endpoints not listed here are admitted
+# without any checks, so interactive reads never wait behind an upload.
+ROUTE_CLASSES = {
+    'upload': {
+        'endpoints': ('session.upload_audio',),
+        'concurrency': _setting('upload', 'CONCURRENCY', 4),
+        'queue': _setting('upload', 'QUEUE', 4),
+        'wait_seconds': _setting('upload', 'WAIT_SECONDS', 5, float),
+        'per_minute': _setting('upload', 'PER_MINUTE', 6, float),
+        'burst': _setting('upload', 'BURST', 3)
+    },
+    'generate': {
+        'endpoints': ('session.generate_report',),
+        'concurrency': _setting('generate', 'CONCURRENCY', 8),
+        'queue': _setting('generate', 'QUEUE', 8),
+        'wait_seconds': _setting('generate', 'WAIT_SECONDS', 2, float),
+        'per_minute': _setting('generate', 'PER_MINUTE', 10, float),
+        'burst': _setting('generate', 'BURST', 5)
+    },
+    'search': {
+        'endpoints': ('search.search_documents',),
+        'concurrency': _setting('search', 'CONCURRENCY', 8),
+        'queue': _setting('search', 'QUEUE', 16),
+        'wait_seconds': _setting('search', 'WAIT_SECONDS', 1, float),
+        'per_minute': _setting('search', 'PER_MINUTE', 120, float),
+        'burst': _setting('search', 'BURST', 20)
+    },
+    # A bulk import writes for as long as its upload lasts
+    'import': {
+        'endpoints': ('patient.import_patient_records',),
+        'concurrency': _setting('import', 'CONCURRENCY', 1),
+        'queue': _setting('import', 'QUEUE', 1),
+        'wait_seconds': _setting('import', 'WAIT_SECONDS', 5, float),
+        'per_minute': _setting('import', 'PER_MINUTE', 6, float),
+        'burst': _setting('import', 'BURST', 3)
+    },
+    # A bulk export holds a thread until its last page is sent
+    'export': {
+        'endpoints': ('export.export_resource',),
+        'concurrency': _setting('export', 'CONCURRENCY', 2),
+        'queue': _setting('export', 'QUEUE', 2),
+        'wait_seconds': _setting('export', 'WAIT_SECONDS', 5, float),
+        'per_minute': _setting('export', 'PER_MINUTE', 6, float),
+        'burst': _setting('export', 'BURST', 3)
+    },
+    # Under the Flask server each open event stream holds a thread
+    'events': {
+        'endpoints': ('session.get_session_events',),
+        'concurrency': _setting('events', 'CONCURRENCY', 64),
+        'queue': _setting('events', 'QUEUE', 0),
+        'wait_seconds': _setting('events', 'WAIT_SECONDS', 0, float),
+        'per_minute': _setting('events', 'PER_MINUTE', 30, float),
+        'burst': _setting('events', 'BURST', 10)
+    },
+}
+
+class ConcurrencyLimiter:
+    # At most `limit` requests run at once and at most `queue` more wait,
+    # each for up to `wait_seconds`; anyone beyond that is turned away at
+    # once. Waiting requests go ahead of newcomers.
+    def __init__(self, limit, queue, wait_seconds):
+        self.limit = limit
+        self.queue = queue
+        self.wait_seconds = wait_seconds
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue:
+                return False
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(lambda: self.active < self.limit, self.wait_seconds)
+                if admitted:
+                    self.active += 1
+                return admitted
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+class RateLimiter:
+    # Token bucket per key: `burst` requests at once, refilled at
+    # `per_minute`. Full buckets are forgotten when there are too many keys.
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        # Returns 0 when admitted, otherwise seconds until a token is free
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+            admitted = tokens >= 1
+            self._buckets[key] = (tokens - 1 if admitted else tokens, now)
+            if len(self._buckets) > MAX_RATE_KEYS:
+                self._prune(now)
+            if admitted:
+                return 0
+            return (1 - tokens) / self.rate if self.rate else math.inf
+
+    def _prune(self, now):
+        for key, (tokens, stamp) in list(self._buckets.items()):
+            if tokens + (now - stamp) * self.rate >= self.burst:
+                del self._buckets[key]
+
+_limits = {}
+for _name, _config in ROUTE_CLASSES.items():
+    _limits[_name] = (
+        ConcurrencyLimiter(_config['concurrency'], _config['queue'], _config['wait_seconds']),
+        RateLimiter(_config['per_minute'], _config['burst'])
+    )
+_endpoint_classes = {endpoint: name for name, config in ROUTE_CLASSES.items() for endpoint in config['endpoints']}
+
+class AdmissionRejected(Exception):
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+
+def route_class_for(endpoint):
+    return _endpoint_classes.get(endpoint)
+
+# Takes a rate token and a concurrency slot for one request, waiting for a
+# slot if need be. Returns the limiter to release once the response has
+# been sent; raises AdmissionRejected instead when the request is turned away.
+def admit(route_class, client_key):
+    config = ROUTE_CLASSES[route_class]
+    concurrency, rate = _limits[route_class]
+    retry_after = rate.take(client_key)
+    if retry_after:
+        registry.inc('admission_rejections_total', {'class': route_class, 'reason': 'rate'})
+        raise AdmissionRejected('Too many requests, slow down', 429, retry_after)
+    if not concurrency.acquire():
+        registry.inc('admission_rejections_total', {'class': route_class, 'reason': 'busy'})
+        raise AdmissionRejected('Server is busy, try again shortly', 503, config['wait_seconds'] or 1)
+    return concurrency
+
+def _client_key():
+    # Per user when the token is valid; the address otherwise, and the
+    # request then fails authentication anyway
+    user, _ = request_identity()
+    return f"user:{user['id']}" if user else f"addr:{request.remote_addr}"
+
+# App before_request hook; the slot is given back in release_admission
+def admit_request():
+    route_class = route_class_for(request.endpoint)
+    if route_class is None or request.method == 'OPTIONS':
+        return None
+    try:
+        g.admission = admit(route_class, _client_key())
+    except AdmissionRejected as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    return None
+
+# App teardown_request hook; streamed responses tear down when they end
+def release_admission(exc=None):
+    concurrency = g.pop('admission', None)
+    if concurrency is not None:
+        concurrency.release()
+
+def admission_stats():
+    return {name: {'active': concurrency.active, 'waiting': concurrency.waiting}
+            for name, (concurrency, _) in _limits.items()}
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.http import parse_accept_header
+
+from utils.admission import AdmissionRejected, admit, route_class_for
+from utils.auth import identify
+from utils.cors import cors_headers
+from utils.http_cache import conditional
+from utils.metrics import SERVER_TIMING, registry, request_timing, server_timing
+
+logger = logging.getLogger(__name__)
+
+_CONVERTERS = {'int': r'(\d+)', 'string': r'([^/]+)'}
+
+class AsyncRequest:
+    # The parts of a Flask request the async handlers read
+    def __init__(self, scope, receive):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+        self.args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        self.remote_addr = (scope.get('client') or (None,))[0]
+        self.user = None
+        self._receive = receive
+
+    async def get_data(self):
+        chunks = []
+        while True:
+            message = await self._receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def get_json(self):
+        try:
+            return json.loads(await self.get_data() or b'null')
+        except ValueError:
+            return None
+
+class StreamingResponse:
+    # Returned by a handler in place of a JSON payload. Chunks from the async
+    # iterator are sent as they come until it ends or the client goes away.
+    def __init__(self, chunks, content_type, headers=()):
+        self.chunks = chunks
+        self.content_type = content_type
+        self.headers = list(headers)
+
+class Router:
+    # Flask-style rules ('/api/patients/<int:patient_id>') so the metrics
+    # route label is the same in both serving modes. endpoint names the Flask
+    # view a route stands in for, which puts it in the same admission class.
+    def __init__(self):
+        self.routes = []
+
+    def route(self, rule, methods=('GET',), auth=True, endpoint=None):
+        def decorator(handler):
+            names = []
+
+            def convert(match):
+                converter, _, name = match.group(1).rpartition(':')
+                names.append((name, converter or 'string'))
+                return _CONVERTERS[converter or 'string']
+
+            pattern = re.compile('^' + re.sub(r'<([^>]+)>', convert, rule) + '$')
+            self.routes.append((set(methods), pattern, rule, names, handler, auth, endpoint))
+            return handler
+        return decorator
+
+    def match(self, method, path):
+        for methods, pattern, rule, names, handler, auth, endpoint in self.routes:
+            if method not in methods:
+                continue
+            found = pattern.match(path)
+            if found:
+                params = {name: int(value) if converter == 'int' else value
+                          for (name, converter), value in zip(names, found.groups())}
+                return rule, handler, params, auth, endpoint
+        return None
+
+def dump_json(payload):
+    # Same bytes as Flask's jsonify, so ETags agree across serving modes
+    return (json.dumps(payload, separators=(',', ':'), sort_keys=True, default=str) + '\n').encode()
+
+def build_response(request, payload, status):
+    headers = [('Content-Type', 'application/json')] + cors_headers(request.headers.get('Origin'))
+    headers.append(('Vary', 'Origin, Accept-Encoding'))
+    status, validators, body = conditional(request.method, status, dump_json(payload), request.headers,
+                                           parse_accept_header(request.headers.get('Accept-Encoding')))
+    return status, headers + validators, body
+
+async def _admit(request, route_class):
+    # The limiter may wait for a slot, so it waits on a thread, not the loop
+    user = request.user
+    key = f"user:{user['id']}" if user else f"addr:{request.remote_addr}"
+    return await asyncio.to_thread(admit, route_class, key)
+
+async def _stream(chunks, receive, send):
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    watcher = asyncio.ensure_future(disconnected())
+    iterator = chunks.__aiter__()
+    try:
+        while True:
+            step = asyncio.ensure_future(iterator.__anext__())
+            await asyncio.wait({step, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not step.done():
+                # Client went away while the stream was waiting for data
+                step.cancel()
+                try:
+                    await step
+                except asyncio.CancelledError:
+                    pass
+                return
+            try:
+                chunk = step.result()
+            except StopAsyncIteration:
+                break
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        await iterator.aclose()
+
+async def dispatch(router, scope, receive, send):
+    # Returns False when no async route matches, so the caller can fall back
+    matched = router.match(scope['method'], scope['path'])
+    if matched is None:
+        return False
+    rule, handler, params, auth, endpoint = matched
+    request = AsyncRequest(scope, receive)
+    route_class = route_class_for(endpoint)
+    start = time.perf_counter()
+    timing = {'db_time': 0.0, 'db_calls': 0}
+    token = request_timing.set(timing)
+    admission = None
+    retry_after = None
+    try:
+        error = None
+        if auth:
+            request.user, error = identify(request.headers.get('Authorization', ''))
+        if error:
+            payload, status = {'error': error}, 401
+        else:
+            if route_class is not None:
+                admission = await _admit(request, route_class)
+            payload, status = await handler(request, **params)
+    except AdmissionRejected as e:
+        payload, status, retry_after = {'error': str(e)}, e.status, e.retry_after
+    except Exception as e:
+        logger.exception("Unhandled error in %s %s", request.method, rule)
+        payload, status = {'error': str(e)}, 500
+    finally:
+        request_timing.reset(token)
+    try:
+        if isinstance(payload, StreamingResponse):
+            headers = [('Content-Type', payload.content_type)] + cors_headers(request.headers.get('Origin')) + payload.headers
+            body = None
+        else:
+            status, headers, body = build_response(request, payload, status)
+        if retry_after is not None:
+            headers.append(('Retry-After', str(retry_after)))
+
+        elapsed = time.perf_counter() - start
+        labels = {'method': request.method, 'route': rule}
+        registry.observe('http_request_duration_seconds', labels, elapsed)
+        registry.inc('http_requests_total', {**labels, 'status': str(status)})
+        if status >= 500:
+            registry.inc('http_request_errors_total', labels)
+        if SERVER_TIMING:
+            headers.append(('Server-Timing', server_timing(elapsed, timing['db_time'], timing['db_calls'])))
+
+        # Streams are timed to their first byte, not their whole life
+        if body is not None:
+            headers.append(('Content-Length', str(len(body))))
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]})
+        if body is None:
+            await _stream(payload.chunks, receive, send)
+        else:
+            await send({'type': 'http.response.body', 'body': b'' if request.method == 'HEAD' else body})
+    finally:
+        # Held until the response, streamed or not, has been sent
+        if admission is not None:
+            admission.release()
+    return True
@@ -0,0 +1,69 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from dotenv import load_dotenv
+from flask import g, jsonify, request
+
+load_dotenv()
+
+JWT_ALGORITHM = 'HS256'
+ACCESS_TOKEN_TTL_SECONDS = int(os.getenv('ACCESS_TOKEN_TTL_SECONDS', 3600))
+
+def _secret():
+    secret = os.getenv('JWT_SECRET')
+    if not secret:
+        raise ValueError("JWT_SECRET must be set in .env file")
+    return secret
+
+# Called once at startup so a missing secret stops the app instead of
+# failing every login
+def check_secret():
+    _secret()
+
+def issue_access_token(user):
+    now = datetime.now(timezone.utc)
+    claims = {
+        'sub': str(user['id']),
+        'email': user['email'],
+        'role': user['role'],
+        'iat': now,
+        'exp': now + timedelta(seconds=ACCESS_TOKEN_TTL_SECONDS)
+    }
+    return jwt.encode(claims, _secret(), algorithm=JWT_ALGORITHM)
+
+def decode_access_token(token):
+    return jwt.decode(token, _secret(), algorithms=[JWT_ALGORITHM], options={'require': ['sub', 'exp']})
+
+# Returns (user, error) for an Authorization header; shared by the Flask
+# hook and the ASGI app
+def identify(header):
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None, 'Missing access token'
+    try:
+        claims = decode_access_token(token)
+    except jwt.ExpiredSignatureError:
+        return None, 'Access token expired'
+    except jwt.InvalidTokenError:
+        return None, 'Invalid access token'
+    user_id = claims['sub']
+    return {'id': int(user_id) if user_id.isdigit() else user_id, 'email': claims.get('email'), 'role': claims.get('role')}, None
+
+# Decoded once per request: admission control needs the caller before
+# require_auth runs
+def request_identity():
+    if 'identity' not in g:
+        g.identity = identify(request.headers.get('Authorization', ''))
+    return g.identity
+
+# Blueprint before_request hook: identity comes from the signed token alone,
+# so authenticated requests need no database lookup
+def require_auth():
+    if request.method == 'OPTIONS':
+        return None
+    user, error = request_identity()
+    if error:
+        return jsonify({'error': error}), 401
+    g.user = user
+    return None
@@ -0,0 +1,188 @@
+import asyncio
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', 30))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+
+class TTLCache:
+    # LRU ordered dict with a per-entry expiry. Keys are (namespace, key)
+    # tuples so writes can drop one record or a whole namespace.
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._namespaces = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a read that raced a write is not
+        # stored after the write has landed
+        self.version = 0
+        # Reads in progress, so concurrent misses for one key share a call
+        self._flights = {}
+        self._async_flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.coalesced = 0
+
+    def _remove(self, entry_key):
+        del self._entries[entry_key]
+        keys = self._namespaces.get(entry_key[0])
+        if keys is not None:
+            keys.discard(entry_key)
+
+    def get(self, namespace, key):
+        entry_key = (namespace, str(key))
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(entry_key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, namespace, key, value, version=None):
+        entry_key = (namespace, str(key))
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[entry_key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(entry_key)
+            self._namespaces.setdefault(namespace, set()).add(entry_key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _join(self, flights, flight_key):
+        # Called with the lock held. A flight started before the latest
+        # invalidation may return what the write replaced, so later callers
+        # start their own instead of sharing it.
+        flight = flights.get(flight_key)
+        if flight is not None and flight['version'] == self.version:
+            self.coalesced += 1
+            return flight
+        return None
+
+    def load(self, namespace, key, func):
+        # Cache miss path: runs func() once for all concurrent callers of the
+        # same key and stores a found record
+        flight_key = (namespace, str(key))
+        with self._lock:
+            flight = self._join(self._flights, flight_key)
+            leader = flight is None
+            if leader:
+                flight = {'version': self.version, 'done': threading.Event(), 'value': None, 'error': None}
+                self._flights[flight_key] = flight
+        if not leader:
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['value']
+        try:
+            flight['value'] = func()
+            if _has_data(flight['value']):
+                self.set(namespace, key, flight['value'], flight['version'])
+            return flight['value']
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(flight_key) is flight:
+                    del self._flights[flight_key]
+            flight['done'].set()
+
+    async def load_async(self, namespace, key, func):
+        # The call runs as its own task and every caller awaits it shielded,
+        # so one caller being cancelled does not cancel the others' read
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, namespace, str(key))
+        with self._lock:
+            flight = self._join(self._async_flights, flight_key)
+            if flight is None:
+                flight = {'version': self.version, 'task': loop.create_task(func())}
+                self._async_flights[flight_key] = flight
+                flight['task'].add_done_callback(lambda task: self._land(flight_key, flight, namespace, key))
+        return await asyncio.shield(flight['task'])
+
+    def _land(self, flight_key, flight, namespace, key):
+        with self._lock:
+            if self._async_flights.get(flight_key) is flight:
+                del self._async_flights[flight_key]
+        task = flight['task']
+        # Reading the exception marks it retrieved when every caller has gone
+        if not task.cancelled() and task.exception() is None and _has_data(task.result()):
+            self.set(namespace, key, task.result(), flight['version'])
+
+    def invalidate(self, namespace, key=None):
+        with self._lock:
+            self.version += 1
+            if key is None:
+                entry_keys = list(self._namespaces.get(namespace, ()))
+            else:
+                entry_keys = [(namespace, str(key))]
+            for entry_key in entry_keys:
+                if entry_key in self._entries:
+                    self._remove(entry_key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'coalesced': self.coalesced
+            }
+
+model_cache = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+
+def _has_data(result):
+    # Only cache found records: misses and errors must not hide later inserts
+    if isinstance(result, dict):
+        return bool(result.get('data')) and not result.get('error')
+    return bool(getattr(result, 'data', None))
+
+def cached(namespace):
+    # Sync and async readers of the same namespace share entries
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(key):
+                found, value = model_cache.get(namespace, key)
+                if found:
+                    return value
+                return await model_cache.load_async(namespace, key, lambda: func(key))
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(key):
+            found, value = model_cache.get(namespace, key)
+            if found:
+                return value
+            return model_cache.load(namespace, key, lambda: func(key))
+        return wrapper
+    return decorator
+
+def invalidate(namespace, key=None):
+    model_cache.invalidate(namespace, key)
@@ -0,0 +1,14 @@
+# CORS settings for both serving modes: main.py hands them to flask-cors and
+# the ASGI server applies them to the routes it answers natively
+CORS_ORIGINS = ('http://localhost:8080',)
+CORS_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+CORS_ALLOW_HEADERS = ('Content-Type', 'Authorization', 'Last-Event-ID')
+CORS_EXPOSE_HEADERS = ('Retry-After',)
+CORS_MAX_AGE = 3600
+
+def cors_headers(origin):
+    if origin not in CORS_ORIGINS:
+        return []
+    return [('Access-Control-Allow-Origin', origin),
+            ('Access-Control-Allow-Credentials', 'true'),
+            ('Access-Control-Expose-Headers', ', '.join(CORS_EXPOSE_HEADERS))]
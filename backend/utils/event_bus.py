@@ -0,0 +1,130 @@
+import asyncio
+import itertools
+import json
+import queue
+import threading
+from collections import OrderedDict, deque
+
+def format_event(event_id, event, data):
+    # One Server-Sent Events message
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n".encode()
+
+class EventBus:
+    # Per-process fan-out from worker threads to stream subscribers. Each
+    # channel keeps its last `replay` events so a client reconnecting with
+    # Last-Event-ID gets what it missed; channels nobody is listening to are
+    # dropped oldest first beyond `max_channels`.
+    def __init__(self, replay=256, max_channels=1000):
+        self.replay = replay
+        self.max_channels = max_channels
+        self._channels = OrderedDict()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def _channel(self, name):
+        channel = self._channels.get(name)
+        if channel is None:
+            # Whatever this channel saw before now is unknown, so resuming
+            # from an earlier id cannot be complete
+            channel = {'events': deque(maxlen=self.replay), 'dropped_upto': self._last_id, 'subscribers': set()}
+            self._channels[name] = channel
+            idle = [key for key, value in self._channels.items() if not value['subscribers']]
+            for key in idle[:max(0, len(self._channels) - self.max_channels)]:
+                del self._channels[key]
+        self._channels.move_to_end(name)
+        return channel
+
+    def publish(self, name, event, data):
+        with self._lock:
+            channel = self._channel(name)
+            self._last_id = next(self._ids)
+            if len(channel['events']) == channel['events'].maxlen:
+                channel['dropped_upto'] = channel['events'][0][0]
+            item = (self._last_id, event, data)
+            channel['events'].append(item)
+            subscribers = list(channel['subscribers'])
+        for deliver in subscribers:
+            deliver(item)
+
+    def subscribe(self, name, deliver, last_id=None):
+        # Returns the events after last_id, whether that list is complete and
+        # the newest id so far; registering and reading the backlog happen
+        # under one lock so nothing published in between is lost or sent twice
+        with self._lock:
+            channel = self._channel(name)
+            channel['subscribers'].add(deliver)
+            if last_id is None:
+                return [], True, self._last_id
+            complete = channel['dropped_upto'] <= last_id <= self._last_id
+            return [item for item in channel['events'] if item[0] > last_id], complete, self._last_id
+
+    def unsubscribe(self, name, deliver):
+        with self._lock:
+            channel = self._channels.get(name)
+            if channel is not None:
+                channel['subscribers'].discard(deliver)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'channels': len(self._channels),
+                'subscribers': sum(len(channel['subscribers']) for channel in self._channels.values())
+            }
+
+class Subscription:
+    # A queue fed by the bus. A subscriber that falls more than max_queued
+    # events behind is marked overflowed and gets nothing more; the stream
+    # then ends instead of buffering without bound.
+    def __init__(self, bus, name, last_id=None, max_queued=1000):
+        self.bus = bus
+        self.name = name
+        self.max_queued = max_queued
+        self.overflowed = False
+        self._queue = self._make_queue()
+        self.backlog, self.complete, self.current_id = bus.subscribe(name, self._deliver, last_id)
+
+    def _make_queue(self):
+        return queue.Queue()
+
+    def _deliver(self, item):
+        self._put(item)
+
+    def _put(self, item):
+        if self.overflowed:
+            return
+        if self._queue.qsize() >= self.max_queued:
+            self.overflowed = True
+            return
+        self._queue.put_nowait(item)
+
+    def get(self, timeout):
+        # None when nothing arrived within timeout
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self.name, self._deliver)
+
+class AsyncSubscription(Subscription):
+    # Waiting costs a pending future on the event loop, not a thread, so a
+    # worker can hold many idle streams. Must be created on the loop.
+    def _make_queue(self):
+        self._loop = asyncio.get_running_loop()
+        return asyncio.Queue()
+
+    def _deliver(self, item):
+        # Publishers run on worker threads
+        try:
+            self._loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            # Loop already closed; the stream is gone
+            pass
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
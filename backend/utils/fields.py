@@ -0,0 +1,92 @@
+from functools import lru_cache
+
+# Fields each resource can return, mapped to where they live in the select.
+# Embedded columns are written `users.first_name`; anything not listed here
+# (users.password in particular) is never selected.
+RESOURCE_FIELDS = {
+    'patients': {
+        'id': 'id',
+        'user_id': 'user_id',
+        'date_of_birth': 'date_of_birth',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'first_name': 'users.first_name',
+        'last_name': 'users.last_name',
+        'email': 'users.email'
+    },
+    'doctors': {name: name for name in (
+        'id', 'user_id', 'created_at', 'updated_at',
+        'users.id', 'users.email', 'users.role', 'users.first_name', 'users.last_name'
+    )},
+    'sessions': {name: name for name in (
+        'id', 'patient_id', 'doctor_id', 'status', 'notes', 'created_at', 'updated_at'
+    )},
+    'reports': {name: name for name in (
+        'id', 'session_id', 'summary', 'symptoms', 'medications', 'followups', 'notes',
+        'version', 'created_at', 'updated_at'
+    )},
+}
+
+# What a read returns without fields=
+DEFAULT_FIELDS = {
+    'patients': ('id', 'user_id', 'date_of_birth', 'first_name', 'last_name', 'email'),
+    'doctors': tuple(RESOURCE_FIELDS['doctors']),
+    'sessions': None,
+    'reports': None,
+}
+
+# Embeds that stay in the select whatever was asked for: patients without
+# a user row are not patients
+REQUIRED_EMBEDS = {
+    'patients': {'users': 'users!inner'},
+}
+
+# Raises ValueError with a client-facing message on bad input. Returns None
+# when the client did not ask, so callers use the default projection.
+def parse_fields(args, resource):
+    value = args.get('fields')
+    if not value:
+        return None
+    fields = [item.strip() for item in value.split(',') if item.strip()]
+    allowed = RESOURCE_FIELDS[resource]
+    unknown = [item for item in fields if item not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field: {', '.join(unknown)}")
+    # Pages are keyed on id, so it is always returned
+    return tuple(dict.fromkeys(['id'] + fields))
+
+@lru_cache(maxsize=256)
+def select_clause(resource, fields=None):
+    fields = fields or DEFAULT_FIELDS[resource]
+    if fields is None:
+        return '*'
+    columns, embeds = [], {}
+    for name in fields:
+        embed, _, column = RESOURCE_FIELDS[resource][name].rpartition('.')
+        if embed:
+            embeds.setdefault(embed, []).append(column)
+        else:
+            columns.append(column)
+    required = REQUIRED_EMBEDS.get(resource, {})
+    for embed in required:
+        embeds.setdefault(embed, ['id'])
+    for embed, embed_columns in embeds.items():
+        columns.append(f"{required.get(embed, embed)}({','.join(embed_columns)})")
+    return ','.join(columns)
+
+# Trims an already formatted record, for reads served from the cache with
+# the default projection
+def pick(record, fields):
+    if not fields or record is None:
+        return record
+    result = {}
+    for name in fields:
+        embed, _, column = name.rpartition('.')
+        if not embed:
+            if name in record:
+                result[name] = record[name]
+        elif isinstance(record.get(embed), dict):
+            result.setdefault(embed, {})[column] = record[embed].get(column)
+        elif embed in record:
+            result[embed] = record[embed]
+    return result
@@ -0,0 +1,94 @@
+import gzip
+import hashlib
+import os
+import re
+from datetime import datetime
+
+from flask import request
+from werkzeug.http import http_date, parse_date, parse_etags
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+
+_UPDATED_AT = re.compile(rb'"updated_at":\s*"([^"]+)"')
+# {"data": {...}}: one record, not a list
+_SINGLE_RECORD = re.compile(rb'^\{\s*"data"\s*:\s*\{')
+
+def last_modified(body):
+    # Only for single records: a list loses rows without any updated_at
+    # moving, so collections are validated by their ETag alone
+    if not _SINGLE_RECORD.match(body):
+        return None
+    # Scan the serialised rows instead of parsing the JSON a second time
+    latest = None
+    for match in _UPDATED_AT.finditer(body):
+        try:
+            value = datetime.fromisoformat(match.group(1).decode())
+        except ValueError:
+            continue
+        if value.tzinfo is not None and (latest is None or value > latest):
+            latest = value
+    return latest
+
+def body_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def compress_body(body, accept_encodings):
+    # Returns (body, encoding); encoding is None when left uncompressed
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return body, None
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    encoding = accept_encodings.best_match(offered)
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY), encoding
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), encoding
+    return body, None
+
+def not_modified(etag, modified, if_none_match, if_modified_since):
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(etag)
+    since = parse_date(if_modified_since)
+    return since is not None and modified is not None and modified.replace(microsecond=0) <= since
+
+# Validators derived from the body, 304 on a matching If-None-Match/
+# If-Modified-Since, then compression. Returns (status, headers, body); the
+# Flask hook below and the ASGI server both answer through it.
+def conditional(method, status, body, request_headers, accept_encodings):
+    headers = []
+    if method in ('GET', 'HEAD') and status == 200:
+        # Weak because the same rows may be sent with different encodings
+        etag = body_etag(body)
+        modified = last_modified(body)
+        headers.append(('ETag', f'W/"{etag}"'))
+        if modified is not None:
+            headers.append(('Last-Modified', http_date(modified)))
+        if not_modified(etag, modified, request_headers.get('If-None-Match'), request_headers.get('If-Modified-Since')):
+            return 304, headers, b''
+    if status == 200:
+        body, encoding = compress_body(body, accept_encodings)
+        if encoding is not None:
+            headers.append(('Content-Encoding', encoding))
+    return status, headers, body
+
+# after_request hook for JSON responses
+def conditional_response(response):
+    if response.is_streamed or response.direct_passthrough or response.mimetype != 'application/json':
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+    status, headers, body = conditional(request.method, response.status_code, response.get_data(),
+                                        request.headers, request.accept_encodings)
+    if response.status_code == 200:
+        response.vary.add('Accept-Encoding')
+    response.status_code = status
+    response.set_data(body)
+    for name, value in headers:
+        response.headers[name] = value
+    return response
@@ -0,0 +1,90 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# Comma separated logger=LEVEL pairs, e.g. "models.patient=DEBUG,httpx=INFO"
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 0.01))
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s'
+
+# Per-request client logging is too chatty for the default level
+DEFAULT_LOG_LEVELS = {'httpx': 'WARNING', 'httpcore': 'WARNING', 'hpack': 'WARNING'}
+
+_listener = None
+
+class NonBlockingQueueHandler(QueueHandler):
+    # Hands records to the listener thread untouched: message formatting
+    # happens there, and a full queue drops records instead of blocking
+    def __init__(self, log_queue, max_size=LOG_QUEUE_SIZE):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+class SamplingFilter(logging.Filter):
+    # Passes every INFO-and-above record and a fraction of DEBUG ones
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+def parse_levels(spec):
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging(level=None, levels=None, stream=None):
+    global _listener
+    if _listener is not None:
+        return
+    # SimpleQueue is lock-free from the caller's side; the handler bounds it
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+    root.setLevel(level or LOG_LEVEL)
+
+    configured = dict(DEFAULT_LOG_LEVELS)
+    configured.update(parse_levels(LOG_LEVELS) if levels is None else levels)
+    for name, logger_level in configured.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def get_sampled_logger(name, rate=None):
+    # For per-call debug output on hot paths, e.g. dumping query responses
+    logger = logging.getLogger(f"{name}.sampled")
+    if not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        logger.addFilter(SamplingFilter(LOG_DEBUG_SAMPLE_RATE if rate is None else rate))
+    return logger
@@ -0,0 +1,185 @@
+import contextvars
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context, request
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+
+METRIC_HELP = {
+    'http_request_duration_seconds': ('histogram', 'Flask handler latency by route'),
+    'http_requests_total': ('counter', 'Requests by route and status'),
+    'http_request_errors_total': ('counter', 'Requests that ended in a 5xx response'),
+    'db_call_duration_seconds': ('histogram', 'Model function latency, including the Supabase round trip'),
+    'db_call_errors_total': ('counter', 'Model calls that raised or returned an error'),
+    'section_duration_seconds': ('histogram', 'In-process work such as response formatting'),
+    'report_patches_total': ('counter', 'Report deltas accepted through PATCH'),
+    'report_flushes_total': ('counter', 'Database writes of batched report deltas'),
+    'patient_import_rows_total': ('counter', 'Bulk-imported patient rows by outcome (imported, skipped, failed)'),
+    'export_rows_total': ('counter', 'Rows streamed by the bulk export endpoints'),
+    'admission_rejections_total': ('counter', 'Requests turned away by class and reason (rate or busy)'),
+}
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self, extra_gauges=None):
+        with self._lock:
+            histograms = [(k, list(h.counts), h.total, h.count, h.buckets) for k, h in self._histograms.items()]
+            counters = list(self._counters.items())
+        lines = []
+        described = set()
+
+        def describe(name, kind=None, text=None):
+            if name in described:
+                return
+            described.add(name)
+            kind, text = METRIC_HELP.get(name, (kind, text))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), counts, total, count, buckets in sorted(histograms):
+            describe(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels, ('le', repr(bound)))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels, ('le', '+Inf'))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for (name, labels), value in sorted(counters):
+            describe(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for name, (value, text) in sorted((extra_gauges or {}).items()):
+            describe(name, 'gauge', text)
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+def _labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+registry = MetricsRegistry()
+
+# Per-request database time for the ASGI app, which has no Flask g
+request_timing = contextvars.ContextVar('request_timing', default=None)
+
+def _record_db_time(elapsed):
+    if has_request_context():
+        g.db_time = g.get('db_time', 0.0) + elapsed
+        g.db_calls = g.get('db_calls', 0) + 1
+        return
+    timing = request_timing.get()
+    if timing is not None:
+        timing['db_time'] += elapsed
+        timing['db_calls'] += 1
+
+def _record_query(name, result, elapsed):
+    registry.observe('db_call_duration_seconds', {'function': name}, elapsed)
+    _record_db_time(elapsed)
+    # The patient model reports failures in the returned dict
+    if isinstance(result, dict) and result.get('error'):
+        registry.inc('db_call_errors_total', {'function': name})
+
+def timed_query(func):
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                registry.inc('db_call_errors_total', {'function': name})
+                _record_query(name, None, time.perf_counter() - start)
+                raise
+            _record_query(name, result, time.perf_counter() - start)
+            return result
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            registry.inc('db_call_errors_total', {'function': name})
+            _record_query(name, None, time.perf_counter() - start)
+            raise
+        _record_query(name, result, time.perf_counter() - start)
+        return result
+    return wrapper
+
+@contextmanager
+def timed_section(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('section_duration_seconds', {'section': name}, time.perf_counter() - start)
+
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = {'method': request.method, 'route': route}
+    registry.observe('http_request_duration_seconds', labels, elapsed)
+    registry.inc('http_requests_total', {**labels, 'status': str(response.status_code)})
+    if response.status_code >= 500:
+        registry.inc('http_request_errors_total', labels)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = server_timing(elapsed, g.get('db_time', 0.0), g.get('db_calls', 0))
+    return response
+
+def server_timing(elapsed, db_time, db_calls):
+    return f'app;dur={elapsed * 1000:.1f}, db;dur={db_time * 1000:.1f};desc="{db_calls} calls"'
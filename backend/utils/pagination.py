@@ -0,0 +1,74 @@
+import base64
+import json
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, dict):
+        raise ValueError('Invalid cursor')
+    return values
+
+# These raise ValueError with a client-facing message on bad input
+def parse_limit(args):
+    limit = args.get('limit', DEFAULT_LIMIT)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_LIMIT)
+
+def parse_page_args(args):
+    limit = parse_limit(args)
+    after = args.get('after')
+    if after:
+        after = decode_cursor(after).get('id')
+        if not isinstance(after, int):
+            raise ValueError('Invalid cursor')
+    else:
+        after = None
+    return limit, after
+
+def parse_filters(args, allowed):
+    return {name: args[name] for name in allowed if args.get(name) not in (None, '')}
+
+# Filters, stable `id` ordering and the keyset bound for a select. One extra
+# row is requested so callers can tell whether a next page exists.
+def apply_keyset(query, limit, after, filters=None, date_column='created_at'):
+    for name, value in (filters or {}).items():
+        if name == 'from':
+            query = query.gte(date_column, value)
+        elif name == 'to':
+            query = query.lt(date_column, value)
+        else:
+            query = query.eq(name, value)
+    if after is not None:
+        query = query.gt('id', after)
+    return query.order('id').limit(limit + 1)
+
+# Rows changed after a (timestamp, id) watermark, oldest change first, for
+# incremental scans. Ties on the timestamp are broken by id.
+def apply_watermark(query, limit, after, column='updated_at'):
+    if after:
+        changed_at, row_id = after
+        query = query.or_(f'{column}.gt."{changed_at}",and({column}.eq."{changed_at}",id.gt.{row_id})')
+    return query.order(column).order('id').limit(limit)
+
+def make_page(rows, limit):
+    rows = rows or []
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({'id': rows[-1]['id']})
+    return rows, next_cursor
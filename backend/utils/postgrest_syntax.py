@@ -0,0 +1,95 @@
+import re
+from datetime import datetime, timezone
+
+# PostgREST query syntax, parsed in one place for the SQLite backend and the
+# in-memory stand-in in benchmarks/fake_postgrest.py so the two cannot read
+# the same filter differently
+
+_EMBED = re.compile(r'^(?:(\w+):)?(\w+)(?:!(\w+))?\((.*)\)$', re.S)
+_COLUMN = re.compile(r'^(?:(\w+):)?(\w+)(?:::\w+)?$')
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+# Table name to the stem of its foreign keys: patients -> patient_id
+def singular(name):
+    return name[:-1] if name.endswith('s') else name
+
+# Splits on sep outside parentheses and double quotes:
+# 'a,b(c,d),e.eq."f,g"' -> ['a', 'b(c,d)', 'e.eq."f,g"']
+def split_top(text, sep=','):
+    parts, depth, quoted, current = [], 0, False, ''
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif quoted:
+            pass
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += ch
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+def unquote(value):
+    if isinstance(value, str) and len(value) > 1 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+# Raises ValueError on an item it does not understand. Returns the plain
+# columns as (alias, column) and the embeds as dicts.
+def parse_select(select):
+    columns, embeds = [], []
+    for item in split_top(select or '*'):
+        embed = _EMBED.match(item)
+        if embed:
+            alias, relation, hint, inner = embed.groups()
+            embeds.append({'alias': alias or relation, 'relation': relation,
+                           'inner': hint == 'inner', 'select': inner.strip() or '*'})
+        elif item == '*':
+            columns.append(('*', '*'))
+        else:
+            column = _COLUMN.match(item)
+            if not column:
+                raise ValueError(f"Unsupported select item: {item}")
+            columns.append((column.group(1) or column.group(2), column.group(2)))
+    return columns, embeds
+
+# Values of an in filter, from the builder's list or the URL's (a,b,"c")
+def parse_in(value):
+    if isinstance(value, str):
+        return [unquote(v.strip()) for v in value.strip('()').split(',') if v.strip()]
+    return list(value)
+
+# A filter value as it appears in a URL: 'not.eq.5' -> ('eq', '5', True).
+# The value is left quoted, as the builder methods pass theirs.
+def parse_condition(expr):
+    operator, _, value = expr.partition('.')
+    negate = operator == 'not'
+    if negate:
+        operator, _, value = value.partition('.')
+    return operator, value, negate
+
+# or=(...)/and=(...) bodies, e.g. 'a.lt.1,not.and(b.eq.1,c.not.is.null)'.
+# Returns {'conjunction', 'terms', 'negate'}; each term is either another
+# group or {'column', 'operator', 'value', 'negate'}.
+def parse_logic(text, conjunction, negate=False):
+    terms = []
+    for item in split_top(text):
+        negated = item.startswith('not.')
+        if negated:
+            item = item[4:]
+        if item.startswith(('and(', 'or(')):
+            name, _, inner = item.partition('(')
+            terms.append(parse_logic(inner[:-1], name, negated))
+        else:
+            column, _, rest = item.partition('.')
+            operator, value, negate_operator = parse_condition(rest)
+            terms.append({'column': column, 'operator': operator, 'value': value,
+                          'negate': negated != negate_operator})
+    return {'conjunction': conjunction, 'terms': terms, 'negate': negate}
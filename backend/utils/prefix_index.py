@@ -0,0 +1,64 @@
+import bisect
+import threading
+
+def normalise(text):
+    return ' '.join((text or '').casefold().split())
+
+class PrefixIndex:
+    # Sorted (key, id) pairs: a prefix lookup is one bisect plus a scan of
+    # the matching run, so it costs the same for ten rows or a million
+    def __init__(self):
+        self._keys = []
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _unlink(self, item_id):
+        entry = self._records.pop(item_id, None)
+        if entry is None:
+            return
+        for key in entry[0]:
+            position = bisect.bisect_left(self._keys, (key, item_id))
+            if position < len(self._keys) and self._keys[position] == (key, item_id):
+                del self._keys[position]
+
+    def add(self, item_id, keys, record):
+        keys = tuple(dict.fromkeys(normalise(key) for key in keys if normalise(key)))
+        with self._lock:
+            self._unlink(item_id)
+            for key in keys:
+                bisect.insort(self._keys, (key, item_id))
+            self._records[item_id] = (keys, record)
+
+    def remove(self, item_id):
+        with self._lock:
+            self._unlink(item_id)
+
+    def replace(self, items):
+        # Bulk load of (id, keys, record); one sort instead of n inserts
+        records = {}
+        for item_id, keys, record in items:
+            records[item_id] = (tuple(dict.fromkeys(normalise(key) for key in keys if normalise(key))), record)
+        pairs = sorted((key, item_id) for item_id, (keys, _) in records.items() for key in keys)
+        with self._lock:
+            self._keys, self._records = pairs, records
+
+    def search(self, prefix, limit=10):
+        prefix = normalise(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            keys = self._keys
+            for position in range(bisect.bisect_left(keys, (prefix,)), len(keys)):
+                key, item_id = keys[position]
+                if not key.startswith(prefix):
+                    break
+                if item_id not in seen:
+                    seen.add(item_id)
+                    results.append(self._records[item_id][1])
+                    if len(results) == limit:
+                        break
+        return results
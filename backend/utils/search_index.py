@@ -0,0 +1,151 @@
+import heapq
+import math
+import re
+import threading
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'\w+')
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+def parse_query(text):
+    # Quoted runs are phrases; their words also count as terms for ranking
+    terms, phrases = [], []
+    for phrase, word in _QUERY_RE.findall(text or ''):
+        tokens = tokenize(phrase or word)
+        if phrase and len(tokens) > 1:
+            phrases.append(tokens)
+        terms.extend(tokens)
+    return list(dict.fromkeys(terms)), phrases
+
+class InvertedIndex:
+    # Positional postings (term -> {doc: [positions]}) scored with BM25.
+    # Documents carry a few attributes; those named in `keys` get a
+    # secondary index so filters and bulk removals skip the postings.
+    def __init__(self, keys=()):
+        self.keys = tuple(keys)
+        self._postings = {}
+        self._docs = {}
+        # Kept apart from _docs so scoring does one flat lookup per document
+        self._lengths = {}
+        self._by_key = {key: {} for key in self.keys}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _unlink(self, doc):
+        entry = self._docs.pop(doc, None)
+        if entry is None:
+            return
+        for term in entry['terms']:
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+        for key in self.keys:
+            self._unkey(key, entry['attrs'].get(key), doc)
+        self._total_length -= self._lengths.pop(doc)
+
+    def _unkey(self, key, value, doc):
+        docs = self._by_key[key].get(value)
+        if docs is not None:
+            docs.discard(doc)
+            if not docs:
+                del self._by_key[key][value]
+
+    def add(self, doc, text, **attrs):
+        # Re-adding a document replaces it
+        tokens = tokenize(text)
+        positions = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(position)
+        with self._lock:
+            self._unlink(doc)
+            for term, term_positions in positions.items():
+                self._postings.setdefault(term, {})[doc] = term_positions
+            for key in self.keys:
+                self._by_key[key].setdefault(attrs.get(key), set()).add(doc)
+            self._docs[doc] = {'attrs': attrs, 'text': text, 'terms': tuple(positions)}
+            self._lengths[doc] = len(tokens)
+            self._total_length += len(tokens)
+
+    def remove(self, doc):
+        with self._lock:
+            self._unlink(doc)
+
+    def _matching(self, filters):
+        # Smallest secondary-index set first; None when nothing is filtered
+        sets = sorted((self._by_key[key].get(value, set()) for key, value in filters.items()), key=len)
+        if not sets:
+            return None
+        return set(sets[0]).intersection(*sets[1:])
+
+    def remove_where(self, **filters):
+        with self._lock:
+            for doc in self._matching(filters) or ():
+                self._unlink(doc)
+
+    def update_where(self, filters, **changes):
+        with self._lock:
+            for doc in self._matching(filters) or ():
+                attrs = self._docs[doc]['attrs']
+                for key, value in changes.items():
+                    if key in self.keys:
+                        self._unkey(key, attrs.get(key), doc)
+                        self._by_key[key].setdefault(value, set()).add(doc)
+                    attrs[key] = value
+
+    def _has_phrase(self, doc, phrase):
+        starts = self._postings[phrase[0]][doc]
+        following = [set(self._postings[term][doc]) for term in phrase[1:]]
+        return any(all(start + offset in positions for offset, positions in enumerate(following, 1))
+                   for start in starts)
+
+    def search(self, terms, phrases=(), filters=None, limit=20):
+        # Every term must match (AND); phrases must also appear in order.
+        # Returns (total, [(score, doc, attrs, text)]) best first.
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not terms or not all(postings):
+                return 0, []
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            allowed = self._matching({key: value for key, value in (filters or {}).items() if value is not None})
+            if allowed is not None:
+                candidates &= allowed
+            for term_postings in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(term_postings.keys())
+            if phrases:
+                candidates = {doc for doc in candidates if all(self._has_phrase(doc, p) for p in phrases)}
+
+            total_docs = len(self._docs)
+            average_length = self._total_length / total_docs if total_docs else 1
+            lengths = self._lengths
+            base = BM25_K1 * (1 - BM25_B)
+            per_token = BM25_K1 * BM25_B / (average_length or 1)
+            weights = [(p, math.log(1 + (total_docs - len(p) + 0.5) / (len(p) + 0.5)) * (BM25_K1 + 1))
+                       for p in postings]
+
+            def score(doc):
+                norm = base + per_token * lengths[doc]
+                total = 0.0
+                for term_postings, weight in weights:
+                    frequency = len(term_postings[doc])
+                    total += weight * frequency / (frequency + norm)
+                return total
+
+            best = heapq.nlargest(limit, candidates, key=score)
+            return len(candidates), [(score(doc), doc, dict(self._docs[doc]['attrs']), self._docs[doc]['text'])
+                                     for doc in best]
+
+    def stats(self):
+        with self._lock:
+            return {'documents': len(self._docs), 'terms': len(self._postings)}
@@ -1,12 +1,124 @@
-from supabase import create_client
+import asyncio
 import os
+import threading
+
+import httpx
 from dotenv import load_dotenv
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.utils import AsyncClient, SyncClient
 
 load_dotenv()
 
-def init_supabase():
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv('SUPABASE_POOL_MAX_CONNECTIONS', 50))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv('SUPABASE_POOL_MAX_KEEPALIVE', 20))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv('SUPABASE_KEEPALIVE_EXPIRY', 60))
+SUPABASE_TIMEOUT = float(os.getenv('SUPABASE_TIMEOUT', 30))
+SUPABASE_HTTP2 = os.getenv('SUPABASE_HTTP2', 'true').lower() not in ('0', 'false', 'no')
+
+def _pool_limits():
+    return httpx.Limits(
+        max_connections=SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY
+    )
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    # Same session postgrest-py builds, with tunable pool limits
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=SUPABASE_HTTP2,
+            limits=_pool_limits()
+        )
+
+class PooledAsyncPostgrestClient(AsyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=SUPABASE_HTTP2,
+            limits=_pool_limits()
+        )
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+def _create_client(client_class=PooledPostgrestClient):
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     if not url or not key:
         raise ValueError("Supabase URL and key must be set in .env file")
-    return create_client(url, key)
+    # The models only use table queries, so talk to PostgREST directly rather
+    # than also building the auth, storage and realtime clients
+    return client_class(
+        f"{url.rstrip('/')}/rest/v1",
+        headers={'apikey': key, 'Authorization': f"Bearer {key}"},
+        timeout=SUPABASE_TIMEOUT
+    )
+
+def get_supabase():
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = _create_client()
+                _client_pid = pid
+    return _client
+
+def close_supabase():
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.session.close()
+        _client = None
+        _client_pid = None
+
+_async_client = None
+_async_loop = None
+
+def get_async_supabase():
+    # An httpx async pool is bound to the event loop it was created on
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client = _create_client(PooledAsyncPostgrestClient)
+        _async_loop = loop
+    return _async_client
+
+async def close_async_supabase():
+    global _async_client, _async_loop
+    if _async_client is not None and _async_loop is asyncio.get_running_loop():
+        await _async_client.aclose()
+    _async_client = None
+    _async_loop = None
+
+def _reset_after_fork():
+    # A pre-forked worker must not share the parent's sockets; drop the
+    # reference (without closing it) so the child builds its own pool
+    global _client, _client_pid, _lock, _async_client, _async_loop
+    _client = None
+    _client_pid = None
+    _lock = threading.Lock()
+    _async_client = None
+    _async_loop = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+class _LazyClient:
+    def __getattr__(self, name):
+        return getattr(get_supabase(), name)
+
+# Process-wide client, created on first use
+supabase = _LazyClient()
@@ -0,0 +1,24 @@
+# A delta is a list of splices applied in order, each against the text left
+# by the previous one: {"at": 120, "delete": 3, "insert": "mg"}. Positions
+# count Unicode code points, like JavaScript strings outside the BMP do not,
+# so clients must send code point offsets.
+
+MAX_DELTA_OPS = 1000
+
+# Raises ValueError with a client-facing message on bad input
+def apply_delta(text, ops):
+    if not isinstance(ops, list):
+        raise ValueError('delta must be a list of operations')
+    if len(ops) > MAX_DELTA_OPS:
+        raise ValueError(f'delta has more than {MAX_DELTA_OPS} operations')
+    text = text or ''
+    for op in ops:
+        if not isinstance(op, dict):
+            raise ValueError('delta operations must be objects')
+        at, delete, insert = op.get('at'), op.get('delete', 0), op.get('insert', '')
+        if not isinstance(at, int) or not isinstance(delete, int) or not isinstance(insert, str):
+            raise ValueError('delta operations need an integer at, an optional integer delete and string insert')
+        if at < 0 or delete < 0 or at + delete > len(text):
+            raise ValueError(f'delta operation at {at} deleting {delete} is outside the text')
+        text = text[:at] + insert + text[at + delete:]
+    return text
@@ -18,8 +18,9 @@ type PatientSelectProps = {
 
 export const PatientSelect = ({ onPatientSelected }: PatientSelectProps) => {
   const [patients, setPatients] = useState<any[]>([]);
+  const [query, setQuery] = useState("");
   const [createNew, setCreateNew] = useState(false);
-  const [loading, setLoading] = useState(true);
+  const [loading, setLoading] = useState(false);
   const [newPatientFirstName, setNewPatientFirstName] = useState("");
   const [newPatientLastName, setNewPatientLastName] = useState("");
   const [newPatientEmail, setNewPatientEmail] = useState("");
@@ -27,30 +28,33 @@ export const PatientSelect = ({ onPatientSelected }: PatientSelectProps) => {
   const [newPatientDob, setNewPatientDob] = useState("");
   const { toast } = useToast();
 
-  // Fetch existing patients
+  // Ask the server for matches as the user types, instead of loading
+  // every patient and filtering here
   useEffect(() => {
-    const fetchPatients = async () => {
+    if (!query.trim()) {
+      setPatients([]);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
       setLoading(true);
       try {
-        const data = await api.patients.getAll();
-        setPatients(data || []);
+        const response = await api.patients.search(query);
+        if (!cancelled) setPatients(response?.data || []);
       } catch (error) {
-        console.error("Error fetching patients:", error);
-        toast({
-          title: "Error",
-          description: "Failed to load patients",
-          variant: "destructive",
-        });
+        console.error("Error searching patients:", error);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
+    }, 150);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
     };
-
-    fetchPatients();
-  }, [toast]);
+  }, [query]);
 
   const handleExistingPatientSelect = (patientId: string) => {
-    const patient = patients.find((p) => p.id === patientId);
+    const patient = patients.find((p) => String(p.id) === patientId);
     if (patient) {
       onPatientSelected(
         patient.id,
@@ -185,6 +189,15 @@ export const PatientSelect = ({ onPatientSelected }: PatientSelectProps) => {
         </div>
       ) : (
         <div className="space-y-4">
+          <div className="space-y-2">
+            <Label htmlFor="patientSearch">Find Patient</Label>
+            <Input
+              id="patientSearch"
+              placeholder="Type a name or email"
+              value={query}
+              onChange={(e) => setQuery(e.target.value)}
+            />
+          </div>
           <div className="space-y-2">
             <Label htmlFor="patientSelect">Select Patient</Label>
             <Select onValueChange={handleExistingPatientSelect}>
@@ -194,17 +207,17 @@ export const PatientSelect = ({ onPatientSelected }: PatientSelectProps) => {
               <SelectContent>
                 {loading ? (
                   <SelectItem value="loading" disabled>
-                    Loading patients...
+                    Searching patients...
                   </SelectItem>
                 ) : patients.length > 0 ? (
                   patients.map((patient) => (
-                    <SelectItem key={patient.id} value={patient.id}>
+                    <SelectItem key={patient.id} value={String(patient.id)}>
                       {patient.first_name} {patient.last_name}
                     </SelectItem>
                   ))
                 ) : (
                   <SelectItem value="none" disabled>
-                    No patients found
+                    {query.trim() ? "No patients found" : "Type to search"}
                   </SelectItem>
                 )}
               </SelectContent>
@@ -57,6 +57,7 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({
       const response = await api.auth.login(email, password);
       const userData = response.data[0];
 
+      localStorage.setItem("medicalToken", response.access_token);
       localStorage.setItem("medicalUser", JSON.stringify(userData));
       setUser(userData);
 
@@ -88,6 +89,7 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({
       const response = await api.auth.register(email, password, role);
       const userData = response.data[0];
 
+      localStorage.setItem("medicalToken", response.access_token);
       localStorage.setItem("medicalUser", JSON.stringify(userData));
       setUser(userData);
 
@@ -110,6 +112,7 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({
   };
 
   const signOut = () => {
+    localStorage.removeItem("medicalToken");
     localStorage.removeItem("medicalUser");
     setUser(null);
     navigate("/login");
@@ -15,51 +15,76 @@ const Dashboard = () => {
   const { user } = useAuth();
   const [sessions, setSessions] = useState<any[]>([]);
   const [patients, setPatients] = useState<any[]>([]);
+  const [sessionCounts, setSessionCounts] = useState<Record<string, number>>(
+    {}
+  );
+  const [sessionsCursor, setSessionsCursor] = useState<string | null>(null);
+  const [patientsCursor, setPatientsCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showNewSessionForm, setShowNewSessionForm] = useState(false);
   const [activeTab, setActiveTab] = useState("sessions");
   const { toast } = useToast();
 
+  // Format sessions data
+  const formatSessions = (rows: any[]) =>
+    rows
+      .map((session) => {
+        if (!session) return null;
+
+        return {
+          id: session.id || "",
+          patient_id: session.patient_id || "",
+          patient_name: session.patient_name || "Unknown Patient",
+          created_at: session.created_at || new Date().toISOString(),
+        };
+      })
+      .filter(Boolean);
+
+  // Format patient data to match PatientCard props
+  const formatPatients = (rows: any[]) =>
+    rows
+      .map((patient) => {
+        if (!patient) return null;
+
+        return {
+          id: patient.id || "",
+          name:
+            patient.first_name || patient.last_name
+              ? `${patient.first_name || ""} ${patient.last_name || ""}`.trim()
+              : "Unknown Patient",
+          dob: patient.date_of_birth || "",
+          createdAt: patient.created_at || new Date().toISOString(),
+        };
+      })
+      .filter(Boolean);
+
+  // Lists come a page at a time; `after` is the previous page's next_cursor
+  const loadSessions = async (after?: string | null) => {
+    const response = await api.sessions.getAll(after);
+    const page = formatSessions(response?.data || []);
+    setSessions((current) => (after ? [...current, ...page] : page));
+    setSessionsCursor(response?.next_cursor || null);
+  };
+
+  const loadPatients = async (after?: string | null) => {
+    const response = await api.patients.getAll(after);
+    const page = formatPatients(response?.data || []);
+    setPatients((current) => (after ? [...current, ...page] : page));
+    setPatientsCursor(response?.next_cursor || null);
+
+    // Session counts for the patients on this page
+    const statsResponse = page.length
+      ? await api.stats.get(page.map((patient) => String(patient.id)))
+      : null;
+    const counts = statsResponse?.data?.sessions_by_patient || {};
+    setSessionCounts((current) => (after ? { ...current, ...counts } : counts));
+  };
+
   const fetchData = async () => {
     setLoading(true);
     try {
-      const sessionsResponse = await api.sessions.getAll();
-      const patientsResponse = await api.patients.getAll();
-
-      // Format sessions data
-      const formattedSessions = (sessionsResponse?.data || [])
-        .map((session) => {
-          if (!session) return null;
-
-          return {
-            id: session.id || "",
-            patient_id: session.patient_id || "",
-            patient_name: session.patient_name || "Unknown Patient",
-            created_at: session.created_at || new Date().toISOString(),
-          };
-        })
-        .filter(Boolean);
-
-      setSessions(formattedSessions);
-
-      // Format patient data to match PatientCard props
-      const formattedPatients = (patientsResponse?.data || [])
-        .map((patient) => {
-          if (!patient) return null;
-
-          const user = patient.users;
-          return {
-            id: patient.id || "",
-            name: user
-              ? `${user.first_name} ${user.last_name}`
-              : "Unknown Patient",
-            dob: patient.date_of_birth || "",
-            createdAt: patient.created_at || new Date().toISOString(),
-          };
-        })
-        .filter(Boolean);
-
-      setPatients(formattedPatients);
+      await Promise.all([loadSessions(), loadPatients()]);
     } catch (error) {
       console.error("Error fetching data:", error);
       toast({
@@ -72,6 +97,25 @@ const Dashboard = () => {
     }
   };
 
+  const loadMore = async (
+    load: (after?: string | null) => Promise<void>,
+    cursor: string | null
+  ) => {
+    setLoadingMore(true);
+    try {
+      await load(cursor);
+    } catch (error) {
+      console.error("Error fetching data:", error);
+      toast({
+        title: "Error",
+        description: "Failed to load more",
+        variant: "destructive",
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (user) {
       fetchData();
@@ -84,8 +128,7 @@ const Dashboard = () => {
   }
 
   const getSessionCountForPatient = (patientId: string) => {
-    if (!sessions || !Array.isArray(sessions)) return 0;
-    return sessions.filter((s) => s.patient_id === patientId).length;
+    return sessionCounts[String(patientId)] || 0;
   };
 
   const handleNewSessionForPatient = async (
@@ -162,17 +205,29 @@ const Dashboard = () => {
                 ))}
               </div>
             ) : sessions.length > 0 ? (
-              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-                {sessions.map((session) => (
-                  <SessionCard
-                    key={session.id}
-                    id={session.id}
-                    patientName={session.patient_name}
-                    patientId={session.patient_id}
-                    createdAt={session.created_at}
-                  />
-                ))}
-              </div>
+              <>
+                <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+                  {sessions.map((session) => (
+                    <SessionCard
+                      key={session.id}
+                      id={session.id}
+                      patientName={session.patient_name}
+                      patientId={session.patient_id}
+                      createdAt={session.created_at}
+                    />
+                  ))}
+                </div>
+                {sessionsCursor && (
+                  <div className="flex justify-center mt-6">
+                    <Button
+                      variant="outline"
+                      disabled={loadingMore}
+                      onClick={() => loadMore(loadSessions, sessionsCursor)}>
+                      {loadingMore ? "Loading..." : "Load more sessions"}
+                    </Button>
+                  </div>
+                )}
+              </>
             ) : (
               <div className="text-center py-12">
                 <div className="mb-4 text-gray-400">
@@ -207,19 +262,31 @@ const Dashboard = () => {
                 ))}
               </div>
             ) : patients.length > 0 ? (
-              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-                {patients.map((patient) => (
-                  <PatientCard
-                    key={patient.id}
-                    id={patient.id}
-                    name={patient.name}
-                    dob={patient.dob}
-                    createdAt={patient.createdAt}
-                    sessionCount={getSessionCountForPatient(patient.id)}
-                    onNewSession={handleNewSessionForPatient}
-                  />
-                ))}
-              </div>
+              <>
+                <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+                  {patients.map((patient) => (
+                    <PatientCard
+                      key={patient.id}
+                      id={patient.id}
+                      name={patient.name}
+                      dob={patient.dob}
+                      createdAt={patient.createdAt}
+                      sessionCount={getSessionCountForPatient(patient.id)}
+                      onNewSession={handleNewSessionForPatient}
+                    />
+                  ))}
+                </div>
+                {patientsCursor && (
+                  <div className="flex justify-center mt-6">
+                    <Button
+                      variant="outline"
+                      disabled={loadingMore}
+                      onClick={() => loadMore(loadPatients, patientsCursor)}>
+                      {loadingMore ? "Loading..." : "Load more patients"}
+                    </Button>
+                  </div>
+                )}
+              </>
             ) : (
               <div className="text-center py-12">
                 <div className="mb-4 text-gray-400">
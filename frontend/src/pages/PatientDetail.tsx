@@ -39,7 +39,7 @@ const PatientDetail = () => {
       setPatient(patientData);
       
       const sessionsData = await api.patients.getSessions(id);
-      setSessions(sessionsData || []);
+      setSessions(sessionsData?.data || []);
     } catch (error) {
       console.error("Error fetching patient:", error);
       toast({
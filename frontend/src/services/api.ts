@@ -2,6 +2,12 @@ import { toast } from "@/hooks/use-toast";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
+// Attach the access token issued at login
+const authHeaders = (): Record<string, string> => {
+  const token = localStorage.getItem("medicalToken");
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
 // Helper function to handle API responses
 const handleResponse = async (response: Response) => {
   if (!response.ok) {
@@ -70,9 +76,14 @@ export const api = {
 
   // Patients endpoints
   patients: {
-    getAll: async () => {
+    // One page in id order; pass the previous page's next_cursor as `after`
+    getAll: async (after?: string | null, limit = 50) => {
       try {
-        const response = await fetch(`${API_BASE_URL}/patients`);
+        const query = new URLSearchParams({ limit: String(limit) });
+        if (after) query.set("after", after);
+        const response = await fetch(`${API_BASE_URL}/patients?${query}`, {
+          headers: authHeaders(),
+        });
         return handleResponse(response);
       } catch (error) {
         return handleApiError(error as Error, "Failed to fetch patients");
@@ -90,6 +101,7 @@ export const api = {
         const response = await fetch(`${API_BASE_URL}/patients`, {
           method: "POST",
           headers: {
+            ...authHeaders(),
             "Content-Type": "application/json",
             Accept: "application/json",
           },
@@ -101,9 +113,24 @@ export const api = {
       }
     },
 
+    search: async (query: string, limit = 10) => {
+      try {
+        const params = new URLSearchParams({ q: query, limit: String(limit) });
+        const response = await fetch(
+          `${API_BASE_URL}/patients/search?${params}`,
+          { headers: authHeaders() }
+        );
+        return handleResponse(response);
+      } catch (error) {
+        return handleApiError(error as Error, "Failed to search patients");
+      }
+    },
+
     getById: async (id: string) => {
       try {
-        const response = await fetch(`${API_BASE_URL}/patients/${id}`);
+        const response = await fetch(`${API_BASE_URL}/patients/${id}`, {
+          headers: authHeaders(),
+        });
         return handleResponse(response);
       } catch (error) {
         return handleApiError(error as Error, "Failed to fetch patient");
@@ -113,7 +140,8 @@ export const api = {
     getSessions: async (patientId: string) => {
       try {
         const response = await fetch(
-          `${API_BASE_URL}/patients/${patientId}/sessions`
+          `${API_BASE_URL}/patients/${patientId}/sessions`,
+          { headers: authHeaders() }
         );
         return handleResponse(response);
       } catch (error) {
@@ -127,9 +155,14 @@ export const api = {
 
   // Sessions endpoints
   sessions: {
-    getAll: async () => {
+    // One page in id order; pass the previous page's next_cursor as `after`
+    getAll: async (after?: string | null, limit = 50) => {
       try {
-        const response = await fetch(`${API_BASE_URL}/sessions`);
+        const query = new URLSearchParams({ limit: String(limit) });
+        if (after) query.set("after", after);
+        const response = await fetch(`${API_BASE_URL}/sessions?${query}`, {
+          headers: authHeaders(),
+        });
         return handleResponse(response);
       } catch (error) {
         return handleApiError(error as Error, "Failed to fetch sessions");
@@ -141,6 +174,7 @@ export const api = {
         const response = await fetch(`${API_BASE_URL}/sessions`, {
           method: "POST",
           headers: {
+            ...authHeaders(),
             "Content-Type": "application/json",
           },
           body: JSON.stringify(params),
@@ -153,12 +187,62 @@ export const api = {
 
     getById: async (id: string) => {
       try {
-        const response = await fetch(`${API_BASE_URL}/sessions/${id}`);
+        const response = await fetch(`${API_BASE_URL}/sessions/${id}`, {
+          headers: authHeaders(),
+        });
         return handleResponse(response);
       } catch (error) {
         return handleApiError(error as Error, "Failed to fetch session");
       }
     },
+
+    // Live transcript segments and report job progress. EventSource cannot
+    // send the Authorization header, so the stream is read with fetch and
+    // reopened from the last event id until the signal aborts.
+    subscribe: async (
+      id: string,
+      onEvent: (event: string, data: unknown) => void,
+      signal: AbortSignal
+    ) => {
+      let lastEventId = "";
+      while (!signal.aborted) {
+        try {
+          const response = await fetch(`${API_BASE_URL}/sessions/${id}/events`, {
+            headers: {
+              ...authHeaders(),
+              ...(lastEventId ? { "Last-Event-ID": lastEventId } : {}),
+            },
+            signal,
+          });
+          if (!response.ok || !response.body) {
+            return handleResponse(response);
+          }
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buffer = "";
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+            const messages = buffer.split("\n\n");
+            buffer = messages.pop() ?? "";
+            for (const message of messages) {
+              let event = "message";
+              let data = "";
+              for (const line of message.split("\n")) {
+                if (line.startsWith("id: ")) lastEventId = line.slice(4);
+                else if (line.startsWith("event: ")) event = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+              }
+              if (data) onEvent(event, JSON.parse(data));
+            }
+          }
+        } catch (error) {
+          if (signal.aborted) return;
+          console.error("Session event stream dropped:", error);
+        }
+        await new Promise((resolve) => setTimeout(resolve, 3000));
+      }
+    },
   },
 
   // Transcript endpoints
@@ -166,7 +250,30 @@ export const api = {
     getBySessionId: async (sessionId: string) => {
       try {
         const response = await fetch(
-          `${API_BASE_URL}/sessions/${sessionId}/transcript`
+          `${API_BASE_URL}/sessions/${sessionId}/transcript`,
+          { headers: authHeaders() }
+        );
+        return handleResponse(response);
+      } catch (error) {
+        return handleApiError(error as Error, "Failed to fetch transcript");
+      }
+    },
+
+    // One window of a long transcript; pass `next_from` back as `from` for
+    // the following page. Times are milliseconds or strings such as "600s".
+    getRange: async (
+      sessionId: string,
+      params: { from?: number | string; to?: number | string; limit?: number }
+    ) => {
+      try {
+        const query = new URLSearchParams(
+          Object.entries(params)
+            .filter(([, value]) => value !== undefined)
+            .map(([key, value]) => [key, String(value)])
+        );
+        const response = await fetch(
+          `${API_BASE_URL}/sessions/${sessionId}/transcript?${query}`,
+          { headers: authHeaders() }
         );
         return handleResponse(response);
       } catch (error) {
@@ -183,6 +290,7 @@ export const api = {
           `${API_BASE_URL}/sessions/${sessionId}/upload`,
           {
             method: "POST",
+            headers: authHeaders(),
             body: formData,
           }
         );
@@ -198,7 +306,8 @@ export const api = {
     getBySessionId: async (sessionId: string) => {
       try {
         const response = await fetch(
-          `${API_BASE_URL}/sessions/${sessionId}/report`
+          `${API_BASE_URL}/sessions/${sessionId}/report`,
+          { headers: authHeaders() }
         );
         return handleResponse(response);
       } catch (error) {
@@ -212,6 +321,7 @@ export const api = {
           `${API_BASE_URL}/sessions/${sessionId}/report`,
           {
             method: "POST",
+            headers: authHeaders(),
           }
         );
         return handleResponse(response);
@@ -220,6 +330,23 @@ export const api = {
       }
     },
   },
+
+  // Dashboard statistics
+  stats: {
+    // Totals, plus session counts for the given patients
+    get: async (patientIds: string[] = []) => {
+      try {
+        const query = new URLSearchParams();
+        if (patientIds.length) query.set("patient_id", patientIds.join(","));
+        const response = await fetch(`${API_BASE_URL}/stats?${query}`, {
+          headers: authHeaders(),
+        });
+        return handleResponse(response);
+      } catch (error) {
+        return handleApiError(error as Error, "Failed to fetch statistics");
+      }
+    },
+  },
 };
 
 // Mock data for frontend development before backend is ready